@@ -0,0 +1,193 @@
+'''
+Per-stage benchmark of map_def_tool on synthetic disks.
+
+Builds synthetic db folders (euronav.synthetic) with the requested number
+of datasets and times every pipeline stage on its own:
+
+    dirs       listing the trees and counting LOD folders (euronav.walker)
+    labels     matching the SQL label files (euronav.labels)
+    parse      parsing all map.def files (euronav.mapdef.parse_many)
+    scan       complete scan_disk() without cache
+    scan-async the same with engine='async' (euronav.aioscan)
+    rescan     scan_disk() with a warm cache and no changes
+    rescan-async
+               the same with engine='async'
+    frame      building the typed DataFrame (needs pandas)
+    series     grouping the numbered series (euronav.series)
+    pdf        Extended + Overview PDF, native renderer
+    pdf-mpl    Extended + Overview PDF, matplotlib (only with --matplotlib)
+    coverage   coverage map layers and density grid (euronav.covermap)
+    coverage-png
+               Coverage_<eam>.png (needs matplotlib)
+    csv        Overview csv
+
+Usage (from the repository folder):
+
+    python benchmarks/bench_stages.py --sizes 100,1000,10000,50000 --json bench.json
+
+The synthetic disks are kept in --workdir and reused by later runs.
+--latency MS adds a delay to every listdir, stat and open of the scan
+stages, which is what USB and network drives cost; without it the scan
+stages mostly measure CPU.
+'''
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from euronav.cache import ScanCache  # noqa: E402
+from euronav.catalog import DEFAULT_IN_FLIGHT, scan_disk  # noqa: E402
+from euronav.disk import KINDS, DiskLayout  # noqa: E402
+from euronav.labels import LabelIndex  # noqa: E402
+from euronav.mapdef import parse_many  # noqa: E402
+from euronav.report import (coverage_of, write_coverage_map, write_extended_pdf, write_overview_csv,  # noqa: E402
+                            write_overview_pdf)
+from euronav.series import group_series  # noqa: E402
+from euronav.synthetic import generate_disk  # noqa: E402
+from euronav.walker import dataset_entries, list_dirs, map_ordered  # noqa: E402
+
+
+def best_of(repeat, func):
+    '''Return the best wall time of repeat calls of func in seconds.'''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+@contextlib.contextmanager
+def device_latency(seconds):
+    '''Delay every os.scandir, os.stat and open by seconds while active (simulated slow device).'''
+    if not seconds:
+        yield
+        return
+    originals = (os.scandir, os.stat, builtins.open)
+
+    def delayed(func):
+        def call(*args, **kwargs):
+            time.sleep(seconds)
+            return func(*args, **kwargs)
+        return call
+
+    os.scandir, os.stat, builtins.open = [delayed(func) for func in originals]
+    try:
+        yield
+    finally:
+        os.scandir, os.stat, builtins.open = originals
+
+
+def disk_for(size, workdir):
+    '''Return a synthetic disk with size datasets (60 % vector, 30 % raster, 10 % terrain).'''
+    db_path = os.path.join(workdir, 'disk_%d' % size)
+    marker = os.path.join(db_path, '.complete')
+    if not os.path.exists(marker):
+        shutil.rmtree(db_path, ignore_errors=True)
+        generate_disk(db_path, vector=size * 6 // 10, raster=size * 3 // 10, terrain=size - size * 9 // 10,
+                      eam_name='bench_%d' % size, seed=size)
+        open(marker, 'w').close()
+    return db_path
+
+
+def bench_disk(db_path, repeat, workers, out_dir, matplotlib=False, latency=0.0, in_flight=DEFAULT_IN_FLIGHT):
+    layout = DiskLayout(db_path)
+    dataset_paths = [os.path.join(layout.tree(kind), name) for kind in KINDS for name in list_dirs(layout.tree(kind))]
+    map_defs = [os.path.join(path, 'map.def') for path in dataset_paths]
+    map_defs = [path for path in map_defs if os.path.exists(path)]
+    vector = list_dirs(layout.vector)
+
+    times = {}
+    with device_latency(latency):
+        times['dirs'] = best_of(repeat, lambda: (
+            [list_dirs(layout.tree(kind)) for kind in KINDS], map_ordered(dataset_entries, dataset_paths, workers)))
+        times['labels'] = best_of(repeat, lambda: LabelIndex(layout.sql).match(vector))
+        times['parse'] = best_of(repeat, lambda: parse_many(map_defs))
+        engines = (('threads', workers, ''), ('async', in_flight, '-async'))
+        for engine, n, suffix in engines:
+            times['scan' + suffix] = best_of(repeat, lambda: scan_disk(db_path, n, engine=engine))
+
+        cache_file = os.path.join(out_dir, 'cache.sqlite')
+        for engine, n, suffix in engines:
+            cache = ScanCache(cache_file, rebuild=True)
+            try:
+                scan_disk(db_path, n, cache, engine=engine)
+                times['rescan' + suffix] = best_of(repeat, lambda: scan_disk(db_path, n, cache, engine=engine))
+            finally:
+                cache.close()
+
+    catalog = scan_disk(db_path, workers)
+    try:
+        import pandas  # noqa: F401
+        times['frame'] = best_of(repeat, lambda: catalog.to_dataframe())
+    except ImportError:
+        times['frame'] = None
+    times['series'] = best_of(repeat, lambda: group_series(catalog))
+    times['pdf'] = best_of(repeat, lambda: (write_extended_pdf(catalog, out_dir, 'native'),
+                                            write_overview_pdf(catalog, out_dir, 'native')))
+    if matplotlib:
+        times['pdf-mpl'] = best_of(1, lambda: (write_extended_pdf(catalog, out_dir),
+                                               write_overview_pdf(catalog, out_dir)))
+    times['coverage'] = best_of(repeat, lambda: coverage_of(catalog, density=True))
+    coverage = coverage_of(catalog)
+    try:
+        times['coverage-png'] = best_of(1, lambda: write_coverage_map(catalog, out_dir, 'png', coverage))
+    except ImportError:
+        times['coverage-png'] = None
+    times['csv'] = best_of(repeat, lambda: write_overview_csv(catalog, out_dir))
+    return len(catalog), times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time every stage of map_def_tool on synthetic disks.')
+    parser.add_argument('--sizes', default='100,1000,10000,50000',
+                        help='comma separated numbers of datasets (default: 100,1000,10000,50000)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the best one counts (default: 3)')
+    parser.add_argument('--workers', type=int, default=8, help='scan threads (default: 8)')
+    parser.add_argument('--in-flight', type=int, default=DEFAULT_IN_FLIGHT,
+                        help='reads in flight per device of the async engine (default: %d)' % DEFAULT_IN_FLIGHT)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='milliseconds added to every listdir, stat and open of the scan stages (default: 0)')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'map_def_tool_bench'),
+                        help='folder of the synthetic disks (kept between runs)')
+    parser.add_argument('--matplotlib', action='store_true', help='also time the matplotlib PDFs (slow)')
+    parser.add_argument('--json', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    out_dir = os.path.join(args.workdir, 'out')
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    results = []
+    header = None
+    for size in sizes:
+        db_path = disk_for(size, args.workdir)
+        n, times = bench_disk(db_path, args.repeat, args.workers, out_dir, args.matplotlib, args.latency / 1000.0,
+                              args.in_flight)
+        results.append({'size': size, 'datasets': n, 'seconds': times})
+        if header is None:
+            header = list(times)
+            print('%8s %8s ' % ('size', 'datasets') + ' '.join('%9s' % stage for stage in header))
+        print('%8d %8d ' % (size, n) + ' '.join('%9s' % ('-' if times[s] is None else '%.4f' % times[s])
+                                                for s in header))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'workers': args.workers, 'in_flight': args.in_flight,
+                       'latency_ms': args.latency,
+                       'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
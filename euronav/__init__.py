@@ -0,0 +1,17 @@
+'''
+Library layer of map_def_tool: scan a Euronav disk into a Catalog and write
+its reports.
+
+    from euronav import scan_disk
+    catalog = scan_disk('D:\\db')
+'''
+from .catalog import Catalog, Dataset, scan_disk
+from .catalogdb import CatalogDatabase
+from .diff import CatalogDiff, diff_catalogs
+from .disk import DiskError, DiskLayout, read_eam_name
+from .labels import LabelIndex
+from .mapdef import MapDef, MapDefError, parse_many, parse_map_def
+from .report import ReportError, write_reports
+from .series import Series, group_series
+from .spatial import BoxIndex, coverage
+from .storage import LodStats, collect_storage
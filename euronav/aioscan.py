@@ -0,0 +1,168 @@
+'''
+asyncio scan engine for high-latency media (scan_disk(engine='async')).
+
+On USB and network-mounted drives every metadata call waits milliseconds
+for the device. This engine issues the calls of all datasets from one
+event loop and keeps up to in_flight of them outstanding per device (the
+st_dev of the tree), so the device queue stays full without a thread per
+dataset waiting its turn. The blocking calls themselves run on a thread
+pool sized in_flight per device.
+
+The map.def of a dataset is read ahead, at the same time as its folder is
+listed instead of after it.
+
+Results come back in job order and are the same as those of the thread
+engine: (Dataset or None, cache signature, cache hit).
+'''
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import instrument
+from .cache import dataset_signature, directory_signature
+from .catalog import DEFAULT_IN_FLIGHT, cached_dataset, make_dataset
+from .disk import KINDS
+from .mapdef import MAP_DEF, read_map_def
+from .walker import dataset_entries
+
+_DONE = object()
+
+
+def device_of(path):
+    '''Return the device id of path (0 if it can not be read).'''
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return 0
+
+
+def _call(stage, dataset, func, args):
+    # runs on a pool thread, so the span and its counters belong to that thread
+    with instrument.span(stage, dataset):
+        return func(*args)
+
+
+def _read_or_none(path):
+    try:
+        return read_map_def(path)
+    except (IOError, OSError):
+        return None
+
+
+class DeviceScheduler(object):
+    '''Runs blocking file system calls off the event loop, at most in_flight per device.
+
+    Every device gets its own pool of in_flight threads; calls beyond that
+    wait in the pool queue in the order they were issued.
+    '''
+
+    def __init__(self, in_flight=DEFAULT_IN_FLIGHT):
+        self.in_flight = max(1, in_flight)
+        self._pools = {}
+
+    def call(self, device, func, *args, stage='io', dataset=None):
+        '''Return a future of func(*args) run on the pool of device.'''
+        pool = self._pools.get(device)
+        if pool is None:
+            pool = self._pools[device] = ThreadPoolExecutor(max_workers=self.in_flight)
+        return asyncio.get_running_loop().run_in_executor(pool, _call, stage, dataset, func, args)
+
+    def close(self):
+        '''Wait for the calls still running and stop the threads.'''
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+
+
+async def read_dataset(scheduler, device, layout, job, cached, checked=frozenset()):
+    '''Return (Dataset or None, signature, cache hit) of job (kind, dirname); cached is None without cache.
+
+    checked are the dataset folders whose map.def is looked at even if the
+    folder mtime is unchanged (see scan_disk).
+    '''
+    kind, dirname = job
+    name = kind + '/' + dirname
+    path = os.path.join(layout.tree(kind), dirname)
+    map_def = os.path.join(path, MAP_DEF)
+    signature = None
+    if cached is not None:
+        if path in checked:
+            signature = await scheduler.call(device, dataset_signature, path, stage='dataset signature', dataset=name)
+        else:
+            signature = [await scheduler.call(device, directory_signature, path, stage='dataset signature',
+                                              dataset=name)]
+        hit, dataset = cached_dataset(cached, job, signature)
+        if hit:
+            return dataset, cached[job][0], True
+        if len(signature) == 1:
+            signature = await scheduler.call(device, dataset_signature, path, stage='dataset signature', dataset=name)
+
+    # the map.def is read ahead while the folder is listed; it is only used if the listing has it
+    entries, data = await asyncio.gather(
+        scheduler.call(device, dataset_entries, path, stage='dataset list', dataset=name),
+        scheduler.call(device, _read_or_none, map_def, stage='map.def read', dataset=name))
+    if entries is None or not entries[1] or data is None:
+        return None, signature, False
+    return make_dataset(kind, dirname, path, entries[0], data), signature, False
+
+
+def iter_scan(layout, jobs, cached=None, in_flight=DEFAULT_IN_FLIGHT, checked=frozenset()):
+    '''Yield the read_dataset results of jobs in order, each as soon as it and all before it are done.
+
+    The event loop runs on its own thread; closing the generator early
+    cancels the reads still outstanding.
+    '''
+    jobs = list(jobs)
+    in_flight = max(1, in_flight or DEFAULT_IN_FLIGHT)
+    results = queue.Queue()
+    started = threading.Event()
+    state = {}
+
+    async def produce():
+        state['loop'] = asyncio.get_running_loop()
+        state['task'] = asyncio.current_task()
+        started.set()
+        devices = dict((kind, device_of(layout.tree(kind))) for kind in KINDS)
+        scheduler = DeviceScheduler(in_flight)
+        try:
+            tasks = [asyncio.ensure_future(read_dataset(scheduler, devices[job[0]], layout, job, cached, checked))
+                     for job in jobs]
+            try:
+                for task in tasks:
+                    results.put((True, await task))
+            finally:
+                for task in tasks:
+                    task.cancel()
+        finally:
+            scheduler.close()
+
+    def run():
+        try:
+            asyncio.run(produce())
+            results.put(_DONE)
+        except BaseException as e:
+            results.put((False, e))
+        finally:
+            started.set()
+
+    thread = threading.Thread(target=run, name='map_def_tool-aioscan', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                return
+            ok, value = item
+            if not ok:
+                raise value
+            yield value
+    finally:
+        started.wait()
+        if thread.is_alive() and 'task' in state:
+            try:
+                state['loop'].call_soon_threadsafe(state['task'].cancel)
+            except RuntimeError:
+                # the loop has just finished
+                pass
+        thread.join()
@@ -0,0 +1,108 @@
+'''
+Persistent scan cache.
+
+The parsed record of every dataset is kept in a small SQLite file together
+with the signature it was built from: the mtime of the dataset folder
+(changes when LOD folders come or go) and the mtime and size of its
+map.def. The signature of the SQL folder is kept as well, because the
+label files of a vector dataset live there. A re-scan only re-reads the
+datasets whose signature changed.
+
+A re-scan stats the dataset folder first and takes the cached record when
+its mtime is unchanged, without a stat of the map.def: adding, removing
+or replacing files (a copy step) changes the folder mtime. A map.def
+edited in place does not, so it is only read again when the watch
+reports it (scan_disk(changed=...)) or with --rebuild-cache.
+
+The cache files live in the user cache folder, one per db path, so
+read-only disks can be cached too.
+'''
+import hashlib
+import json
+import os
+import sqlite3
+
+from .mapdef import MAP_DEF
+
+SCHEMA_VERSION = '2'
+
+
+def default_cache_dir():
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'map_def_tool', 'cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'map_def_tool')
+
+
+def cache_path(db_path, cache_dir=None):
+    '''Return the cache file used for the db folder at db_path.'''
+    key = hashlib.sha1(os.path.abspath(db_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir or default_cache_dir(), key + '.sqlite')
+
+
+def directory_signature(path):
+    '''Return the mtime of a folder, or None if it does not exist.'''
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def dataset_signature(path):
+    '''Return [folder mtime, map.def mtime, map.def size] of a dataset folder.'''
+    signature = [directory_signature(path), None, None]
+    try:
+        st = os.stat(os.path.join(path, MAP_DEF))
+        signature[1:] = [st.st_mtime_ns, st.st_size]
+    except OSError:
+        pass
+    return signature
+
+
+class ScanCache(object):
+    '''Dataset records of one db folder with the signatures they were built from.'''
+
+    def __init__(self, path, rebuild=False):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS datasets (kind TEXT, dirname TEXT, signature TEXT, record TEXT,'
+                                ' PRIMARY KEY (kind, dirname))')
+        if rebuild or self.get_meta('schema') != SCHEMA_VERSION:
+            self.clear()
+
+    def get_meta(self, key):
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_meta(self, key, value):
+        self.connection.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, json.dumps(value)))
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute('DELETE FROM datasets')
+            self.connection.execute('DELETE FROM meta')
+            self.set_meta('schema', SCHEMA_VERSION)
+
+    def load(self):
+        '''Return {(kind, dirname): (signature, record)}; record is None for folders without map.def.'''
+        entries = {}
+        for kind, dirname, signature, record in self.connection.execute('SELECT * FROM datasets'):
+            entries[(kind, dirname)] = (json.loads(signature), json.loads(record))
+        return entries
+
+    def update(self, changed, removed, sql_signature):
+        '''Store changed {(kind, dirname): (signature, record)} and drop the removed (kind, dirname) keys.'''
+        with self.connection:
+            self.connection.executemany('DELETE FROM datasets WHERE kind = ? AND dirname = ?', list(removed))
+            self.connection.executemany('INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?)',
+                                        [(kind, dirname, json.dumps(signature), json.dumps(record))
+                                         for (kind, dirname), (signature, record) in changed.items()])
+            self.set_meta('sql_signature', sql_signature)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,365 @@
+'''
+Catalog of the maps contained by a Euronav disk.
+
+scan_disk() walks the vector, raster and terrain trees of a db folder,
+collects the information from every map.def and returns it as a Catalog.
+Nothing here needs matplotlib or pandas; those are only imported when a
+DataFrame or a PDF is requested.
+'''
+import hashlib
+import json
+import os
+
+from . import instrument
+from .cache import dataset_signature, directory_signature
+from .disk import KINDS, DiskError, DiskLayout, read_eam_name
+from .labels import LabelIndex
+from .mapdef import MAP_DEF, MapDef, MapDefError, parse_data, read_map_def
+from .walker import DEFAULT_WORKERS, dataset_entries, iter_ordered, list_dirs
+
+MISSING = '--'
+
+CATALOG_FORMAT = 'map_def_tool catalog'
+CATALOG_VERSION = 1
+
+EXTENDED_COLUMNS = ('TYPE', 'NAME', 'GROUP', 'PRIO.', 'CATEG.', 'PUBLIC.', 'LOD', 'SQL', 'XMIN', 'XMAX', 'YMIN', 'YMAX')
+
+# I/O engines of scan_disk
+ENGINES = ('threads', 'async')
+# reads in flight per device of the async engine
+DEFAULT_IN_FLIGHT = 16
+
+
+def display(value):
+    '''Return value as shown in the reports: -- if missing, coordinates with 2 decimals.'''
+    if value is None:
+        return MISSING
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+
+class Dataset(MapDef):
+    '''One dataset (a folder with a map.def) of the vector, raster or terrain tree.'''
+
+    __slots__ = ('kind', 'dirname', 'path', 'lod', 'sql', 'labels', 'lod_folders', 'lod_stats', 'label_stats',
+                 'error')
+
+    FIELDS = ('kind', 'dirname', 'path', 'type', 'name', 'group', 'priority', 'category', 'publication',
+              'lod', 'xmin', 'xmax', 'ymin', 'ymax', 'sql', 'labels', 'extras')
+
+    # fields compared between two scans of a dataset (see fingerprint)
+    COMPARED_FIELDS = ('type', 'name', 'group', 'priority', 'category', 'publication', 'lod', 'sql',
+                       'xmin', 'ymin', 'xmax', 'ymax')
+
+    def __init__(self, kind, dirname, path):
+        MapDef.__init__(self)
+        self.kind = kind
+        self.dirname = dirname
+        self.path = path
+        self.lod = 0
+        self.sql = 'no'
+        # SQL label files of a vector dataset
+        self.labels = []
+        # names of the LOD folders as listed by the scan; None for datasets from the cache or a saved catalog
+        self.lod_folders = None
+        # [LodStats] after euronav.storage.collect_storage, else None
+        self.lod_stats = None
+        # [LabelStats] after euronav.labelstats.collect_label_stats, else None
+        self.label_stats = None
+        # message of the MapDefError if the map.def could not be parsed (see make_dataset)
+        self.error = None
+
+    def set_labels(self, labels):
+        self.labels = list(labels)
+        self.sql = 'yes' if self.labels else 'no'
+
+    def to_dict(self):
+        return dict((field, getattr(self, field)) for field in self.FIELDS)
+
+    @classmethod
+    def from_dict(cls, record):
+        dataset = cls(record['kind'], record['dirname'], record['path'])
+        for field in cls.FIELDS[3:]:
+            setattr(dataset, field, record.get(field))
+        return dataset
+
+    def storage(self):
+        '''Return (files, bytes, largest file) over all LOD folders, or None without statistics.'''
+        if self.lod_stats is None:
+            return None
+        return (sum(s.files for s in self.lod_stats), sum(s.bytes for s in self.lod_stats),
+                max([s.largest for s in self.lod_stats] or [0]))
+
+    def fingerprint(self):
+        '''Return a hash of the COMPARED_FIELDS, equal for equal datasets on any disk.'''
+        values = json.dumps([getattr(self, field) for field in self.COMPARED_FIELDS])
+        return hashlib.sha1(values.encode('utf-8')).hexdigest()
+
+    def extended_row(self):
+        '''Return the row of the Extended table, in EXTENDED_COLUMNS order.'''
+        return [display(v) for v in (self.type, self.name, self.group, self.priority, self.category, self.publication,
+                                     self.lod, self.sql, self.xmin, self.xmax, self.ymin, self.ymax)]
+
+    def __repr__(self):
+        return 'Dataset(%r, %r)' % (self.kind, self.dirname)
+
+
+class Catalog(object):
+    '''All datasets of one disk, vector first, then raster, then terrain.'''
+
+    def __init__(self, db_path, eam_name, datasets, counts, errors=()):
+        self.db_path = db_path
+        self.eam_name = eam_name
+        self.datasets = datasets
+        # number of folders found in each tree (with or without map.def)
+        self.counts = counts
+        # messages of the map.def files that could not be parsed; their datasets are left out
+        self.errors = list(errors)
+        self._bounds = None
+        self._spatial_index = None
+
+    def __len__(self):
+        return len(self.datasets)
+
+    def save(self, path):
+        '''Save the catalog as JSON (see Catalog.load).'''
+        datasets = []
+        for d in self.datasets:
+            record = d.to_dict()
+            record['fingerprint'] = d.fingerprint()
+            if d.lod_stats is not None:
+                record['lod_stats'] = [s.to_dict() for s in d.lod_stats]
+            if d.label_stats is not None:
+                record['label_stats'] = [s.to_dict() for s in d.label_stats]
+            datasets.append(record)
+        with open(path, 'w') as f:
+            json.dump({'format': CATALOG_FORMAT, 'version': CATALOG_VERSION, 'db_path': self.db_path,
+                       'eam_name': self.eam_name, 'counts': self.counts, 'datasets': datasets}, f)
+
+    @classmethod
+    def load(cls, path):
+        '''Return the catalog saved at path.'''
+        with open(path) as f:
+            content = json.load(f)
+        if content.get('format') != CATALOG_FORMAT or content.get('version') != CATALOG_VERSION:
+            raise DiskError(path + ' is not a saved catalog of this tool.')
+        datasets = []
+        for record in content['datasets']:
+            d = Dataset.from_dict(record)
+            if record.get('lod_stats') is not None:
+                from .storage import LodStats
+                d.lod_stats = [LodStats.from_dict(s) for s in record['lod_stats']]
+            if record.get('label_stats') is not None:
+                from .labelstats import LabelStats
+                d.label_stats = [LabelStats.from_dict(s) for s in record['label_stats']]
+            datasets.append(d)
+        return cls(content['db_path'], content['eam_name'], datasets, content['counts'])
+
+    def __iter__(self):
+        return iter(self.datasets)
+
+    def by_kind(self, kind):
+        return [d for d in self.datasets if d.kind == kind]
+
+    def extended_rows(self):
+        return [d.extended_row() for d in self.datasets]
+
+    def has_storage(self):
+        '''True if the storage statistics were collected (see euronav.storage).'''
+        return bool(self.datasets) and all(d.lod_stats is not None for d in self.datasets)
+
+    def has_label_stats(self):
+        '''True if the SQL label statistics were collected (see euronav.labelstats).'''
+        return bool(self.datasets) and all(d.label_stats is not None for d in self.datasets)
+
+    def bounds(self):
+        '''Return the bounding boxes as (n, 4) NumPy array [xmin, xmax, ymin, ymax] (NaN if missing).
+
+        The array is built once and shared; treat it as read-only.
+        '''
+        if self._bounds is None or len(self._bounds) != len(self.datasets):
+            from .frame import bounds_array
+            self._bounds = bounds_array(self.datasets)
+            self._bounds.setflags(write=False)
+        return self._bounds
+
+    def spatial_index(self):
+        '''Return the BoxIndex over the dataset bounding boxes (item i is datasets[i]).'''
+        if self._spatial_index is None or self._spatial_index[0] != len(self.datasets):
+            from .spatial import BoxIndex, dataset_box
+            self._spatial_index = (len(self.datasets), BoxIndex([dataset_box(d) for d in self.datasets]))
+        return self._spatial_index[1]
+
+    def to_dataframe(self):
+        '''Return the Extended table as typed pandas DataFrame (see euronav.frame).'''
+        from .frame import catalog_frame
+        return catalog_frame(self.datasets, self.bounds())
+
+
+def make_dataset(kind, dirname, path, lods, data):
+    '''Return the Dataset of the folder at path from its LOD folder names and map.def bytes.
+
+    If the map.def can not be parsed, the message of the MapDefError is
+    set as dataset.error and scan_disk leaves the dataset out.
+    '''
+    dataset = Dataset(kind, dirname, path)
+    dataset.lod = len(lods)
+    dataset.lod_folders = lods
+    try:
+        parse_data(data, dataset, os.path.join(path, MAP_DEF))
+    except MapDefError as e:
+        dataset.error = str(e)
+    return dataset
+
+
+def cached_dataset(cached, job, signature):
+    '''Return (True, Dataset or None) if the cache entry of job was built from signature, else (False, None).
+
+    signature is a dataset_signature, or [folder mtime] alone: the entry of
+    a folder with the same mtime is then taken without a look at its map.def.
+    '''
+    entry = cached.get(job)
+    if entry is None or entry[0][:len(signature)] != signature:
+        return False, None
+    return True, Dataset.from_dict(entry[1]) if entry[1] is not None else None
+
+
+def scan_dataset(layout, kind, dirname):
+    '''Return the Dataset for one folder of a tree, or None if it has no usable map.def.
+
+    The SQL labels of vector datasets are set afterwards (see LabelIndex.match).
+    '''
+    path = os.path.join(layout.tree(kind), dirname)
+    entries = dataset_entries(path)
+    if entries is None or not entries[1]:
+        return None
+    try:
+        data = read_map_def(os.path.join(path, MAP_DEF))
+    except (IOError, OSError):
+        return None
+    return make_dataset(kind, dirname, path, entries[0], data)
+
+
+def map_def_checked(layout, jobs, changed):
+    '''Return the dataset folders of jobs whose map.def a cached scan looks at: those with changed paths.
+
+    changed are the paths reported by euronav.watch; a changed tree or db
+    folder checks all its datasets.
+    '''
+    if not changed:
+        return frozenset()
+    changed = set(changed)
+    checked = set()
+    for kind, dirname in jobs:
+        tree = layout.tree(kind)
+        path = os.path.join(tree, dirname)
+        if (path in changed or os.path.join(path, MAP_DEF) in changed or tree in changed
+                or layout.db_path in changed):
+            checked.add(path)
+    return checked
+
+
+def scan_disk(db_path, workers=DEFAULT_WORKERS, cache=None, sinks=(), engine='threads', changed=None):
+    '''Scan the db folder at db_path and return its Catalog.
+
+    engine 'threads' reads the datasets on up to workers threads (1: no
+    threads); engine 'async' (see euronav.aioscan) keeps up to workers reads
+    in flight per device. workers None picks the default of the engine.
+    With a ScanCache only the datasets changed since the last scan are read
+    again; a dataset folder with the same mtime is taken from the cache
+    without a look at its map.def, unless one of the changed paths (from
+    euronav.watch) is in it (see euronav.cache). Every dataset is passed to
+    sink.write() of all sinks (see euronav.export) as soon as it and all
+    datasets before it are scanned.
+    Datasets whose map.def can not be parsed are left out and listed in
+    Catalog.errors; they are not cached, so every scan reports them again.
+    '''
+    if engine not in ENGINES:
+        raise ValueError('unknown engine %r' % engine)
+    layout = DiskLayout(db_path)
+    jobs = []
+    counts = {}
+    vector = []
+    with instrument.span('list trees'):
+        for kind in KINDS:
+            dirnames = list_dirs(layout.tree(kind))
+            counts[kind] = len(dirnames)
+            jobs.extend((kind, dirname) for dirname in dirnames)
+            if kind == 'vector':
+                vector = dirnames
+
+    if not any(counts.values()):
+        raise DiskError('There are no raster, vector or terrain data in the db folder.')
+
+    cached = {}
+    checked = frozenset()
+    if cache is not None:
+        with instrument.span('cache load'):
+            cached = cache.load()
+        checked = map_def_checked(layout, jobs, changed)
+    sql_signature = directory_signature(layout.sql)
+    sql_changed = cache is None or cache.get_meta('sql_signature') != sql_signature
+
+    # SQL labels of all vector datasets, matched in one pass the first time a dataset needs them
+    labels = {}
+
+    def labels_of(dirname):
+        if not labels:
+            with instrument.span('labels'):
+                labels.update(LabelIndex(layout.sql).match(vector))
+        return labels[dirname]
+
+    def read(job):
+        kind, dirname = job
+        with instrument.span('dataset', kind + '/' + dirname):
+            signature = None
+            if cache is not None:
+                path = os.path.join(layout.tree(kind), dirname)
+                signature = dataset_signature(path) if path in checked else [directory_signature(path)]
+                hit, dataset = cached_dataset(cached, job, signature)
+                if hit:
+                    return dataset, cached[job][0], True
+                if len(signature) == 1:
+                    signature = dataset_signature(path)
+            return scan_dataset(layout, kind, dirname), signature, False
+
+    if engine == 'async':
+        from .aioscan import iter_scan
+        results = iter_scan(layout, jobs, cached if cache is not None else None, workers, checked)
+    else:
+        results = iter_ordered(read, jobs, workers)
+
+    datasets = []
+    errors = []
+    invalid = []
+    # cache entries to write, only collected when there is a cache
+    changed = {} if cache is not None else None
+    with instrument.span('datasets'):
+        for job, (dataset, signature, hit) in zip(jobs, results):
+            if dataset is not None and dataset.error is not None:
+                errors.append(dataset.error)
+                invalid.append(job)
+                continue
+            # labels are read again for new datasets and for all when the SQL folder changed
+            relabelled = dataset is not None and job[0] == 'vector' and (sql_changed or not hit)
+            if relabelled:
+                dataset.set_labels(labels_of(job[1]))
+            if changed is not None and (not hit or relabelled):
+                changed[job] = (signature, dataset.to_dict() if dataset is not None else None)
+            if dataset is not None:
+                datasets.append(dataset)
+                for sink in sinks:
+                    sink.write(dataset)
+
+    if cache is not None:
+        # only write what changed, a re-scan of an unchanged disk writes nothing
+        # the stale entries of invalid map.def files go as well
+        removed = (set(cached) - set(jobs)) | set(job for job in invalid if job in cached)
+        if changed or removed or sql_changed:
+            with instrument.span('cache update'):
+                cache.update(changed, removed, sql_signature)
+
+    with instrument.span('eam name'):
+        eam_name = read_eam_name(db_path)
+    return Catalog(db_path, eam_name, datasets, counts, errors)
@@ -0,0 +1,194 @@
+'''
+Fleet catalog database.
+
+scan --catalog-db and batch --catalog-db store every scanned disk in one
+local SQLite file, so questions over many disks ("which disks carry jepp
+data published after 2018-03?") are answered by an indexed query instead
+of opening their reports:
+
+    disks     one row per disk: EAM name, db path, scan time, counts
+    datasets  map.def fields, LOD, SQL and bbox of every dataset
+    labels    SQL label files of the vector datasets
+    bbox      R*Tree of the dataset bounding boxes (plain range query
+              on the bbox columns if SQLite lacks the R*Tree module)
+
+A disk is identified by the absolute path of its db folder (copies of
+one EAM on several drives are separate disks). Scanning it again updates
+its rows in place: datasets keep their ids, new ones are added and the
+ones no longer on the disk removed.
+'''
+import os
+import sqlite3
+import time
+
+from .spatial import dataset_box, normalized_box
+
+SCHEMA_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS disks (
+    id INTEGER PRIMARY KEY, db_path TEXT UNIQUE NOT NULL, eam_name TEXT, scanned TEXT,
+    vector INTEGER, raster INTEGER, terrain INTEGER);
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY, disk_id INTEGER NOT NULL REFERENCES disks (id) ON DELETE CASCADE,
+    kind TEXT, dirname TEXT, type TEXT, name TEXT, group_name TEXT, priority INTEGER, category TEXT,
+    publication TEXT, lod INTEGER, sql INTEGER, xmin REAL, xmax REAL, ymin REAL, ymax REAL,
+    UNIQUE (disk_id, kind, dirname));
+CREATE TABLE IF NOT EXISTS labels (
+    dataset_id INTEGER NOT NULL REFERENCES datasets (id) ON DELETE CASCADE, file TEXT,
+    PRIMARY KEY (dataset_id, file));
+CREATE INDEX IF NOT EXISTS datasets_name ON datasets (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS datasets_group ON datasets (group_name);
+CREATE INDEX IF NOT EXISTS datasets_type ON datasets (type);
+CREATE INDEX IF NOT EXISTS datasets_priority ON datasets (priority);
+CREATE INDEX IF NOT EXISTS datasets_publication ON datasets (publication);
+'''
+
+RTREE = 'CREATE VIRTUAL TABLE IF NOT EXISTS bbox USING rtree (id, xmin, xmax, ymin, ymax)'
+
+DATASET_COLUMNS = ('kind', 'dirname', 'type', 'name', 'group_name', 'priority', 'category', 'publication',
+                   'lod', 'sql', 'xmin', 'xmax', 'ymin', 'ymax')
+
+# columns of the rows returned by CatalogDatabase.search
+RESULT_COLUMNS = ('eam_name', 'db_path') + DATASET_COLUMNS
+
+
+def dataset_values(d):
+    return (d.kind, d.dirname, d.type, d.name, d.group, d.priority, d.category, d.publication,
+            d.lod, 1 if d.sql == 'yes' else 0, d.xmin, d.xmax, d.ymin, d.ymax)
+
+
+def index_box(d):
+    '''Return the bbox row values (xmin, xmax, ymin, ymax) of d, min and max in order as in BoxIndex; None without bbox.'''
+    box = dataset_box(d)
+    if box is None:
+        return None
+    xmin, ymin, xmax, ymax = normalized_box(box)
+    return xmin, xmax, ymin, ymax
+
+
+class CatalogDatabase(object):
+    '''The fleet catalog SQLite file at path (created if missing).'''
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute('INSERT OR IGNORE INTO meta VALUES (?, ?)', ('schema', str(SCHEMA_VERSION)))
+        try:
+            with self.connection:
+                self.connection.execute(RTREE)
+            self.has_rtree = True
+        except sqlite3.OperationalError:
+            # SQLite built without the R*Tree module
+            self.has_rtree = False
+
+    def add_catalog(self, catalog, scanned=None):
+        '''Insert or update the disk of catalog with all its datasets and labels; return the disk id.'''
+        scanned = scanned or time.strftime('%Y-%m-%d %H:%M:%S')
+        db_path = os.path.abspath(catalog.db_path)
+        counts = [catalog.counts.get(kind, 0) for kind in ('vector', 'raster', 'terrain')]
+        c = self.connection
+        with c:
+            row = c.execute('SELECT id FROM disks WHERE db_path = ?', (db_path,)).fetchone()
+            if row is None:
+                disk_id = c.execute('INSERT INTO disks (db_path, eam_name, scanned, vector, raster, terrain)'
+                                    ' VALUES (?, ?, ?, ?, ?, ?)', [db_path, catalog.eam_name, scanned] + counts).lastrowid
+            else:
+                disk_id = row[0]
+                c.execute('UPDATE disks SET eam_name = ?, scanned = ?, vector = ?, raster = ?, terrain = ? WHERE id = ?',
+                          [catalog.eam_name, scanned] + counts + [disk_id])
+
+            existing = dict(((kind, dirname), id) for id, kind, dirname in
+                            c.execute('SELECT id, kind, dirname FROM datasets WHERE disk_id = ?', (disk_id,)))
+            update = 'UPDATE datasets SET ' + ', '.join(column + ' = ?' for column in DATASET_COLUMNS) + ' WHERE id = ?'
+            insert = ('INSERT INTO datasets (disk_id, ' + ', '.join(DATASET_COLUMNS) + ') VALUES (?'
+                      + ', ?' * len(DATASET_COLUMNS) + ')')
+            ids = []
+            for d in catalog:
+                values = dataset_values(d)
+                dataset_id = existing.pop((d.kind, d.dirname), None)
+                if dataset_id is None:
+                    dataset_id = c.execute(insert, (disk_id,) + values).lastrowid
+                else:
+                    c.execute(update, values + (dataset_id,))
+                ids.append(dataset_id)
+
+            # labels of removed datasets go with them (ON DELETE CASCADE)
+            removed = [(id,) for id in existing.values()]
+            c.executemany('DELETE FROM datasets WHERE id = ?', removed)
+            c.executemany('DELETE FROM labels WHERE dataset_id = ?', [(id,) for id in ids])
+            c.executemany('INSERT OR IGNORE INTO labels VALUES (?, ?)',
+                          [(id, f) for id, d in zip(ids, catalog) for f in d.labels or ()])
+            if self.has_rtree:
+                c.executemany('DELETE FROM bbox WHERE id = ?', removed)
+                boxes = [index_box(d) for d in catalog]
+                c.executemany('INSERT OR REPLACE INTO bbox VALUES (?, ?, ?, ?, ?)',
+                              [(id,) + box for id, box in zip(ids, boxes) if box is not None])
+                c.executemany('DELETE FROM bbox WHERE id = ?', [(id,) for id, box in zip(ids, boxes) if box is None])
+        return disk_id
+
+    def search(self, name=None, group=None, type=None, kind=None, priority=None, published_after=None,
+               published_before=None, label=None, bbox=None, eam_name=None):
+        '''Return the datasets matching all given criteria as rows in RESULT_COLUMNS order.
+
+        name matches the start of the name and label a part of a label file,
+        both in any case (the name prefix uses the NOCASE index);
+        published_after and published_before compare the publication text
+        (2018-03 < 2018-11); bbox is (xmin, ymin, xmax, ymax) and finds the
+        datasets overlapping it, with inverted boxes read as in BoxIndex.
+        '''
+        where = []
+        params = []
+        if name:
+            where.append("d.name LIKE ? ESCAPE '\\'")
+            params.append(like_escape(name) + '%')
+        for column, value in (('d.group_name', group), ('d.type', type), ('d.kind', kind), ('d.priority', priority),
+                              ('k.eam_name', eam_name)):
+            if value is not None:
+                where.append(column + ' = ?')
+                params.append(value)
+        if published_after:
+            where.append('d.publication > ?')
+            params.append(published_after)
+        if published_before:
+            where.append('d.publication < ?')
+            params.append(published_before)
+        if label:
+            where.append("d.id IN (SELECT dataset_id FROM labels WHERE file LIKE ? ESCAPE '\\')")
+            params.append('%' + like_escape(label) + '%')
+        if bbox is not None:
+            xmin, ymin, xmax, ymax = normalized_box(bbox)
+            if self.has_rtree:
+                # the R*Tree keeps 32 bit boxes rounded outwards, the exact test below drops the extra hits
+                where.append('d.id IN (SELECT id FROM bbox WHERE xmax >= ? AND xmin <= ? AND ymax >= ? AND ymin <= ?)')
+                params.extend((xmin, xmax, ymin, ymax))
+            where.append('MAX(d.xmin, d.xmax) >= ? AND MIN(d.xmin, d.xmax) <= ?'
+                         ' AND MAX(d.ymin, d.ymax) >= ? AND MIN(d.ymin, d.ymax) <= ?')
+            params.extend((xmin, xmax, ymin, ymax))
+
+        sql = ('SELECT k.eam_name, k.db_path, ' + ', '.join('d.' + column for column in DATASET_COLUMNS)
+               + ' FROM datasets d JOIN disks k ON k.id = d.disk_id')
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY k.eam_name, k.db_path, d.kind, d.dirname'
+        return self.connection.execute(sql, params).fetchall()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
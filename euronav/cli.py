@@ -0,0 +1,497 @@
+'''
+Command line interface of map_def_tool.
+
+    python map_def_tool.py scan D:\\db --out reports --format csv
+    python map_def_tool.py scan D:\\db --out reports --format pdf --export jsonl,parquet
+    python map_def_tool.py query D:\\db --point 37.6 55.7
+    python map_def_tool.py search fleet.sqlite --name jepp --after 2018-03 --disks
+    python map_def_tool.py watch D:\\db --out reports --format pdf,csv
+    python map_def_tool.py diff Catalog_1.2.3.json D:\\db
+    python map_def_tool.py verify D:\\db --against Manifest_1.2.3.sha256
+    python map_def_tool.py batch E:\\disks\\*\\db --out reports --processes 8
+
+Without arguments the tool asks for the db folder and the output folder,
+as the original double-click script did.
+'''
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from .cache import ScanCache, cache_path
+from .catalog import DEFAULT_IN_FLIGHT, ENGINES, Catalog, display, scan_disk
+from .catalogdb import CatalogDatabase
+from .diff import diff_catalogs
+from .disk import KINDS, DiskError, DiskLayout, read_eam_name
+from .export import EXPORTS, close_writers, open_writers, write_exports
+from .fleet import expand_paths, fleet_catalogs, scan_fleet, write_fleet_csv
+from .instrument import Profiler
+from .memory import format_bytes, peak_rss
+from .report import (COVERAGE_FORMATS, DEFAULT_FORMATS, FORMATS, RENDERERS, ReportError, report_path,
+                     write_reports)
+from .spatial import coverage
+from .labelstats import collect_label_stats
+from .storage import collect_storage
+from .verify import DEFAULT_JOBS, UNREADABLE, build_manifest, compare_manifests, read_manifest
+from .walker import DEFAULT_WORKERS
+from .watch import watch as watch_folder
+
+
+def parse_formats(value):
+    formats = [f.strip().lower() for f in value.split(',') if f.strip()]
+    for f in formats:
+        if f not in FORMATS:
+            raise argparse.ArgumentTypeError('unknown format %r (choose from %s)' % (f, ', '.join(FORMATS)))
+    return formats
+
+
+def parse_exports(value):
+    exports = [e.strip().lower() for e in value.split(',') if e.strip()]
+    for e in exports:
+        if e not in EXPORTS:
+            raise argparse.ArgumentTypeError('unknown export %r (choose from %s)' % (e, ', '.join(EXPORTS)))
+    return exports
+
+
+def parse_coverage_maps(value):
+    extensions = [e.strip().lower() for e in value.split(',') if e.strip()]
+    for e in extensions:
+        if e not in COVERAGE_FORMATS:
+            raise argparse.ArgumentTypeError('unknown coverage map format %r (choose from %s)'
+                                             % (e, ', '.join(COVERAGE_FORMATS)))
+    return extensions
+
+
+DENSITY = {'auto': None, 'on': True, 'off': False}
+
+
+def add_coverage_options(parser):
+    parser.add_argument('--coverage-map', dest='coverage_maps', type=parse_coverage_maps, default=[],
+                        help='also write the coverage map alone: png, svg (comma separated)')
+    parser.add_argument('--density', choices=sorted(DENSITY), default='auto',
+                        help='density grid under the coverage map boxes (needs numpy); auto draws it on dense '
+                             'disks (default: auto)')
+
+
+def parse_point(value):
+    try:
+        x, y = [float(v) for v in value.replace(';', ',').split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected x,y but got %r' % value)
+    return x, y
+
+
+def add_scan_options(parser):
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of datasets read at the same time (default: %d); with --engine async the reads'
+                        ' in flight per device (default: %d)' % (DEFAULT_WORKERS, DEFAULT_IN_FLIGHT))
+    parser.add_argument('--engine', choices=ENGINES, default='threads',
+                        help='I/O engine: threads, or async for slow USB and network drives (default: threads)')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the scan cache')
+    parser.add_argument('--rebuild-cache', action='store_true', help='ignore the scan cache and build it again')
+    parser.add_argument('--cache-dir', help='folder of the scan cache files (default: user cache folder)')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='map_def_tool', description='Summarize the maps contained by a Euronav disk.')
+    commands = parser.add_subparsers(dest='command')
+
+    scan = commands.add_parser('scan', help='scan a db folder and write the reports')
+    scan.add_argument('db_path', help='path to the db folder (for example D:\\db)')
+    scan.add_argument('--out', default='.', help='folder where the reports are created (default: current folder)')
+    scan.add_argument('--format', dest='formats', type=parse_formats, default=list(DEFAULT_FORMATS),
+                      help='comma separated report formats: pdf, csv, json (saved catalog for diff) (default: pdf,csv)')
+    scan.add_argument('--renderer', choices=RENDERERS, default='matplotlib',
+                      help='PDF table renderer: matplotlib or the much faster native one (default: matplotlib)')
+    add_coverage_options(scan)
+    scan.add_argument('--jobs', type=int, default=1,
+                      help='worker processes rendering matplotlib PDF pages (needs pypdf, default: 1)')
+    scan.add_argument('--stats', action='store_true',
+                      help='collect file count and size of every LOD folder (Extended columns and Storage_<eam>.csv)')
+    scan.add_argument('--label-stats', action='store_true',
+                      help='count the statements and rows of every SQL label file (Labels_<eam>.csv with --format csv)')
+    scan.add_argument('--export', dest='exports', type=parse_exports, default=[],
+                      help='comma separated exports written during the scan: jsonl, csv, parquet (needs pyarrow)')
+    scan.add_argument('--catalog-db', metavar='CATALOG.sqlite', help='also store the scan in this fleet catalog database')
+    add_scan_options(scan)
+    scan.add_argument('--profile', metavar='TRACE.json',
+                      help='write wall time and I/O counts per stage and per dataset to this JSON file')
+    scan.add_argument('--chrome-trace', metavar='TRACE.json',
+                      help='with --profile, also write a Chrome trace-event file (chrome://tracing, Perfetto)')
+    scan.add_argument('-q', '--quiet', action='store_true', help='only print errors')
+
+    watch = commands.add_parser('watch', help='keep the reports of a db folder up to date while it is assembled')
+    watch.add_argument('db_path', help='path to the db folder')
+    watch.add_argument('--out', default='.', help='folder where the reports are created (default: current folder)')
+    watch.add_argument('--format', dest='formats', type=parse_formats, default=list(DEFAULT_FORMATS),
+                       help='comma separated report formats: pdf, csv, json (default: pdf,csv)')
+    watch.add_argument('--renderer', choices=RENDERERS, default='native',
+                       help='PDF table renderer; native only redraws the pages that changed (default: native)')
+    add_coverage_options(watch)
+    watch.add_argument('--export', dest='exports', type=parse_exports, default=[],
+                       help='comma separated exports: jsonl, csv, parquet (needs pyarrow)')
+    watch.add_argument('--catalog-db', metavar='CATALOG.sqlite', help='also keep the disk in this fleet catalog database')
+    watch.add_argument('--interval', type=float, default=1.0,
+                       help='seconds between two looks at the disk when polling (default: 1)')
+    watch.add_argument('--poll', action='store_true', help='poll the disk even where inotify is available')
+    add_scan_options(watch)
+    watch.add_argument('-q', '--quiet', action='store_true', help='only print errors')
+
+    batch = commands.add_parser('batch', help='scan many db folders in parallel and merge their catalogs')
+    batch.add_argument('db_paths', nargs='+', metavar='db_path', help='db folders or glob patterns (z.B. E:\\disks\\*\\db)')
+    batch.add_argument('--out', default='.', help='folder for the fleet catalog and one report folder per disk')
+    batch.add_argument('--format', dest='formats', type=parse_formats, default=['csv'],
+                       help='comma separated report formats per disk: pdf, csv, json (default: csv)')
+    batch.add_argument('--renderer', choices=RENDERERS, default='native',
+                       help='PDF table renderer (default: native)')
+    batch.add_argument('--processes', type=int, default=None,
+                       help='disks scanned at the same time (default: number of CPUs)')
+    batch.add_argument('--catalog-db', metavar='CATALOG.sqlite', help='also store every disk in this fleet catalog database')
+    add_scan_options(batch)
+    batch.add_argument('-q', '--quiet', action='store_true', help='only print errors')
+
+    diff = commands.add_parser('diff', help='list the datasets added, removed or changed between two disks')
+    diff.add_argument('old', help='db folder or saved catalog (Catalog_<eam>.json from scan --format json)')
+    diff.add_argument('new', help='db folder or saved catalog')
+    add_scan_options(diff)
+
+    verify = commands.add_parser('verify', help='checksum all files of the data trees and check them against a manifest')
+    verify.add_argument('db_path', help='path to the db folder')
+    verify.add_argument('--manifest', help='manifest to write (default: Manifest_<eam>.sha256 in --out)')
+    verify.add_argument('--out', default='.', help='folder of the default manifest (default: current folder)')
+    verify.add_argument('--against', help='earlier manifest the disk must match')
+    verify.add_argument('--jobs', type=int, default=DEFAULT_JOBS,
+                        help='files hashed at the same time (default: %d)' % DEFAULT_JOBS)
+    verify.add_argument('--restart', action='store_true', help='ignore the journal of an interrupted run')
+
+    query = commands.add_parser('query', help='list the datasets covering a point, an area or a route')
+    query.add_argument('db_paths', nargs='+', metavar='db_path',
+                       help='one or more db folders or saved catalogs (Catalog_<eam>.json from scan --format json)')
+    where = query.add_mutually_exclusive_group(required=True)
+    where.add_argument('--point', nargs=2, type=float, metavar=('X', 'Y'), help='point (longitude latitude)')
+    where.add_argument('--bbox', nargs=4, type=float, metavar=('XMIN', 'YMIN', 'XMAX', 'YMAX'), help='area')
+    where.add_argument('--route', nargs='+', type=parse_point, metavar='X,Y', help='polyline through the points x,y')
+    query.add_argument('--kind', choices=KINDS, action='append', help='only datasets of this kind (repeatable)')
+    add_scan_options(query)
+
+    search = commands.add_parser('search', help='search the datasets of a fleet catalog database (scan --catalog-db)')
+    search.add_argument('catalog_db', metavar='CATALOG.sqlite', help='fleet catalog database')
+    search.add_argument('--name', help='start of the dataset name (any case)')
+    search.add_argument('--group', help='map.def group')
+    search.add_argument('--type', help='map.def type')
+    search.add_argument('--kind', choices=KINDS, help='only datasets of this kind')
+    search.add_argument('--priority', type=int, help='map.def priority')
+    search.add_argument('--after', metavar='PUBLICATION', help='published after this (z.B. 2018-03)')
+    search.add_argument('--before', metavar='PUBLICATION', help='published before this')
+    search.add_argument('--label', help='part of the name of an SQL label file')
+    search.add_argument('--bbox', nargs=4, type=float, metavar=('XMIN', 'YMIN', 'XMAX', 'YMAX'), help='overlapping this area')
+    search.add_argument('--eam', help='only the disk with this EAM name')
+    search.add_argument('--disks', action='store_true', help='only list the disks with matching datasets')
+    return parser
+
+
+def open_cache(db_path, cache_dir=None, rebuild=False):
+    '''Return the ScanCache of db_path, or None if it can not be opened.'''
+    try:
+        return ScanCache(cache_path(db_path, cache_dir), rebuild)
+    except (OSError, sqlite3.Error) as e:
+        print('Scan cache not used: ' + str(e), file=sys.stderr)
+        return None
+
+
+def report_map_def_errors(catalog):
+    '''Print the map.def files of catalog that could not be parsed.'''
+    for message in catalog.errors:
+        print('Dataset left out: ' + message, file=sys.stderr)
+
+
+def load_catalog(db_path, args, sinks=()):
+    '''Scan db_path with the --workers and cache options of args.'''
+    use_cache = not args.no_cache and os.path.exists(db_path)
+    cache = open_cache(db_path, args.cache_dir, args.rebuild_cache) if use_cache else None
+    try:
+        catalog = scan_disk(db_path, args.workers, cache, sinks, args.engine)
+    finally:
+        if cache is not None:
+            cache.close()
+    report_map_def_errors(catalog)
+    return catalog
+
+
+def open_catalog(source, args):
+    '''Return the saved catalog at source, or scan source if it is a db folder.'''
+    if os.path.isfile(source):
+        try:
+            return Catalog.load(source)
+        except ValueError:
+            raise DiskError(source + ' is not a saved catalog of this tool.')
+    return load_catalog(source, args)
+
+
+def store_catalogs(path, catalogs):
+    '''Insert or update the catalogs in the fleet catalog database at path.'''
+    try:
+        with CatalogDatabase(path) as database:
+            for catalog in catalogs:
+                database.add_catalog(catalog)
+    except (OSError, sqlite3.Error) as e:
+        raise ReportError('It was not possible to write ' + path + ' (' + str(e) + ').')
+
+
+def report_label_problems(catalog):
+    '''Print the empty, truncated and unreadable label files of catalog.'''
+    seen = set()
+    for d in catalog:
+        for s in d.label_stats or ():
+            if s.status != 'ok' and s.file not in seen:
+                seen.add(s.file)
+                print('Label file ' + s.file + ' is ' + s.status + (' (' + s.error + ')' if s.error else ''),
+                      file=sys.stderr)
+
+
+def cmd_scan(args):
+    if not os.path.isdir(args.out):
+        raise DiskError('Invalid path: ' + args.out)
+    if not args.profile:
+        return scan_and_report(args)
+
+    with Profiler() as profiler:
+        result = scan_and_report(args)
+    profiler.write_json(args.profile)
+    if args.chrome_trace:
+        profiler.write_chrome_trace(args.chrome_trace)
+    if not args.quiet:
+        print('Profile written to ' + args.profile)
+    return result
+
+
+def scan_and_report(args):
+
+    exported = []
+    if args.exports:
+        # the exports are named after the EAM before the scan starts writing them
+        writers = open_writers(args.out, read_eam_name(args.db_path), args.exports, formats=args.formats)
+        try:
+            catalog = load_catalog(args.db_path, args, writers)
+        finally:
+            exported = close_writers(writers)
+    else:
+        catalog = load_catalog(args.db_path, args)
+    if args.stats:
+        collect_storage(catalog.datasets, args.workers)
+    if args.label_stats:
+        collect_label_stats(catalog.datasets, DiskLayout(args.db_path).sql, args.workers)
+        report_label_problems(catalog)
+    if not args.quiet:
+        print('\n' + catalog.eam_name + '\n')
+        print('Number of datasets: ' + str(catalog.counts['raster']) + ' raster, ' + str(catalog.counts['vector'])
+              + ' vector, ' + str(catalog.counts['terrain']) + ' terrain.' + '\n')
+
+    paths = write_outputs(catalog, args) + exported
+    if not args.quiet:
+        for path in paths:
+            print('Created ' + path)
+        peak = peak_rss()
+        if peak is not None:
+            print('Peak memory: ' + format_bytes(peak))
+    return 0
+
+
+def write_outputs(catalog, args, page_cache=None):
+    '''Store catalog in --catalog-db and write its reports; return the created paths.'''
+    if args.catalog_db:
+        store_catalogs(args.catalog_db, [catalog])
+    return write_reports(catalog, args.out, args.formats, args.renderer, getattr(args, 'jobs', 1), page_cache,
+                         args.coverage_maps, DENSITY[args.density])
+
+
+def cmd_watch(args):
+    if not os.path.isdir(args.out):
+        raise DiskError('Invalid path: ' + args.out)
+    if not os.path.isdir(args.db_path):
+        raise DiskError('Invalid path: ' + args.db_path)
+    cache = None if args.no_cache else open_cache(args.db_path, args.cache_dir, args.rebuild_cache)
+    if cache is None:
+        # the watch still needs the signatures of the last scan
+        cache = ScanCache(':memory:')
+    page_cache = {}
+    last = [None]
+
+    def refresh(changed):
+        start = time.time()
+        try:
+            catalog = scan_disk(args.db_path, args.workers, cache, engine=args.engine, changed=changed)
+        except DiskError as e:
+            # the disk may still be empty while it is assembled
+            print(time.strftime('%H:%M:%S ') + str(e), file=sys.stderr)
+            return
+        report_map_def_errors(catalog)
+        state = (catalog.eam_name, [d.to_dict() for d in catalog])
+        if last[0] is not None and state == last[0][1]:
+            return
+        if last[0] is not None and not args.quiet:
+            for line in diff_catalogs(last[0][0], catalog).lines():
+                print(line)
+        paths = write_outputs(catalog, args, page_cache)
+        if args.exports:
+            paths += write_exports(catalog, args.out, args.exports, formats=args.formats)
+        last[0] = (catalog, state)
+        if not args.quiet:
+            print(time.strftime('%H:%M:%S ') + catalog.eam_name + ': ' + str(len(changed)) + ' changed paths, '
+                  + str(len(catalog)) + ' datasets, ' + str(len(paths)) + ' files updated in %.2f s' % (time.time() - start))
+
+    if not args.quiet:
+        print('Watching ' + args.db_path + ' (Ctrl+C to stop)')
+    try:
+        watch_folder(args.db_path, refresh, args.interval, poll=args.poll)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cache.close()
+    return 0
+
+
+def cmd_query(args):
+    matches = 0
+    for db_path in args.db_paths:
+        catalog = open_catalog(db_path, args)
+        found = coverage(catalog, point=args.point, bbox=args.bbox, route=args.route, kinds=args.kind)
+        print(catalog.eam_name + ' (' + db_path + '): ' + str(len(found)) + ' datasets')
+        for d in found:
+            print('  '.join(str(display(v)) for v in (d.kind, d.name, d.priority, d.lod, d.xmin, d.ymin, d.xmax, d.ymax)))
+        matches += len(found)
+    return 0 if matches else 1
+
+
+def cmd_search(args):
+    if not os.path.isfile(args.catalog_db):
+        raise DiskError('Invalid path: ' + args.catalog_db)
+    try:
+        with CatalogDatabase(args.catalog_db) as database:
+            rows = database.search(name=args.name, group=args.group, type=args.type, kind=args.kind,
+                                   priority=args.priority, published_after=args.after, published_before=args.before,
+                                   label=args.label, bbox=args.bbox, eam_name=args.eam)
+    except sqlite3.Error as e:
+        raise DiskError('It was not possible to read ' + args.catalog_db + ' (' + str(e) + ').')
+    if args.disks:
+        disks = {}
+        for row in rows:
+            disks[row[:2]] = disks.get(row[:2], 0) + 1
+        for (eam_name, db_path), count in disks.items():
+            print(eam_name + ' (' + db_path + '): ' + str(count) + ' datasets')
+    else:
+        for row in rows:
+            print('  '.join(str(display(v)) for v in row))
+    return 0 if rows else 1
+
+
+def cmd_batch(args):
+    if not os.path.isdir(args.out):
+        raise DiskError('Invalid path: ' + args.out)
+    db_paths = expand_paths(args.db_paths)
+    if not db_paths:
+        raise DiskError('No db folder matches ' + ' '.join(args.db_paths))
+
+    results = scan_fleet(db_paths, args.out, args.formats, args.renderer, args.processes, args.workers,
+                         args.cache_dir, not args.no_cache, args.rebuild_cache, args.engine)
+    failed = 0
+    for result in results:
+        if result.error is not None:
+            failed += 1
+            print(result.db_path + ': ' + result.error, file=sys.stderr)
+            continue
+        report_map_def_errors(result.catalog)
+        if not args.quiet:
+            print(result.catalog.eam_name + ' (' + result.db_path + '): ' + str(len(result.catalog)) + ' datasets')
+
+    catalogs = fleet_catalogs(results)
+    if args.catalog_db:
+        store_catalogs(args.catalog_db, catalogs.values())
+    path = write_fleet_csv(catalogs, os.path.join(args.out, 'Fleet_catalog.csv'))
+    if not args.quiet:
+        print('Created ' + path)
+    return 1 if failed else 0
+
+
+def cmd_diff(args):
+    difference = diff_catalogs(open_catalog(args.old, args), open_catalog(args.new, args))
+    for line in difference.lines():
+        print(line)
+    return 1 if difference else 0
+
+
+def cmd_verify(args):
+    manifest = args.manifest or report_path(args.out, 'Manifest', read_eam_name(args.db_path), 'sha256')
+    errors = {}
+    try:
+        hashes = build_manifest(args.db_path, manifest, args.jobs, not args.restart, errors=errors)
+    except (IOError, OSError) as e:
+        raise ReportError('It was not possible to write ' + manifest + ' (' + str(e) + ').')
+    unreadable = sorted(name for name, digest in hashes.items() if digest == UNREADABLE)
+    hashes = dict((name, digest) for name, digest in hashes.items() if digest != UNREADABLE)
+    print(str(len(hashes)) + ' files hashed into ' + manifest)
+    for name in unreadable:
+        print('UNREADABLE  ' + name + (' (' + errors[name] + ')' if name in errors else ''))
+
+    result = 0
+    if unreadable:
+        print(str(len(unreadable)) + ' files could not be read (the disk may be damaged)', file=sys.stderr)
+        result = 1
+    if args.against:
+        try:
+            expected = read_manifest(args.against)
+        except (IOError, OSError, ValueError) as e:
+            raise DiskError('It was not possible to read the manifest ' + args.against + ' (' + str(e) + ').')
+        missing, extra, mismatched = compare_manifests(expected, hashes)
+        # unreadable files are on the disk, they are listed above and not as missing
+        missing = [name for name in missing if name not in unreadable]
+        for name in missing:
+            print('MISSING  ' + name)
+        for name in extra:
+            print('EXTRA    ' + name)
+        for name in mismatched:
+            print('CHANGED  ' + name)
+        print('%d missing, %d extra, %d changed, %d unreadable' % (len(missing), len(extra), len(mismatched),
+                                                                   len(unreadable)))
+        if missing or extra or mismatched:
+            result = 1
+    return result
+
+
+COMMANDS = {'scan': cmd_scan, 'watch': cmd_watch, 'query': cmd_query, 'search': cmd_search, 'batch': cmd_batch,
+            'diff': cmd_diff, 'verify': cmd_verify}
+
+
+def interactive():
+    if os.name == 'nt':
+        os.system('cls')
+    print('\n' + 'Script running on Python ' + sys.version[0])
+
+    db_path = input('\n' + 'Please type path to db folder (for example D:\\db): ')
+    output_folder = input('\n' + 'Please type path where pdf files should be created: ')
+    try:
+        cmd_scan(build_parser().parse_args(['scan', db_path, '--out', output_folder]))
+        print('\n' + 'Do not forget to remove the EN7 Drive with safely remove!!!' + '\n')
+    except (DiskError, ReportError) as e:
+        print(e)
+    input('Press ENTER to exit.')
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        interactive()
+        return 0
+
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        build_parser().print_help()
+        return 2
+
+    try:
+        return COMMANDS[args.command](args) or 0
+    except (DiskError, ReportError) as e:
+        print(e, file=sys.stderr)
+        return 1
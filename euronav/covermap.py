@@ -0,0 +1,178 @@
+'''
+Coverage map of a Catalog.
+
+Every dataset with a bounding box is drawn as a box coloured by its TYPE,
+in the row colours of the report tables. The map is the first page of
+Extended_<eam>.pdf and can be written alone as Coverage_<eam>.png/.svg.
+
+The boxes of one TYPE form one layer, drawn by matplotlib as one
+PolyCollection and by the native renderer (euronav.pdftable) as one path
+that is filled and stroked once, so thousands of overlapping boxes cost
+little more than a few. On dense disks a density grid is drawn under the
+boxes: the number of boxes covering each cell, counted with numpy and
+drawn as a raster image, which still shows where the data is once the
+boxes merge into one area. The boxes are then only outlined, so that
+their fills do not hide the grid.
+'''
+from .pdftable import FILL_ALPHA
+
+# with at least this many boxes the density grid is drawn when numpy is available
+DENSITY_BOXES = 2000
+# cells of the density grid along the longer side of the map
+DENSITY_CELLS = 256
+
+EDGE_SHADE = 0.55
+
+# drawn when the catalog has no bounding boxes
+WORLD = (-180.0, -90.0, 180.0, 90.0)
+
+
+def edge_colour(colour):
+    '''Return the darker shade of '#RRGGBB' colour used for the outlines.'''
+    colour = colour.lstrip('#')
+    return '#' + ''.join('%02X' % int(int(colour[i:i + 2], 16) * EDGE_SHADE) for i in (0, 2, 4))
+
+
+class CoverageMap(object):
+    '''Boxes (xmin, ymin, xmax, ymax) of a catalog in layers, ready to be drawn.
+
+    layers is a list of (TYPE, colour, edge colour, boxes), the layer with
+    the biggest boxes first; grid is None or the numpy density grid over
+    bounds (row 0 at ymin).
+    '''
+
+    def __init__(self, title, layers, bounds, grid=None):
+        self.title = title
+        self.layers = layers
+        self.bounds = bounds
+        self.grid = grid
+
+    def __len__(self):
+        return sum(len(boxes) for label, colour, edge, boxes in self.layers)
+
+
+def coverage_layers(catalog, colours):
+    '''Group the bounding boxes of catalog by TYPE; return the layers of a CoverageMap.
+
+    colours maps a TYPE to its colour; a TYPE without a colour is drawn in
+    the colour (and layer) of the dataset kind.
+    '''
+    layers = {}
+    for d in catalog:
+        if not d.has_bbox():
+            continue
+        label = d.type if d.type in colours else d.kind
+        layers.setdefault(label, []).append((min(d.xmin, d.xmax), min(d.ymin, d.ymax),
+                                             max(d.xmin, d.xmax), max(d.ymin, d.ymax)))
+
+    def mean_area(boxes):
+        return sum((b[2] - b[0]) * (b[3] - b[1]) for b in boxes) / len(boxes)
+
+    # big boxes (raster overviews) below small ones
+    return [(label, colours[label], edge_colour(colours[label]), boxes)
+            for label, boxes in sorted(layers.items(), key=lambda item: (-mean_area(item[1]), item[0]))]
+
+
+def coverage_bounds(layers, margin=0.02):
+    '''Return the union of all boxes, widened by margin of its size on every side.'''
+    boxes = [b for label, colour, edge, layer in layers for b in layer]
+    if not boxes:
+        return WORLD
+    x0 = min(b[0] for b in boxes)
+    y0 = min(b[1] for b in boxes)
+    x1 = max(b[2] for b in boxes)
+    y1 = max(b[3] for b in boxes)
+    dx = (x1 - x0) * margin or 1.0
+    dy = (y1 - y0) * margin or 1.0
+    return (x0 - dx, y0 - dy, x1 + dx, y1 + dy)
+
+
+def grid_shape(bounds, cells=DENSITY_CELLS):
+    '''Return (columns, rows) of a grid with square cells and cells along the longer side.'''
+    width = bounds[2] - bounds[0]
+    height = bounds[3] - bounds[1]
+    if width >= height:
+        return cells, max(1, int(round(cells * height / width)))
+    return max(1, int(round(cells * width / height))), cells
+
+
+def density_grid(boxes, bounds, cells=DENSITY_CELLS):
+    '''Return a numpy array (rows, columns) with the number of boxes covering every cell.
+
+    Every box adds +1/-1 at the four corners of its cell range in a
+    difference grid; the running sums along both axes turn it into the
+    counts, so the cost does not depend on the size of the boxes.
+    '''
+    import numpy as np
+
+    nx, ny = grid_shape(bounds, cells)
+    x0, y0, x1, y1 = bounds
+    counts = np.zeros((ny + 1, nx + 1), dtype=np.int32)
+    if len(boxes):
+        b = np.asarray(boxes, dtype=float)
+        sx = nx / (x1 - x0)
+        sy = ny / (y1 - y0)
+        i0 = np.clip(np.floor((b[:, 0] - x0) * sx).astype(int), 0, nx - 1)
+        i1 = np.clip(np.floor((b[:, 2] - x0) * sx).astype(int), 0, nx - 1) + 1
+        j0 = np.clip(np.floor((b[:, 1] - y0) * sy).astype(int), 0, ny - 1)
+        j1 = np.clip(np.floor((b[:, 3] - y0) * sy).astype(int), 0, ny - 1) + 1
+        np.add.at(counts, (j0, i0), 1)
+        np.add.at(counts, (j0, i1), -1)
+        np.add.at(counts, (j1, i0), -1)
+        np.add.at(counts, (j1, i1), 1)
+    return counts.cumsum(axis=0).cumsum(axis=1)[:ny, :nx]
+
+
+def has_numpy():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def coverage_map(catalog, colours, title, density=None):
+    '''Return the CoverageMap of catalog.
+
+    density: True draws the density grid (needs numpy, ImportError
+    otherwise), False never, None on disks with DENSITY_BOXES boxes or more
+    when numpy is available.
+    '''
+    layers = coverage_layers(catalog, colours)
+    bounds = coverage_bounds(layers)
+    boxes = [b for label, colour, edge, layer in layers for b in layer]
+    if density is None:
+        density = len(boxes) >= DENSITY_BOXES and has_numpy()
+    grid = density_grid(boxes, bounds) if density else None
+    return CoverageMap(title, layers, bounds, grid)
+
+
+def coverage_figure(plt, cmap, figsize=None):
+    '''Draw cmap (a CoverageMap) into a new matplotlib figure and return it.'''
+    from matplotlib.collections import PolyCollection
+    from matplotlib.colors import to_rgba
+    from matplotlib.patches import Patch
+
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.set_title(cmap.title + '\n', fontsize=10)
+    x0, y0, x1, y1 = cmap.bounds
+    handles = []
+    for label, colour, edge, boxes in cmap.layers:
+        ax.add_collection(PolyCollection([((a, b), (c, b), (c, d), (a, d)) for a, b, c, d in boxes],
+                                         facecolors=to_rgba(colour, FILL_ALPHA if cmap.grid is None else 0.0),
+                                         edgecolors=edge, linewidths=0.4, zorder=1))
+        handles.append(Patch(facecolor=colour, edgecolor=edge, label='%s (%d)' % (label, len(boxes))))
+    if cmap.grid is not None:
+        import numpy as np
+        ax.imshow(np.ma.masked_equal(cmap.grid, 0), origin='lower', extent=(x0, x1, y0, y1), cmap='Greys', vmin=0,
+                  alpha=0.6, interpolation='nearest', aspect='auto', zorder=0)
+        handles.append(Patch(facecolor='#808080', label='density (max %d)' % cmap.grid.max()))
+    ax.set_xlim(x0, x1)
+    ax.set_ylim(y0, y1)
+    ax.set_aspect('equal', adjustable='box')
+    ax.grid(linewidth=0.3, color='#C8C8C8')
+    ax.tick_params(labelsize=6)
+    if handles:
+        ax.legend(handles=handles, fontsize=6, loc='upper left', bbox_to_anchor=(1.01, 1.0), borderaxespad=0.0)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,82 @@
+'''
+Differences between two catalogs of a disk.
+
+Datasets are matched by kind and folder name. Matching datasets are first
+compared by fingerprint (a hash of their compared fields); only datasets
+with different fingerprints are compared field by field. The fingerprint
+is computed from the fields of both catalogs: the one written into saved
+catalogs is for other tools and is not read back, so a catalog saved
+before Dataset.COMPARED_FIELDS changed still compares correctly.
+'''
+from .catalog import Dataset
+
+
+class DatasetChange(object):
+    '''A dataset present in both catalogs with different fields.'''
+
+    def __init__(self, kind, dirname, changes):
+        self.kind = kind
+        self.dirname = dirname
+        # [(field, old value, new value)]
+        self.changes = changes
+
+    def fields(self):
+        return [field for field, old, new in self.changes]
+
+    def __repr__(self):
+        return 'DatasetChange(%r, %r, %r)' % (self.kind, self.dirname, self.fields())
+
+
+class CatalogDiff(object):
+    '''Datasets added, removed and changed from an old to a new catalog.'''
+
+    def __init__(self, old, new, added, removed, changed):
+        self.old = old
+        self.new = new
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    __nonzero__ = __bool__
+
+    def lines(self):
+        '''Return the differences as text lines.'''
+        lines = ['--- ' + self.old.eam_name + ' (' + str(self.old.db_path) + ')',
+                 '+++ ' + self.new.eam_name + ' (' + str(self.new.db_path) + ')']
+        for d in self.removed:
+            lines.append('- ' + d.kind + '/' + d.dirname)
+        for d in self.added:
+            lines.append('+ ' + d.kind + '/' + d.dirname)
+        for change in self.changed:
+            lines.append('~ ' + change.kind + '/' + change.dirname)
+            for field, old, new in change.changes:
+                lines.append('    ' + field + ': ' + repr(old) + ' -> ' + repr(new))
+        lines.append('%d added, %d removed, %d changed' % (len(self.added), len(self.removed), len(self.changed)))
+        return lines
+
+
+def _fingerprints(catalog):
+    return dict(((d.kind, d.dirname), d.fingerprint()) for d in catalog)
+
+
+def diff_catalogs(old, new):
+    '''Return the CatalogDiff from catalog old to catalog new.'''
+    old_datasets = dict(((d.kind, d.dirname), d) for d in old)
+    new_datasets = dict(((d.kind, d.dirname), d) for d in new)
+    old_fingerprints = _fingerprints(old)
+    new_fingerprints = _fingerprints(new)
+
+    added = [d for key, d in new_datasets.items() if key not in old_datasets]
+    removed = [d for key, d in old_datasets.items() if key not in new_datasets]
+    changed = []
+    for key, d in new_datasets.items():
+        if key not in old_datasets or old_fingerprints[key] == new_fingerprints[key]:
+            continue
+        before = old_datasets[key]
+        changes = [(field, getattr(before, field), getattr(d, field)) for field in Dataset.COMPARED_FIELDS
+                   if getattr(before, field) != getattr(d, field)]
+        changed.append(DatasetChange(d.kind, d.dirname, changes))
+    return CatalogDiff(old, new, added, removed, changed)
@@ -0,0 +1,57 @@
+'''
+Layout of a Euronav db folder.
+
+A db folder holds the datasets either directly (db/vector, db/raster,
+db/terrain, db/SQL) or one level down in db/data. The EAM name of the disk
+is read from EuroNavMedia.ini.
+'''
+import os
+
+from . import instrument
+
+KINDS = ('vector', 'raster', 'terrain')
+
+UNKNOWN_EAM_NAME = 'X.XX.XX'
+
+
+class DiskError(Exception):
+    '''Raised when a path is not a usable Euronav db folder.'''
+
+
+class DiskLayout(object):
+    '''Paths of the vector, raster, terrain and SQL trees of one db folder.'''
+
+    def __init__(self, db_path):
+        if not os.path.exists(db_path):
+            raise DiskError('Invalid path: ' + db_path)
+
+        self.db_path = db_path
+
+        if os.path.exists(os.path.join(db_path, 'vector')) or os.path.exists(os.path.join(db_path, 'raster')) or os.path.exists(os.path.join(db_path, 'terrain')):
+            data = db_path
+        else:
+            data = os.path.join(db_path, 'data')
+
+        self.vector = os.path.join(data, 'vector')
+        self.raster = os.path.join(data, 'raster')
+        self.terrain = os.path.join(data, 'terrain')
+        self.sql = os.path.join(data, 'SQL')
+
+    def tree(self, kind):
+        '''Return the folder holding the datasets of the given kind.'''
+        return getattr(self, kind)
+
+
+def read_eam_name(db_path):
+    '''Return the EAM_Name from EuroNavMedia.ini, or X.XX.XX if unknown.'''
+    eam_name = UNKNOWN_EAM_NAME
+    try:
+        with open(os.path.join(db_path, 'EuroNavMedia.ini')) as f:
+            instrument.add(instrument.FILES_OPENED)
+            for l in f:
+                instrument.add(instrument.BYTES_READ, len(l))
+                if 'EAM_Name' in l:
+                    eam_name = l[len('EAM_Name') + 1:].rstrip('\r\n')
+    except (IOError, OSError, UnicodeDecodeError):
+        pass
+    return eam_name
@@ -0,0 +1,229 @@
+'''
+Machine-readable exports written while the disk is scanned.
+
+scan_disk passes every dataset to the write() method of its sinks as soon
+as it (and every dataset before it) is scanned, so the files grow during
+the scan and can be read before it ends:
+
+    Extended_<eam>.jsonl     one JSON object per dataset
+    Extended_<eam>.csv       ';' separated, EXPORT_FIELDS header
+    Extended_<eam>.parquet   one row group per chunk (needs pyarrow)
+    Overview_<eam>.csv       same layout as the Overview report csv
+
+All Extended exports share the schema EXPORT_FIELDS with raw values
+(numbers stay numbers, missing values are null/empty), unlike the rounded
+'--' cells of the PDFs. Rows are buffered in chunks of chunk_rows and
+written (and flushed) a chunk at a time. A series of the Overview is only
+complete once the last dataset is scanned, so the Overview writer keeps the
+datasets and groups them (euronav.series) when it is closed, like the
+Overview report.
+'''
+import abc
+import csv
+import json
+
+from . import instrument
+from .report import OVERVIEW_COLUMNS, ReportError, overview_rows, report_path
+
+# (field, Arrow type) of every exported dataset record
+EXPORT_FIELDS = (('kind', 'string'), ('dataset', 'string'), ('type', 'string'), ('name', 'string'),
+                 ('group', 'string'), ('priority', 'int64'), ('category', 'string'), ('publication', 'string'),
+                 ('lod', 'int64'), ('sql', 'bool_'), ('xmin', 'float64'), ('xmax', 'float64'),
+                 ('ymin', 'float64'), ('ymax', 'float64'), ('labels', 'int64'))
+
+EXPORTS = ('jsonl', 'csv', 'parquet')
+
+CHUNK_ROWS = 1000
+
+
+def export_record(dataset):
+    '''Return the values of dataset in EXPORT_FIELDS order.'''
+    d = dataset
+    return (d.kind, d.dirname, d.type, d.name, d.group, d.priority, d.category, d.publication,
+            d.lod, d.sql == 'yes', d.xmin, d.xmax, d.ymin, d.ymax, len(d.labels or ()))
+
+
+class ExportWriter(abc.ABC):
+    '''Buffers records and writes them chunk_rows at a time; subclasses implement _open and _write_chunk.'''
+
+    prefix = 'Extended'
+    extension = None
+    # the report format (--format) writing the same file, if any
+    report_format = None
+
+    def __init__(self, out_dir, eam_name, chunk_rows=CHUNK_ROWS):
+        self.path = report_path(out_dir, self.prefix, eam_name, self.extension)
+        self.chunk_rows = max(1, chunk_rows)
+        self.rows = 0
+        self._chunk = []
+        self._file = None
+        try:
+            self._open()
+        except (IOError, OSError) as e:
+            raise ReportError('It was not possible to write ' + self.path + ' (' + str(e) + ').')
+
+    def write(self, dataset):
+        self._chunk.append(export_record(dataset))
+        if len(self._chunk) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._chunk:
+            return
+        try:
+            with instrument.span('export ' + self.extension):
+                self._write_chunk(self._chunk)
+        except (IOError, OSError) as e:
+            raise ReportError('It was not possible to write ' + self.path + ' (' + str(e) + ').')
+        self.rows += len(self._chunk)
+        self._chunk = []
+
+    def close(self):
+        '''Write the last chunk, close the file and return its path.'''
+        try:
+            self.flush()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @abc.abstractmethod
+    def _open(self):
+        '''Open self.path; sets self._file if close() is to close it.'''
+
+    @abc.abstractmethod
+    def _write_chunk(self, records):
+        '''Write and flush a list of records.'''
+
+
+class JsonLinesWriter(ExportWriter):
+    '''Extended_<eam>.jsonl, one JSON object per dataset.'''
+
+    extension = 'jsonl'
+
+    def _open(self):
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._names = [name for name, _ in EXPORT_FIELDS]
+
+    def _write_chunk(self, records):
+        self._file.write(''.join(json.dumps(dict(zip(self._names, r)), ensure_ascii=False) + '\n'
+                                 for r in records))
+        self._file.flush()
+
+
+class CsvWriter(ExportWriter):
+    '''Extended_<eam>.csv, ';' separated with a header of the EXPORT_FIELDS names.'''
+
+    extension = 'csv'
+
+    def _open(self):
+        self._file = open(self.path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file, delimiter=';')
+        self._writer.writerow([name for name, _ in EXPORT_FIELDS])
+
+    def _write_chunk(self, records):
+        self._writer.writerows(['' if v is None else v for v in r] for r in records)
+        self._file.flush()
+
+
+class ParquetWriter(ExportWriter):
+    '''Extended_<eam>.parquet with the EXPORT_FIELDS schema, one row group per chunk.'''
+
+    extension = 'parquet'
+
+    def _open(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ReportError('The parquet export needs pyarrow (python -mpip install -U pyarrow).')
+        self._pa = pa
+        self._schema = pa.schema([(name, getattr(pa, arrow_type)()) for name, arrow_type in EXPORT_FIELDS])
+        self._file = pq.ParquetWriter(self.path, self._schema)
+
+    def _write_chunk(self, records):
+        columns = [list(c) for c in zip(*records)]
+        self._file.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(c, type=f.type) for c, f in zip(columns, self._schema)], schema=self._schema))
+
+
+class OverviewCsvWriter(ExportWriter):
+    '''Overview_<eam>.csv, written when closed since a series may continue until the last dataset.'''
+
+    prefix = 'Overview'
+    extension = 'csv'
+    report_format = 'csv'
+
+    def _open(self):
+        self._datasets = []
+        self._file = open(self.path, 'w', newline='')
+        self._writer = csv.writer(self._file, delimiter=';')
+        self._writer.writerow(('',) + OVERVIEW_COLUMNS)
+
+    def write(self, dataset):
+        self._datasets.append(dataset)
+
+    def close(self):
+        for kind, row in overview_rows(self._datasets):
+            self._chunk.append([self.rows + len(self._chunk)] + row)
+            if len(self._chunk) >= self.chunk_rows:
+                self.flush()
+        self._datasets = []
+        return ExportWriter.close(self)
+
+    def _write_chunk(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+
+WRITERS = {'jsonl': (JsonLinesWriter,), 'csv': (CsvWriter, OverviewCsvWriter), 'parquet': (ParquetWriter,)}
+
+
+def open_writers(out_dir, eam_name, exports, chunk_rows=CHUNK_ROWS, formats=()):
+    '''Return the open writers of the exports (names of EXPORTS), to be passed to scan_disk as sinks.
+
+    Writers of a file that one of the report formats writes anyway are left out.
+    '''
+    writers = []
+    try:
+        for name in exports:
+            for cls in WRITERS[name]:
+                if cls.report_format is None or cls.report_format not in formats:
+                    writers.append(cls(out_dir, eam_name, chunk_rows))
+    except ReportError:
+        close_writers(writers)
+        raise
+    return writers
+
+
+def close_writers(writers):
+    '''Close all writers and return their paths.'''
+    paths = []
+    error = None
+    for writer in writers:
+        try:
+            paths.append(writer.close())
+        except ReportError as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return paths
+
+
+def write_exports(catalog, out_dir, exports, chunk_rows=CHUNK_ROWS, formats=()):
+    '''Write the exports of an already scanned catalog and return their paths (formats as in open_writers).'''
+    writers = open_writers(out_dir, catalog.eam_name, exports, chunk_rows, formats)
+    try:
+        for dataset in catalog:
+            for writer in writers:
+                writer.write(dataset)
+    finally:
+        paths = close_writers(writers)
+    return paths
@@ -0,0 +1,128 @@
+'''
+Batch scanning of many disks.
+
+scan_fleet() scans a list of db folders in worker processes (one disk per
+worker at a time), writes the reports of every disk into its own folder
+and returns the catalogs keyed by EAM name. write_fleet_csv() merges them
+into one ';' separated table with the EAM name and db path in front of
+the Extended columns.
+'''
+import csv
+import glob
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from .cache import ScanCache, cache_path
+from .catalog import EXTENDED_COLUMNS, scan_disk
+from .disk import DiskError, read_eam_name
+from .report import DEFAULT_FORMATS, ReportError, write_reports
+from .walker import DEFAULT_WORKERS
+
+FLEET_COLUMNS = ('EAM', 'DB_PATH', 'KIND') + EXTENDED_COLUMNS
+
+
+def expand_paths(patterns):
+    '''Expand glob patterns (also on Windows, where the shell does not) into db folders.'''
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def output_folders(db_paths, out_dir):
+    '''Return one report folder per db folder, named after its EAM name (made unique).'''
+    folders = []
+    used = set()
+    for db_path in db_paths:
+        name = read_eam_name(db_path)
+        folder, n = name, 1
+        while folder in used:
+            n += 1
+            folder = name + '_' + str(n)
+        used.add(folder)
+        folders.append(os.path.join(out_dir, folder))
+    return folders
+
+
+class DiskResult(object):
+    '''Outcome of scanning one disk of a batch.'''
+
+    def __init__(self, db_path, catalog=None, paths=(), error=None):
+        self.db_path = db_path
+        self.catalog = catalog
+        self.paths = list(paths)
+        self.error = error
+
+
+def scan_one(job):
+    '''Scan one disk and write its reports (run in a worker process).'''
+    db_path, out_dir, formats, renderer, workers, cache_dir, use_cache, rebuild_cache, engine = job
+    cache = None
+    try:
+        if use_cache and os.path.exists(db_path):
+            try:
+                cache = ScanCache(cache_path(db_path, cache_dir), rebuild_cache)
+            except (OSError, sqlite3.Error):
+                cache = None
+        catalog = scan_disk(db_path, workers, cache, engine=engine)
+        paths = []
+        if formats:
+            if not os.path.isdir(out_dir):
+                os.makedirs(out_dir)
+            paths = write_reports(catalog, out_dir, formats, renderer)
+        return DiskResult(db_path, catalog, paths)
+    except (DiskError, ReportError, OSError) as e:
+        return DiskResult(db_path, error=str(e))
+    except Exception as e:
+        # an unexpected failure of one disk must not end the batch
+        return DiskResult(db_path, error=type(e).__name__ + ': ' + str(e))
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def scan_fleet(db_paths, out_dir, formats=DEFAULT_FORMATS, renderer='matplotlib', processes=None, workers=DEFAULT_WORKERS,
+               cache_dir=None, use_cache=True, rebuild_cache=False, engine='threads'):
+    '''Scan the db folders on up to processes worker processes.
+
+    Returns the DiskResults in db_paths order; the reports of each disk go
+    into out_dir/<EAM name>.
+    '''
+    folders = output_folders(db_paths, out_dir)
+    jobs = [(db_path, folder, formats, renderer, workers, cache_dir, use_cache, rebuild_cache, engine)
+            for db_path, folder in zip(db_paths, folders)]
+    if processes == 1 or len(jobs) <= 1:
+        return [scan_one(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(scan_one, jobs))
+
+
+def fleet_catalogs(results):
+    '''Return {EAM name: Catalog} of the disks scanned without error.'''
+    catalogs = {}
+    for result in results:
+        if result.catalog is not None:
+            name, n = result.catalog.eam_name, 1
+            while name in catalogs:
+                n += 1
+                name = result.catalog.eam_name + '_' + str(n)
+            catalogs[name] = result.catalog
+    return catalogs
+
+
+def write_fleet_csv(catalogs, path):
+    '''Write all datasets of {EAM name: Catalog} into one ';' separated table.'''
+    try:
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(FLEET_COLUMNS)
+            for eam_name, catalog in catalogs.items():
+                for d in catalog:
+                    writer.writerow([eam_name, catalog.db_path, d.kind] + d.extended_row())
+    except (IOError, OSError) as e:
+        raise ReportError('It was not possible to write ' + path + ' (' + str(e) + ').')
+    return path
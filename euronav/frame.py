@@ -0,0 +1,63 @@
+'''
+Typed columnar form of a Catalog.
+
+The Extended table as a pandas DataFrame with one dtype per column instead
+of object columns mixing numbers and '--':
+
+    TYPE, GROUP, CATEG., PUBLIC., KIND  category
+    NAME                                str
+    PRIO.                               Int64 (nullable)
+    LOD                                 int64
+    SQL                                 bool
+    XMIN, XMAX, YMIN, YMAX              float64, NaN if missing
+
+The bounding boxes are also available as a plain (n, 4) float64 NumPy
+array (bounds_array), which is what the DataFrame columns are built from.
+'''
+from .disk import KINDS
+
+FRAME_COLUMNS = ('TYPE', 'NAME', 'GROUP', 'PRIO.', 'CATEG.', 'PUBLIC.', 'LOD', 'SQL',
+                 'XMIN', 'XMAX', 'YMIN', 'YMAX', 'KIND')
+
+# column order of bounds_array
+BOUNDS_COLUMNS = ('XMIN', 'XMAX', 'YMIN', 'YMAX')
+
+
+def bounds_array(datasets):
+    '''Return the bounding boxes as (n, 4) float64 array [xmin, xmax, ymin, ymax], NaN if missing.'''
+    import numpy as np
+
+    nan = float('nan')
+    flat = []
+    for d in datasets:
+        flat.extend((nan if d.xmin is None else d.xmin, nan if d.xmax is None else d.xmax,
+                     nan if d.ymin is None else d.ymin, nan if d.ymax is None else d.ymax))
+    return np.array(flat, dtype=np.float64).reshape(-1, 4)
+
+
+def catalog_frame(datasets, bounds=None):
+    '''Return the typed DataFrame of datasets (see the module docstring).'''
+    import numpy as np
+    import pandas as pd
+
+    if bounds is None:
+        bounds = bounds_array(datasets)
+    n = len(datasets)
+
+    def categorical(values, categories=None):
+        return pd.Categorical(values, categories=categories)
+
+    columns = {
+        'TYPE': categorical([d.type for d in datasets]),
+        'NAME': pd.array([d.name for d in datasets], dtype=object),
+        'GROUP': categorical([d.group for d in datasets]),
+        'PRIO.': pd.array([d.priority for d in datasets], dtype='Int64'),
+        'CATEG.': categorical([d.category for d in datasets]),
+        'PUBLIC.': categorical([d.publication for d in datasets]),
+        'LOD': np.fromiter((d.lod for d in datasets), dtype=np.int64, count=n),
+        'SQL': np.fromiter((d.sql == 'yes' for d in datasets), dtype=bool, count=n),
+        'KIND': categorical([d.kind for d in datasets], KINDS),
+    }
+    for i, column in enumerate(BOUNDS_COLUMNS):
+        columns[column] = bounds[:, i]
+    return pd.DataFrame(columns, columns=list(FRAME_COLUMNS))
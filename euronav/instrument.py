@@ -0,0 +1,180 @@
+'''
+Stage timing and I/O counters (scan --profile).
+
+Code marks pipeline stages with span() and counts I/O with add():
+
+    with instrument.span('parse map.def', dataset='vector/rus_100k_nat_2'):
+        ...
+        instrument.add('files opened')
+
+Both are no-ops costing one global lookup while no Profiler is active.
+With a Profiler active, every span records its wall time and the counters
+added by its thread while it was the innermost span. Work handed to other
+threads counts toward the span that handed it out when the thread runs it
+inside within(span) (walker.iter_ordered does this for its jobs). The Profiler then
+writes a JSON summary per stage and per dataset and, optionally, a Chrome
+trace-event file (chrome://tracing, Perfetto).
+'''
+import json
+import os
+import threading
+import time
+
+FILES_OPENED = 'files opened'
+BYTES_READ = 'bytes read'
+DIR_ENTRIES = 'dir entries listed'
+
+# the Profiler of the running command, None when profiling is off
+active = None
+
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage, dataset=None):
+    '''Return a context manager timing stage (and dataset) when profiling, else a no-op.'''
+    if active is None:
+        return _NULL_SPAN
+    return _Span(active, stage, dataset)
+
+
+def add(counter, n=1):
+    '''Add n to counter of the innermost span of this thread when profiling.'''
+    if active is not None:
+        active.add(counter, n)
+
+
+def current():
+    '''Return the innermost span of this thread (None when not profiling or outside of all spans).'''
+    if active is None:
+        return None
+    stack = active._stack()
+    return stack[-1] if stack else None
+
+
+def within(parent):
+    '''Return a context manager making parent, a span of another thread, the innermost span of this one.'''
+    if parent is None or parent.profiler is not active:
+        return _NULL_SPAN
+    return _Within(parent)
+
+
+class _Span(object):
+    __slots__ = ('profiler', 'stage', 'dataset', 'start', 'counters')
+
+    def __init__(self, profiler, stage, dataset):
+        self.profiler = profiler
+        self.stage = stage
+        self.dataset = dataset
+        self.counters = {}
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.profiler._stack().pop()
+        self.profiler._record(self, end)
+        return False
+
+
+class _Within(object):
+    '''Lends a span to a worker thread; it is recorded by the thread that opened it.'''
+
+    __slots__ = ('parent',)
+
+    def __init__(self, parent):
+        self.parent = parent
+
+    def __enter__(self):
+        self.parent.profiler._stack().append(self.parent)
+        return self.parent
+
+    def __exit__(self, exc_type, exc, tb):
+        self.parent.profiler._stack().pop()
+        return False
+
+
+class Profiler(object):
+    '''Collects the spans and counters of one run.'''
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.spans = []
+        self.totals = {}
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def add(self, counter, n=1):
+        stack = self._stack()
+        # a span lent to worker threads (within) is counted into from several threads
+        with self._lock:
+            counters = stack[-1].counters if stack else self.totals
+            counters[counter] = counters.get(counter, 0) + n
+
+    def _record(self, s, end):
+        with self._lock:
+            self.spans.append((s.stage, s.dataset, s.start - self.origin, end - s.start,
+                               threading.current_thread().ident, s.counters))
+            for counter, n in s.counters.items():
+                self.totals[counter] = self.totals.get(counter, 0) + n
+
+    def __enter__(self):
+        global active
+        active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global active
+        active = None
+        return False
+
+    def summary(self):
+        '''Return {'stages': {...}, 'datasets': [...], 'totals': {...}} of the recorded spans.'''
+        stages = {}
+        datasets = []
+        for stage, dataset, start, duration, thread, counters in self.spans:
+            entry = stages.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'counters': {}})
+            entry['calls'] += 1
+            entry['seconds'] += duration
+            for counter, n in counters.items():
+                entry['counters'][counter] = entry['counters'].get(counter, 0) + n
+            if dataset is not None:
+                datasets.append({'dataset': dataset, 'stage': stage, 'seconds': duration, 'counters': counters})
+        datasets.sort(key=lambda d: -d['seconds'])
+        return {'wall_seconds': time.perf_counter() - self.origin, 'stages': stages, 'datasets': datasets,
+                'totals': self.totals}
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=1)
+
+    def write_chrome_trace(self, path):
+        '''Write the spans as Chrome trace events (open in chrome://tracing or Perfetto).'''
+        pid = os.getpid()
+        events = []
+        for stage, dataset, start, duration, thread, counters in self.spans:
+            args = dict(counters)
+            if dataset is not None:
+                args['dataset'] = dataset
+            events.append({'name': stage if dataset is None else stage + ' ' + dataset, 'cat': stage, 'ph': 'X',
+                           'ts': round(start * 1e6, 1), 'dur': round(duration * 1e6, 1), 'pid': pid, 'tid': thread,
+                           'args': args})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
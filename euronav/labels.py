@@ -0,0 +1,113 @@
+'''
+Index of the SQL label files of a disk.
+
+A vector dataset has labels when a file in the SQL folder contains its
+label pattern: JEPP for jepp datasets, REPORTINGPOINTS for reppts datasets
+and the upper case folder name for all others. The SQL folder is listed
+once and all patterns are matched in one pass over the file names with an
+Aho-Corasick automaton, instead of listing the folder again per dataset.
+'''
+import os
+from collections import deque
+
+from . import instrument
+
+
+def label_pattern(dirname):
+    '''Return the substring identifying the label files of a vector dataset.'''
+    lower = dirname.lower()
+    if 'jepp' in lower:
+        return 'JEPP'
+    if 'reppts' in lower:
+        return 'REPORTINGPOINTS'
+    return dirname.upper()
+
+
+class PatternMatcher(object):
+    '''Aho-Corasick automaton reporting which of many patterns occur in a text.'''
+
+    def __init__(self, patterns):
+        self.patterns = []
+        self._numbers = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern):
+        if not pattern or pattern in self._numbers:
+            return
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._numbers[pattern] = len(self.patterns)
+        self._out[node].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text):
+        '''Return the set of pattern numbers occurring in text.'''
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class LabelIndex(object):
+    '''The label files of one SQL folder, listed once.'''
+
+    def __init__(self, sql_dir):
+        self.sql_dir = sql_dir
+        try:
+            self.files = sorted(os.listdir(sql_dir))
+        except OSError:
+            self.files = []
+        instrument.add(instrument.DIR_ENTRIES, len(self.files))
+
+    def match(self, dirnames):
+        '''Return {dirname: [label files]} for the given vector dataset folders.'''
+        patterns = {}
+        for dirname in dirnames:
+            patterns.setdefault(label_pattern(dirname), []).append(dirname)
+
+        matcher = PatternMatcher(patterns)
+        hits = dict((pattern, []) for pattern in matcher.patterns)
+        for label in self.files:
+            for n in matcher.search(label):
+                hits[matcher.patterns[n]].append(label)
+
+        labels = {}
+        for pattern, owners in patterns.items():
+            for dirname in owners:
+                labels[dirname] = hits.get(pattern, [])
+        return labels
+
+    def counts(self, dirnames):
+        '''Return {dirname: number of label files}.'''
+        return dict((dirname, len(files)) for dirname, files in self.match(dirnames).items())
@@ -0,0 +1,226 @@
+'''
+Content statistics of the SQL label files.
+
+An optional pass after the scan (scan --label-stats): every label file
+matched to a vector dataset is read once and its statements are counted,
+with the rows inserted into each table. The label files are the biggest
+files on a disk, so they are never read whole but in blocks of
+BLOCK_SIZE bytes, from a memory map or, where mapping is not possible,
+from the file.
+
+Statements end at a ';' outside quoted strings and -- comments. Every
+block is searched once: one regex substitution removes its strings and
+comments, and the statements are counted in what is left. Only the
+unfinished statement at the end of a block is carried to the next one,
+without its strings, together with whether the block ended inside a
+string or a comment. A statement longer than MAX_STATEMENT, or text
+after the last ';', means the file was cut off (truncated); a file
+without rows is empty. Label files shared by several datasets (JEPP,
+REPORTINGPOINTS) are read once.
+'''
+import mmap
+import os
+import re
+from collections import Counter
+
+from . import instrument
+from .walker import DEFAULT_WORKERS, map_ordered
+
+BLOCK_SIZE = 4 * 1024 * 1024
+# longest statement, without its strings, carried from block to block
+MAX_STATEMENT = 64 * 1024 * 1024
+
+# where a block ends
+CODE = 'code'
+STRING = 'string'
+COMMENT = 'comment'
+
+_STRING = rb"'[^']*(?:''[^']*)*'"
+_STRINGS = re.compile(_STRING)
+_STRINGS_COMMENTS = re.compile(_STRING + rb'|--[^\n]*')
+_STRING_REST = re.compile(rb"[^']*(?:''[^']*)*'")
+# appended to a block before its strings and comments are removed, it is
+# left as _CODE_END, _IN_STRING_END or _IN_COMMENT_END depending on where the block ends
+_SENTINEL = b"'x'z\ny"
+_CODE_END = b' z\ny'
+_IN_STRING_END = b"x'z\ny"
+_IN_COMMENT_END = b' \ny'
+_INSERT_ROWS = rb'\s*(?:INSERT|REPLACE)\s+(?:OR\s+\w+\s+)?INTO\s+["`\[]?([\w.]+)[^(]*?(?:\([^)]*\)\s*)?VALUES\s*\('
+_CREATES = re.compile(rb';\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?["`\[]?([\w.]+)', re.IGNORECASE)
+_INSERT = re.compile(_INSERT_ROWS, re.IGNORECASE)
+_INSERTS = re.compile(b';' + _INSERT_ROWS, re.IGNORECASE)
+_NEXT_ROW = re.compile(rb'\)\s*,\s*\(')
+_NON_SPACE = re.compile(rb'\S')
+
+
+class LabelStats(object):
+    '''Statements and rows of one SQL label file.'''
+
+    __slots__ = ('file', 'bytes', 'statements', 'tables', 'truncated', 'error')
+
+    def __init__(self, file, bytes=0, statements=0, tables=None, truncated=False, error=None):
+        self.file = file
+        self.bytes = bytes
+        self.statements = statements
+        # {table: rows inserted}, tables created without rows count 0
+        self.tables = tables if tables is not None else {}
+        self.truncated = truncated
+        self.error = error
+
+    @property
+    def rows(self):
+        return sum(self.tables.values())
+
+    @property
+    def status(self):
+        '''ok, empty (no rows), truncated (ends inside a statement) or unreadable.'''
+        if self.error is not None:
+            return 'unreadable'
+        if self.truncated:
+            return 'truncated'
+        return 'ok' if self.rows else 'empty'
+
+    def to_dict(self):
+        return {'file': self.file, 'bytes': self.bytes, 'statements': self.statements, 'tables': self.tables,
+                'truncated': self.truncated, 'error': self.error}
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(record['file'], record['bytes'], record['statements'], record['tables'], record['truncated'],
+                   record.get('error'))
+
+    def __repr__(self):
+        return 'LabelStats(%r, statements=%d, rows=%d, %s)' % (self.file, self.statements, self.rows, self.status)
+
+
+def _count(stats, text):
+    '''Count the statements of text: ';' and complete statements, without strings and comments.'''
+    stats.statements += text.count(b';') - 1
+    for table in _CREATES.findall(text):
+        stats.tables.setdefault(table.decode('latin-1'), 0)
+    if _NEXT_ROW.search(text) is None:
+        rows = Counter(_INSERTS.findall(text))
+    else:
+        # rows of the multi-row INSERTs
+        rows = Counter()
+        for statement in text.split(b';'):
+            match = _INSERT.match(statement)
+            if match is not None:
+                rows[match.group(1)] += 1 + len(_NEXT_ROW.findall(statement, match.end()))
+    for table, n in rows.items():
+        table = table.decode('latin-1')
+        stats.tables[table] = stats.tables.get(table, 0) + n
+
+
+class _BlockCounter(object):
+    '''Counts the statements of a label file read in blocks into stats.'''
+
+    def __init__(self, stats, max_statement=MAX_STATEMENT):
+        self.stats = stats
+        self.max_statement = max_statement
+        # where the last block ended
+        self.state = CODE
+        # ';' and the unfinished statement, without its strings and comments
+        self.carry = b';'
+        # quotes and dashes at the end of the last block, the first half of a '' or -- perhaps
+        self.rest = b''
+
+    def feed(self, block, last=False):
+        '''Count the statements ending in block; return False once the file is truncated.'''
+        data = self.rest + block
+        self.rest = b''
+        if not last:
+            end = len(data.rstrip(b"'-"))
+            data, self.rest = data[:end], data[end:]
+        start = 0
+        if self.state == STRING:
+            match = _STRING_REST.match(data) if b"'" in data else None
+            if match is None:
+                return True
+            start = match.end()
+        elif self.state == COMMENT:
+            start = data.find(b'\n')
+            if start < 0:
+                return True
+        data = data[start:] + _SENTINEL
+        text = (_STRINGS_COMMENTS if b'--' in data else _STRINGS).sub(b' ', data)
+        if text.endswith(_IN_STRING_END):
+            self.state = STRING
+            text = text[:-len(_IN_STRING_END)]
+        elif text.endswith(_CODE_END):
+            self.state = CODE
+            text = text[:-len(_CODE_END)]
+        else:
+            self.state = COMMENT
+            text = text[:-len(_IN_COMMENT_END)]
+        end = text.rfind(b';') + 1
+        if end:
+            _count(self.stats, self.carry + text[:end])
+            self.carry = b';' + text[end:]
+        else:
+            self.carry += text
+        if len(self.carry) > self.max_statement:
+            self.stats.truncated = True
+            return False
+        return True
+
+    def close(self):
+        '''Count the end of the file; set stats.truncated if it ends inside a statement.'''
+        if self.rest and not self.feed(b'', last=True):
+            return
+        if self.state == STRING or _NON_SPACE.search(self.carry, 1) is not None:
+            self.stats.truncated = True
+
+
+def _read_blocks(f):
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            return
+        yield block
+
+
+def _mapped_blocks(data):
+    for pos in range(0, len(data), BLOCK_SIZE):
+        yield data[pos:pos + BLOCK_SIZE]
+
+
+def _count_blocks(stats, blocks):
+    counter = _BlockCounter(stats)
+    for block in blocks:
+        instrument.add(instrument.BYTES_READ, len(block))
+        if not counter.feed(block):
+            return
+    counter.close()
+
+
+def label_stats(path):
+    '''Read the label file at path and return its LabelStats.'''
+    stats = LabelStats(os.path.basename(path))
+    try:
+        with open(path, 'rb') as f:
+            instrument.add(instrument.FILES_OPENED)
+            stats.bytes = os.fstat(f.fileno()).st_size
+            if not stats.bytes:
+                return stats
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                _count_blocks(stats, _read_blocks(f))
+            else:
+                try:
+                    _count_blocks(stats, _mapped_blocks(data))
+                finally:
+                    data.close()
+    except (IOError, OSError) as e:
+        stats.error = str(e)
+    return stats
+
+
+def collect_label_stats(datasets, sql_dir, workers=DEFAULT_WORKERS):
+    '''Set dataset.label_stats of every dataset (one LabelStats per label file; [] without labels).'''
+    with instrument.span('label stats'):
+        files = sorted(set(f for d in datasets for f in d.labels or ()))
+        stats = dict(zip(files, map_ordered(lambda f: label_stats(os.path.join(sql_dir, f)), files, workers)))
+        for d in datasets:
+            d.label_stats = [stats[f] for f in d.labels or ()]
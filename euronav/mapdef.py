@@ -0,0 +1,141 @@
+'''
+Parser of map.def files.
+
+A map.def holds one "<key> <value>" pair per line:
+
+    type vector
+    name rus_100k_nat_2
+    group russia
+    priority 3
+    category topo
+    publication 2018-05
+    bbmin 37.5 55.0
+    bbmax 38.0 55.5
+
+Every line is split once into key and value and the key is looked up
+exactly, so values containing a keyword (e.g. a name "typeset") no longer
+end up in the wrong field. Missing keys stay None; keys this parser does
+not know are kept in MapDef.extras.
+'''
+import os
+
+from . import instrument
+
+MAP_DEF = 'map.def'
+
+TEXT_KEYS = ('type', 'name', 'group', 'category', 'publication')
+
+
+class MapDefError(ValueError):
+    '''Raised when a map.def line can not be parsed.'''
+
+    def __init__(self, path, line_number, message):
+        ValueError.__init__(self, '%s:%d: %s' % (path, line_number, message))
+        self.path = path
+        self.line_number = line_number
+
+
+class MapDef(object):
+    '''Content of one map.def.'''
+
+    __slots__ = ('type', 'name', 'group', 'priority', 'category', 'publication',
+                 'xmin', 'ymin', 'xmax', 'ymax', 'extras')
+
+    def __init__(self):
+        self.type = None
+        self.name = None
+        self.group = None
+        self.priority = None
+        self.category = None
+        self.publication = None
+        self.xmin = None
+        self.ymin = None
+        self.xmax = None
+        self.ymax = None
+        self.extras = None
+
+    def has_bbox(self):
+        return None not in (self.xmin, self.ymin, self.xmax, self.ymax)
+
+    def __repr__(self):
+        return 'MapDef(name=%r, type=%r)' % (self.name, self.type)
+
+
+def _point(value, path, line_number, key):
+    parts = value.split()
+    if len(parts) != 2:
+        raise MapDefError(path, line_number, '%s needs two coordinates, got %r' % (key, value))
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        raise MapDefError(path, line_number, 'invalid %s %r' % (key, value))
+
+
+def parse_lines(lines, record=None, path='<map.def>'):
+    '''Fill record (a new MapDef if None) from the lines of a map.def and return it.'''
+    if record is None:
+        record = MapDef()
+    for line_number, line in enumerate(lines, 1):
+        parts = line.split(None, 1)
+        if not parts or parts[0][0] == '#':
+            continue
+        key = parts[0].lower()
+        value = parts[1].strip() if len(parts) > 1 else ''
+
+        if key in TEXT_KEYS:
+            setattr(record, key, value)
+        elif key == 'priority':
+            try:
+                record.priority = int(value)
+            except ValueError:
+                raise MapDefError(path, line_number, 'invalid priority %r' % value)
+        elif key == 'bbmin':
+            record.xmin, record.ymin = _point(value, path, line_number, key)
+        elif key == 'bbmax':
+            record.xmax, record.ymax = _point(value, path, line_number, key)
+        else:
+            if record.extras is None:
+                record.extras = {}
+            record.extras[key] = value
+    return record
+
+
+def read_map_def(path):
+    '''Return the bytes of the map.def file at path.'''
+    with open(path, 'rb') as f:
+        data = f.read()
+    instrument.add(instrument.FILES_OPENED)
+    instrument.add(instrument.BYTES_READ, len(data))
+    return data
+
+
+def parse_data(data, record=None, path='<map.def>'):
+    '''Fill record (a new MapDef if None) from the bytes of a map.def and return it.'''
+    return parse_lines(data.decode('latin-1').splitlines(), record, path)
+
+
+def parse_map_def(path, record=None):
+    '''Parse the map.def at path (a file or a dataset folder) into record.'''
+    try:
+        data = read_map_def(path)
+    except IsADirectoryError:
+        path = os.path.join(path, MAP_DEF)
+        data = read_map_def(path)
+    return parse_data(data, record, path)
+
+
+def parse_many(paths, errors=None):
+    '''Parse many map.def files and return their MapDefs in order.
+
+    Files that can not be read or parsed give None; if errors is a list,
+    the exceptions are appended to it.
+    '''
+    records = []
+    for path in paths:
+        try:
+            records.append(parse_map_def(path))
+        except (IOError, OSError, MapDefError) as e:
+            if errors is not None:
+                errors.append(e)
+            records.append(None)
+    return records
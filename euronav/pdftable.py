@@ -0,0 +1,283 @@
+'''
+Minimal PDF writer for the paginated report tables.
+
+A fixed-layout table engine that writes the PDF operators directly: one
+filled and stroked rectangle per cell and one text run per cell in the
+standard Helvetica font (not embedded). There is no layout negotiation as
+in matplotlib's ax.table, so a page costs a few string operations per
+cell. Pages are written to the file as soon as they are added.
+
+coverage_page_content draws the coverage map of euronav.covermap in the
+same way: all boxes of a layer are one path, filled (semi-transparent)
+and stroked with a single operator each.
+'''
+import math
+import zlib
+
+# A4 landscape, in points
+PAGE_WIDTH = 842.0
+PAGE_HEIGHT = 595.0
+MARGIN = 36.0
+
+TITLE_SIZE = 10.0
+FONT_SIZE = 6.5
+ROW_HEIGHT = 20.0
+PADDING = 3.0
+
+# advance widths of Helvetica (1/1000 em) for the characters 32..126
+_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584)
+
+_COLOURS = {'w': (1.0, 1.0, 1.0), 'k': (0.0, 0.0, 0.0)}
+
+# fill opacity of the coverage boxes (graphics state /GA of every page)
+FILL_ALPHA = 0.35
+# grey levels of the density grid
+DENSITY_LEVELS = 8
+LEGEND_WIDTH = 130.0
+
+
+def text_width(text, size):
+    total = 0
+    for char in text:
+        code = ord(char)
+        total += _HELVETICA[code - 32] if 32 <= code <= 126 else 556
+    return total * size / 1000.0
+
+
+def fit_text(text, width, size):
+    '''Cut text (with ...) so that it fits into width.'''
+    if text_width(text, size) <= width:
+        return text
+    while text and text_width(text + '...', size) > width:
+        text = text[:-1]
+    return text + '...' if text else ''
+
+
+def rgb(colour):
+    if colour in _COLOURS:
+        return _COLOURS[colour]
+    colour = colour.lstrip('#')
+    return tuple(int(colour[i:i + 2], 16) / 255.0 for i in (0, 2, 4))
+
+
+def _escape(text):
+    text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('cp1252', 'replace')
+
+
+def _text(ops, x, y, size, text):
+    ops.append(b'BT /F1 %.1f Tf %.2f %.2f Td (' % (size, x, y) + _escape(text) + b') Tj ET')
+
+
+def table_page_content(title, columns, widths, rows, colours, align='center'):
+    '''Return the compressed content stream of a page (see TablePdf.add_table_page).
+
+    The stream only depends on the arguments, so callers can keep it and add
+    an unchanged page again without drawing it.
+    '''
+    usable = PAGE_WIDTH - 2 * MARGIN
+    scale = usable / float(sum(widths))
+    xs = [MARGIN]
+    for w in widths:
+        xs.append(xs[-1] + w * scale)
+
+    ops = [b'0.5 w 0 0 0 RG']
+    top = PAGE_HEIGHT - MARGIN
+    tw = text_width(title, TITLE_SIZE)
+    ops.append(b'0 0 0 rg')
+    _text(ops, (PAGE_WIDTH - tw) / 2.0, top - TITLE_SIZE, TITLE_SIZE, title)
+
+    y = top - TITLE_SIZE - 14.0
+    header_colours = ['#C8C8C8'] * len(columns)
+    for row, row_colours in [(columns, header_colours)] + list(zip(rows, colours)):
+        y -= ROW_HEIGHT
+        for c, value in enumerate(row):
+            x0, x1 = xs[c], xs[c + 1]
+            ops.append(b'%.3f %.3f %.3f rg %.2f %.2f %.2f %.2f re B' % (rgb(row_colours[c]) + (x0, y, x1 - x0, ROW_HEIGHT)))
+            text = fit_text(str(value), x1 - x0 - 2 * PADDING, FONT_SIZE)
+            if align == 'left':
+                tx = x0 + PADDING
+            else:
+                tx = x0 + (x1 - x0 - text_width(text, FONT_SIZE)) / 2.0
+            ops.append(b'0 0 0 rg')
+            _text(ops, tx, y + (ROW_HEIGHT - FONT_SIZE) / 2.0 + 1.0, FONT_SIZE, text)
+
+    return zlib.compress(b'\n'.join(ops))
+
+
+def nice_ticks(lo, hi, n=6):
+    '''Return round values between lo and hi, about n of them.'''
+    span = hi - lo
+    if span <= 0:
+        return [lo]
+    raw = span / float(n)
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = min((m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw))
+    first = math.ceil(lo / step)
+    return [i * step for i in range(int(first), int(math.floor(hi / step)) + 1)]
+
+
+def _density_ops(ops, grid, x, y, cell_w, cell_h):
+    '''Add the density grid: one path per grey level, cells of equal level in a row joined.'''
+    import numpy as np
+
+    top = grid.max()
+    if not top:
+        return
+    levels = np.ceil(grid * (DENSITY_LEVELS / float(top))).astype(int)
+    runs = {}
+    for j, row in enumerate(levels):
+        edges = np.flatnonzero(np.diff(row)) + 1
+        starts = np.concatenate(([0], edges))
+        ends = np.concatenate((edges, [len(row)]))
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            if row[s]:
+                runs.setdefault(int(row[s]), []).append(b'%.2f %.2f %.2f %.2f re'
+                                                        % (x + s * cell_w, y + j * cell_h, (e - s) * cell_w, cell_h))
+    for level in sorted(runs):
+        grey = 1.0 - 0.6 * level / DENSITY_LEVELS
+        ops.append(b'%.3f g' % grey)
+        ops.extend(runs[level])
+        ops.append(b'f')
+
+
+def coverage_page_content(title, layers, bounds, grid=None):
+    '''Return the compressed content stream of a coverage map page.
+
+    layers are (label, colour, edge colour, boxes) with boxes (xmin, ymin,
+    xmax, ymax) in map units, drawn in order; bounds is the map area and
+    grid an optional numpy density grid over it (row 0 at the bottom),
+    drawn under the boxes, which are then only outlined.
+    '''
+    ops = [b'0 0 0 rg']
+    top = PAGE_HEIGHT - MARGIN
+    _text(ops, (PAGE_WIDTH - text_width(title, TITLE_SIZE)) / 2.0, top - TITLE_SIZE, TITLE_SIZE, title)
+
+    # map area: room for the tick labels on the left and below, the legend on the right
+    x0, y0, x1, y1 = bounds
+    left, bottom = MARGIN + 30.0, MARGIN + 16.0
+    width = PAGE_WIDTH - MARGIN - LEGEND_WIDTH - left
+    height = top - TITLE_SIZE - 14.0 - bottom
+    scale = min(width / (x1 - x0), height / (y1 - y0))
+    left += (width - (x1 - x0) * scale) / 2.0
+    bottom += (height - (y1 - y0) * scale) / 2.0
+    width, height = (x1 - x0) * scale, (y1 - y0) * scale
+
+    def px(x):
+        return left + (x - x0) * scale
+
+    def py(y):
+        return bottom + (y - y0) * scale
+
+    ops.append(b'q %.2f %.2f %.2f %.2f re W n' % (left, bottom, width, height))
+    if grid is not None:
+        _density_ops(ops, grid, left, bottom, width / grid.shape[1], height / grid.shape[0])
+    xticks = nice_ticks(x0, x1)
+    yticks = nice_ticks(y0, y1)
+    ops.append(b'0.3 w %.3f %.3f %.3f RG' % rgb('#C8C8C8'))
+    ops.extend(b'%.2f %.2f m %.2f %.2f l' % (px(x), bottom, px(x), bottom + height) for x in xticks)
+    ops.extend(b'%.2f %.2f m %.2f %.2f l' % (left, py(y), left + width, py(y)) for y in yticks)
+    ops.append(b'S')
+    for label, colour, edge, boxes in layers:
+        ops.append(b'/GA gs 0.4 w %.3f %.3f %.3f rg %.3f %.3f %.3f RG' % (rgb(colour) + rgb(edge)))
+        ops.extend(b'%.2f %.2f %.2f %.2f re' % (px(a), py(b), (c - a) * scale, (d - b) * scale)
+                   for a, b, c, d in boxes)
+        ops.append(b'B' if grid is None else b'S')
+    ops.append(b'Q')
+
+    ops.append(b'0.5 w 0 0 0 RG %.2f %.2f %.2f %.2f re S' % (left, bottom, width, height))
+    ops.append(b'0 0 0 rg')
+    for x in xticks:
+        text = '%g' % x
+        _text(ops, px(x) - text_width(text, FONT_SIZE) / 2.0, bottom - FONT_SIZE - 4.0, FONT_SIZE, text)
+    for y in yticks:
+        text = '%g' % y
+        _text(ops, left - text_width(text, FONT_SIZE) - 4.0, py(y) - FONT_SIZE / 3.0, FONT_SIZE, text)
+
+    # legend
+    lx = left + width + 12.0
+    ly = bottom + height
+    entries = [(colour, edge, '%s (%d)' % (label, len(boxes))) for label, colour, edge, boxes in layers]
+    if grid is not None:
+        entries.append(('#808080', '#808080', 'density (max %d)' % grid.max()))
+    for colour, edge, text in entries:
+        ly -= 14.0
+        ops.append(b'0.4 w %.3f %.3f %.3f rg %.3f %.3f %.3f RG' % (rgb(colour) + rgb(edge)))
+        ops.append(b'%.2f %.2f 12 8 re B' % (lx, ly))
+        ops.append(b'0 0 0 rg')
+        _text(ops, lx + 16.0, ly + 1.0, FONT_SIZE, text)
+    return zlib.compress(b'\n'.join(ops))
+
+
+class TablePdf(object):
+    '''PDF file made of table pages.
+
+        with TablePdf(path) as pdf:
+            pdf.add_table_page(title, columns, widths, rows, colours)
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._offsets = {}
+        self._pages = []
+        self._next = 5
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        # 1: catalog, 2: page tree - written when the file is closed; 3: font, 4: fill opacity - now
+        self._write_object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        self._write_object(4, b'<< /Type /ExtGState /ca %.2f >>' % FILL_ALPHA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write_object(self, number, body):
+        self._offsets[number] = self._file.tell()
+        self._file.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+
+    def _allocate(self):
+        number = self._next
+        self._next += 1
+        return number
+
+    def add_table_page(self, title, columns, widths, rows, colours, align='center'):
+        '''Add one page with a title and a table.
+
+        widths are relative column widths, colours one list of cell colours
+        ('#RRGGBB' or 'w') per row, align 'center' or 'left'.
+        '''
+        self.add_page_content(table_page_content(title, columns, widths, rows, colours, align))
+
+    def add_page_content(self, content):
+        '''Add one page drawn by the compressed content stream of table_page_content or coverage_page_content.'''
+        content_number = self._allocate()
+        self._write_object(content_number, b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content)
+                           + content + b'\nendstream')
+        page_number = self._allocate()
+        self._write_object(page_number, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                           b'/Resources << /Font << /F1 3 0 R >> /ExtGState << /GA 4 0 R >> >> /Contents %d 0 R >>'
+                           % (PAGE_WIDTH, PAGE_HEIGHT, content_number))
+        self._pages.append(page_number)
+
+    def close(self):
+        if self._file.closed:
+            return
+        kids = b' '.join(b'%d 0 R' % n for n in self._pages)
+        self._write_object(2, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(self._pages))
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref = self._file.tell()
+        self._file.write(b'xref\n0 %d\n' % self._next)
+        self._file.write(b'0000000000 65535 f \n')
+        for number in range(1, self._next):
+            self._file.write(b'%010d 00000 n \n' % self._offsets[number])
+        self._file.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (self._next, xref))
+        self._file.close()
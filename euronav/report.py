@@ -0,0 +1,417 @@
+'''
+Extended and Overview reports of a Catalog.
+
+Extended_<eam>.pdf lists every dataset with LOD, SQL and bounding box
+(and with file count and sizes when the storage statistics were
+collected; Storage_<eam>.csv then has one row per LOD folder). Its first
+page is the coverage map of the bounding boxes (see euronav.covermap),
+which is also written alone as Coverage_<eam>.png/.svg on request.
+Labels_<eam>.csv lists the statements and rows of every SQL label file
+when the label statistics were collected (see euronav.labelstats).
+Overview_<eam>.pdf/.csv list the datasets with numbered series
+(z.B. rus_100k_nat_2, rus_100k_nat_3, ...) collapsed into one row
+(see euronav.series).
+The PDFs are drawn either with matplotlib tables or with the fixed-layout
+table engine of euronav.pdftable (renderer 'native'), which is much faster
+on large disks. matplotlib is only imported when it draws a PDF. With
+jobs > 1 matplotlib renders chunks of pages in worker processes; the
+chunks are merged in order with pypdf.
+'''
+import csv
+import os
+import shutil
+import tempfile
+
+from . import instrument
+from .catalog import EXTENDED_COLUMNS, display
+from .covermap import coverage_figure, coverage_map
+from .series import group_series
+
+# COUNT: datasets of the series, LOD: summed, XMIN..YMAX: union of their bounding boxes
+OVERVIEW_COLUMNS = ('TYPE', 'NAME', 'GROUP', 'PRIORITY', 'CATEGORY', 'PUBLICATION', 'COUNT', 'LOD',
+                    'XMIN', 'XMAX', 'YMIN', 'YMAX')
+
+KIND_COLOURS = {'vector': '#FFFFDA', 'raster': '#C8E3C8', 'terrain': '#FFC8C8'}
+HEADER_COLOUR = '#C8C8C8'
+
+ROWS_PER_PAGE = 20
+
+EXTENDED_WIDTHS = (0.07, 0.19, 0.10, 0.05, 0.08, 0.10, 0.05, 0.05, 0.085, 0.085, 0.075, 0.075)
+STORAGE_COLUMNS = ('FILES', 'MB', 'MAX MB')
+STORAGE_WIDTHS = (0.06, 0.07, 0.07)
+OVERVIEW_WIDTHS = (0.07, 0.18, 0.10, 0.07, 0.09, 0.10, 0.06, 0.04, 0.065, 0.065, 0.065, 0.065)
+
+RENDERERS = ('matplotlib', 'native')
+
+COVERAGE_FORMATS = ('png', 'svg')
+# size (inches) and resolution of Coverage_<eam>.png/.svg
+COVERAGE_SIZE = (11.69, 8.27)
+COVERAGE_DPI = 150
+
+
+class ReportError(Exception):
+    '''Raised when a report file can not be written.'''
+
+
+def overview_rows(catalog):
+    '''Return (kind, row) pairs of the Overview table, one row per map series.
+
+    catalog may be any iterable of datasets.
+    '''
+    rows = []
+    for series in group_series(catalog):
+        d = series.first
+        rows.append((series.kind, [display(v) for v in (d.type, series.name, d.group, d.priority, d.category,
+                                                         d.publication, series.count, series.lod, series.xmin,
+                                                         series.xmax, series.ymin, series.ymax)]))
+    return rows
+
+
+def megabytes(size):
+    return round(size / 1048576.0, 1)
+
+
+def extended_rows(catalog):
+    '''Return (kind, row) pairs of the Extended table (with STORAGE_COLUMNS if collected).'''
+    if not catalog.has_storage():
+        return [(d.kind, d.extended_row()) for d in catalog]
+    rows = []
+    for d in catalog:
+        files, size, largest = d.storage()
+        rows.append((d.kind, d.extended_row() + [files, megabytes(size), megabytes(largest)]))
+    return rows
+
+
+def extended_table(catalog):
+    return 'Extended storage' if catalog.has_storage() else 'Extended'
+
+
+def row_colours(page, n_columns):
+    return [[KIND_COLOURS[kind]] + ['w'] * (n_columns - 1) for kind, row in page]
+
+
+def paginate(items, page_size=ROWS_PER_PAGE):
+    return [items[i:i + page_size] for i in range(0, len(items), page_size)] or [[]]
+
+
+def report_path(out_dir, prefix, eam_name, extension):
+    return os.path.join(out_dir, prefix + '_' + eam_name + '.' + extension)
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _extended_page(plt, title, page, columns=EXTENDED_COLUMNS, widths=EXTENDED_WIDTHS):
+    fig, ax = plt.subplots()
+    ax.axis('off')
+    ax.set_title(title + '\n', fontsize=10)
+
+    colours = row_colours(page, len(columns))
+    tabelle = ax.table(cellText=[row for kind, row in page], colLabels=columns,
+                       colColours=(HEADER_COLOUR,) * len(columns), cellColours=colours or None,
+                       loc='center', rowLoc='center', colLoc='center')
+    tabelle.auto_set_font_size(False)
+    tabelle.set_fontsize(6)
+    tabelle.scale(1.5, 1.5)
+
+    cell_dict = tabelle.get_celld()
+    for (r, c), cell in cell_dict.items():
+        cell.set_linewidth(0.5)
+        cell.set_width(widths[c])
+        cell.set_height(0.05)
+
+    fig.tight_layout()
+    return fig
+
+
+def _extended_storage_page(plt, title, page):
+    return _extended_page(plt, title, page, EXTENDED_COLUMNS + STORAGE_COLUMNS, EXTENDED_WIDTHS + STORAGE_WIDTHS)
+
+
+def _overview_page(plt, title, page):
+    fig, ax = plt.subplots()
+    ax.axis('off')
+    ax.set_title(title + '\n', fontsize=10)
+
+    colours = row_colours(page, len(OVERVIEW_COLUMNS))
+    tabelle = ax.table(cellText=[row for kind, row in page], colLabels=OVERVIEW_COLUMNS,
+                       colColours=(HEADER_COLOUR,) * len(OVERVIEW_COLUMNS), cellColours=colours or None,
+                       loc='center', rowLoc='left', colLoc='left')
+    tabelle.auto_set_font_size(False)
+    tabelle.set_fontsize(6)
+    tabelle.scale(1.5, 1.5)
+    for (r, c), cell in tabelle.get_celld().items():
+        cell.set_linewidth(0.5)
+        cell.set_width(OVERVIEW_WIDTHS[c])
+        cell.set_height(0.05)
+
+    fig.tight_layout()
+    return fig
+
+
+def _empty_page(plt, title):
+    '''Page of a table without rows (dataset folders without a readable map.def); ax.table needs rows.'''
+    fig, ax = plt.subplots()
+    ax.axis('off')
+    ax.set_title(title + '\n', fontsize=10)
+    ax.text(0.5, 0.5, 'No datasets', ha='center', va='center', fontsize=10)
+    return fig
+
+
+# columns, relative widths, text alignment and matplotlib page of each table
+TABLES = {
+    'Extended': (EXTENDED_COLUMNS, EXTENDED_WIDTHS, 'center', _extended_page),
+    'Extended storage': (EXTENDED_COLUMNS + STORAGE_COLUMNS, EXTENDED_WIDTHS + STORAGE_WIDTHS, 'center',
+                         _extended_storage_page),
+    'Overview': (OVERVIEW_COLUMNS, OVERVIEW_WIDTHS, 'left', _overview_page),
+}
+
+
+def page_title(eam_name, i, n_pages):
+    return eam_name + ' - Table ' + str(i + 1) + ' of ' + str(n_pages)
+
+
+def coverage_of(catalog, density=None):
+    '''Return the CoverageMap of catalog, boxes coloured like the table rows.
+
+    density: True draws the density grid, False never, None on dense disks
+    (see euronav.covermap).
+    '''
+    try:
+        with instrument.span('coverage map'):
+            return coverage_map(catalog, KIND_COLOURS, catalog.eam_name + ' - Coverage', density)
+    except ImportError:
+        raise ReportError('The density grid needs numpy (python -mpip install -U numpy).')
+
+
+def _render_pages(args):
+    '''Render pages (numbered from first on) into the PDF at path, after the coverage map if one is given.
+
+    Every figure is written and closed before the next page is built, so
+    memory does not grow with the number of pages.
+    '''
+    path, eam_name, table, pages, first, n_pages, coverage = args
+    plt = _pyplot()
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    render_page = TABLES[table][3]
+    with PdfPages(path) as pdf:
+        if coverage is not None:
+            with instrument.span('PolyCollection'):
+                fig = coverage_figure(plt, coverage)
+            try:
+                with instrument.span('PdfPages.savefig'):
+                    pdf.savefig(fig)
+            finally:
+                plt.close(fig)
+        for i, page in enumerate(pages):
+            with instrument.span('ax.table'):
+                if page:
+                    fig = render_page(plt, page_title(eam_name, first + i, n_pages), page)
+                else:
+                    fig = _empty_page(plt, page_title(eam_name, first + i, n_pages))
+            try:
+                with instrument.span('PdfPages.savefig'):
+                    pdf.savefig(fig)
+            finally:
+                plt.close(fig)
+    return path
+
+
+def _write_matplotlib_pdf(path, eam_name, table, pages, jobs=1, coverage=None):
+    if jobs <= 1 or len(pages) <= 1:
+        _render_pages((path, eam_name, table, pages, 0, len(pages), coverage))
+        return
+
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise ReportError('Rendering with more than one job needs pypdf (python -mpip install -U pypdf).')
+    from concurrent.futures import ProcessPoolExecutor
+
+    # a few chunks per worker, so one slow chunk does not keep the others waiting
+    size = max(1, -(-len(pages) // (jobs * 4)))
+    tmp = tempfile.mkdtemp(prefix='map_def_tool_', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        # the coverage map goes in front of the first chunk
+        chunks = [(os.path.join(tmp, '%06d.pdf' % first), eam_name, table, pages[first:first + size], first, len(pages),
+                   coverage if first == 0 else None)
+                  for first in range(0, len(pages), size)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(_render_pages, chunks))
+
+        writer = PdfWriter()
+        for part in parts:
+            writer.append(part)
+        with open(path, 'wb') as f:
+            writer.write(f)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _write_native_pdf(path, eam_name, table, pages, jobs=1, page_cache=None, coverage=None):
+    from .pdftable import TablePdf, coverage_page_content, table_page_content
+
+    columns, widths, align = TABLES[table][:3]
+    # content streams of the pages last written to path, reused for unchanged pages
+    previous = page_cache.get(path, {}) if page_cache is not None else {}
+    current = {}
+    with TablePdf(path) as pdf:
+        if coverage is not None:
+            pdf.add_page_content(coverage_page_content(coverage.title, coverage.layers, coverage.bounds, coverage.grid))
+        for i, page in enumerate(pages):
+            title = page_title(eam_name, i, len(pages))
+            key = (title, tuple(kind for kind, row in page), tuple(tuple(row) for kind, row in page))
+            content = previous.get(key)
+            if content is None:
+                content = table_page_content(title, columns, widths, [row for kind, row in page],
+                                             row_colours(page, len(columns)), align)
+            current[key] = content
+            pdf.add_page_content(content)
+    if page_cache is not None:
+        page_cache[path] = current
+
+
+def write_pdf(path, eam_name, table, rows, renderer='matplotlib', jobs=1, page_cache=None, coverage=None):
+    '''Write the (kind, row) pairs of table ('Extended' or 'Overview') as paginated PDF.
+
+    jobs > 1 renders matplotlib pages in that many worker processes. With a
+    page_cache dict the native renderer keeps the pages it drew and only
+    draws the pages whose rows changed when path is written again. A
+    coverage map (CoverageMap) is drawn on a page before the table.
+    '''
+    if renderer not in RENDERERS:
+        raise ValueError('unknown renderer %r' % renderer)
+    try:
+        with instrument.span('pdf ' + table.split()[0]):
+            if renderer == 'native':
+                _write_native_pdf(path, eam_name, table, paginate(rows), jobs, page_cache, coverage)
+            else:
+                _write_matplotlib_pdf(path, eam_name, table, paginate(rows), jobs, coverage)
+    except (IOError, OSError) as e:
+        raise ReportError('It was not possible to write ' + path + ' (' + str(e) + ').' + '\n'
+                          + 'Please close older versions of the PDF file you want to overwrite and run the tool again!!')
+    return path
+
+
+def write_extended_pdf(catalog, out_dir, renderer='matplotlib', jobs=1, page_cache=None, coverage=None):
+    '''Write Extended_<eam>.pdf, the coverage map (coverage_of(catalog) unless given) in front.'''
+    path = report_path(out_dir, 'Extended', catalog.eam_name, 'pdf')
+    if coverage is None:
+        coverage = coverage_of(catalog)
+    return write_pdf(path, catalog.eam_name, extended_table(catalog), extended_rows(catalog), renderer, jobs,
+                     page_cache, coverage)
+
+
+def write_overview_pdf(catalog, out_dir, renderer='matplotlib', jobs=1, page_cache=None):
+    path = report_path(out_dir, 'Overview', catalog.eam_name, 'pdf')
+    return write_pdf(path, catalog.eam_name, 'Overview', overview_rows(catalog), renderer, jobs, page_cache)
+
+
+def write_coverage_map(catalog, out_dir, extension='png', coverage=None):
+    '''Write the coverage map (coverage_of(catalog) unless given) alone as Coverage_<eam>.png or .svg.'''
+    if extension not in COVERAGE_FORMATS:
+        raise ValueError('unknown coverage map format %r' % extension)
+    path = report_path(out_dir, 'Coverage', catalog.eam_name, extension)
+    if coverage is None:
+        coverage = coverage_of(catalog)
+    plt = _pyplot()
+    try:
+        with instrument.span('coverage ' + extension):
+            fig = coverage_figure(plt, coverage, COVERAGE_SIZE)
+            try:
+                fig.savefig(path, format=extension, dpi=COVERAGE_DPI)
+            finally:
+                plt.close(fig)
+    except (IOError, OSError) as e:
+        raise ReportError('It was not possible to write ' + path + ' (' + str(e) + ').')
+    return path
+
+
+def write_overview_csv(catalog, out_dir):
+    '''Write the Overview table as ';' separated csv (same layout as DataFrame.to_csv).'''
+    path = report_path(out_dir, 'Overview', catalog.eam_name, 'csv')
+    try:
+        with instrument.span('csv Overview'), open(path, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(('',) + OVERVIEW_COLUMNS)
+            for i, (kind, row) in enumerate(overview_rows(catalog)):
+                writer.writerow([i] + row)
+    except (IOError, OSError) as e:
+        raise ReportError('It was not possible to write ' + path + ' (' + str(e) + ').')
+    return path
+
+
+def write_storage_csv(catalog, out_dir):
+    '''Write the storage statistics as ';' separated csv, one row per LOD folder.'''
+    path = report_path(out_dir, 'Storage', catalog.eam_name, 'csv')
+    try:
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(('KIND', 'DATASET', 'NAME', 'LOD', 'FILES', 'BYTES', 'LARGEST'))
+            for d in catalog:
+                for s in d.lod_stats or ():
+                    writer.writerow((d.kind, d.dirname, display(d.name), s.lod, s.files, s.bytes, s.largest))
+    except (IOError, OSError) as e:
+        raise ReportError('It was not possible to write ' + path + ' (' + str(e) + ').')
+    return path
+
+
+def write_labels_csv(catalog, out_dir):
+    '''Write the SQL label statistics as ';' separated csv, one row per table of every label file.'''
+    path = report_path(out_dir, 'Labels', catalog.eam_name, 'csv')
+    try:
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(('KIND', 'DATASET', 'NAME', 'FILE', 'BYTES', 'STATEMENTS', 'STATUS', 'TABLE', 'ROWS'))
+            for d in catalog:
+                for s in d.label_stats or ():
+                    head = (d.kind, d.dirname, display(d.name), s.file, s.bytes, s.statements, s.status)
+                    for table, rows in sorted(s.tables.items()) or [(display(None), 0)]:
+                        writer.writerow(head + (table, rows))
+    except (IOError, OSError) as e:
+        raise ReportError('It was not possible to write ' + path + ' (' + str(e) + ').')
+    return path
+
+
+def write_catalog_json(catalog, out_dir):
+    '''Save the catalog as Catalog_<eam>.json, which diff can compare against later.'''
+    path = report_path(out_dir, 'Catalog', catalog.eam_name, 'json')
+    try:
+        catalog.save(path)
+    except (IOError, OSError) as e:
+        raise ReportError('It was not possible to write ' + path + ' (' + str(e) + ').')
+    return path
+
+
+FORMATS = ('pdf', 'csv', 'json')
+DEFAULT_FORMATS = ('pdf', 'csv')
+
+
+def write_reports(catalog, out_dir, formats=DEFAULT_FORMATS, renderer='matplotlib', jobs=1, page_cache=None,
+                  coverage_maps=(), density=None):
+    '''Write the requested report formats to out_dir and return the created paths.
+
+    page_cache: see write_pdf. coverage_maps are the COVERAGE_FORMATS of the
+    coverage map to write alone; density: see coverage_of.
+    '''
+    paths = []
+    coverage = coverage_of(catalog, density) if 'pdf' in formats or coverage_maps else None
+    if 'pdf' in formats:
+        paths.append(write_extended_pdf(catalog, out_dir, renderer, jobs, page_cache, coverage))
+        paths.append(write_overview_pdf(catalog, out_dir, renderer, jobs, page_cache))
+    for extension in coverage_maps:
+        paths.append(write_coverage_map(catalog, out_dir, extension, coverage))
+    if 'csv' in formats:
+        paths.append(write_overview_csv(catalog, out_dir))
+        if catalog.has_storage():
+            paths.append(write_storage_csv(catalog, out_dir))
+        if catalog.has_label_stats():
+            paths.append(write_labels_csv(catalog, out_dir))
+    if 'json' in formats:
+        paths.append(write_catalog_json(catalog, out_dir))
+    return paths
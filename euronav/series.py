@@ -0,0 +1,88 @@
+'''
+Numbered map series (z.B. rus_100k_nat_2, rus_100k_nat_3, ...).
+
+The stem of every name is worked out once (the name without a trailing
+_<number>) and the datasets are grouped by (kind, stem) in one pass over a
+dict, so the grouping stays linear however many datasets a disk holds.
+Datasets without a name are never grouped: each one is a series of its
+own, keyed by its folder. Each series gets one aggregated record (member
+count, summed LOD, union of the bounding boxes); the datasets are not
+modified.
+'''
+
+
+def series_stem(name):
+    '''Return name without a trailing _<number> (name itself if there is none).'''
+    if not name:
+        return name
+    head, sep, tail = name.rpartition('_')
+    if sep and head and tail.isdigit():
+        return head
+    return name
+
+
+class Series(object):
+    '''Datasets of one kind sharing a series stem.
+
+    Text fields (type, group, priority, ...) are those of the first
+    member; lod is summed and the bounding box is the union of the members.
+    '''
+
+    __slots__ = ('kind', 'stem', 'members', 'lod', 'xmin', 'ymin', 'xmax', 'ymax')
+
+    def __init__(self, kind, stem):
+        self.kind = kind
+        self.stem = stem
+        self.members = []
+        self.lod = 0
+        self.xmin = None
+        self.ymin = None
+        self.xmax = None
+        self.ymax = None
+
+    def add(self, dataset):
+        self.members.append(dataset)
+        self.lod += dataset.lod
+        if dataset.xmin is not None and (self.xmin is None or dataset.xmin < self.xmin):
+            self.xmin = dataset.xmin
+        if dataset.ymin is not None and (self.ymin is None or dataset.ymin < self.ymin):
+            self.ymin = dataset.ymin
+        if dataset.xmax is not None and (self.xmax is None or dataset.xmax > self.xmax):
+            self.xmax = dataset.xmax
+        if dataset.ymax is not None and (self.ymax is None or dataset.ymax > self.ymax):
+            self.ymax = dataset.ymax
+
+    @property
+    def count(self):
+        return len(self.members)
+
+    @property
+    def first(self):
+        return self.members[0]
+
+    @property
+    def name(self):
+        '''The stem for a series of several datasets, else the name of the dataset.'''
+        return self.stem if len(self.members) > 1 else self.first.name
+
+    def __repr__(self):
+        return 'Series(%r, %r, %d)' % (self.kind, self.name, len(self.members))
+
+
+def series_key(dataset):
+    '''Return the key of the series of dataset: (kind, stem), or (kind, None, dirname) without a name.'''
+    if not dataset.name:
+        return (dataset.kind, None, dataset.dirname)
+    return (dataset.kind, series_stem(dataset.name))
+
+
+def group_series(datasets):
+    '''Return the Series of datasets, in order of their first member.'''
+    groups = {}
+    for dataset in datasets:
+        key = series_key(dataset)
+        series = groups.get(key)
+        if series is None:
+            series = groups[key] = Series(*key[:2])
+        series.add(dataset)
+    return list(groups.values())
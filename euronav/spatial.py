@@ -0,0 +1,162 @@
+'''
+Spatial index over the map.def bounding boxes.
+
+BoxIndex is a packed R-tree bulk loaded with the Sort-Tile-Recursive
+algorithm: the boxes are sorted by centre x, cut into vertical slices,
+sorted by centre y within each slice and packed into full nodes, level by
+level. A query only descends into nodes whose box intersects the query,
+so finding what covers a point or an area does not look at every box.
+
+coverage() answers "which datasets cover this point / area / route" for a
+Catalog, sorted by priority (lowest first, missing last) and then by LOD
+(most LOD folders first).
+'''
+import math
+
+NODE_CAPACITY = 16
+
+
+def _union(boxes):
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def _pack(entries, capacity):
+    '''Pack (box, payload) entries into nodes (box, children) with STR.'''
+    n_nodes = int(math.ceil(len(entries) / float(capacity)))
+    n_slices = int(math.ceil(math.sqrt(n_nodes)))
+    slice_size = n_slices * capacity
+
+    entries = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+    nodes = []
+    for s in range(0, len(entries), slice_size):
+        vertical = sorted(entries[s:s + slice_size], key=lambda e: e[0][1] + e[0][3])
+        for i in range(0, len(vertical), capacity):
+            children = vertical[i:i + capacity]
+            nodes.append((_union([c[0] for c in children]), children))
+    return nodes
+
+
+def _intersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def normalized_box(box):
+    '''Return box (x0, y0, x1, y1) as (xmin, ymin, xmax, ymax); an inverted box keeps its area.'''
+    x0, y0, x1, y1 = box
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+class BoxIndex(object):
+    '''Packed R-tree over boxes (xmin, ymin, xmax, ymax); None boxes are left out.'''
+
+    def __init__(self, boxes, capacity=NODE_CAPACITY):
+        entries = []
+        for i, box in enumerate(boxes):
+            if box is not None:
+                entries.append((normalized_box(box), i))
+        self.size = len(entries)
+        self.height = 0
+        self.root = None
+        if not entries:
+            return
+
+        # leaves hold (box, item number); inner nodes hold (box, children)
+        level = [(box, i, True) for box, i in entries]
+        while True:
+            packed = _pack([(e[0], e) for e in level], capacity)
+            level = [(box, [c[1] for c in children], False) for box, children in packed]
+            self.height += 1
+            if len(level) == 1:
+                break
+        self.root = level[0]
+
+    def __len__(self):
+        return self.size
+
+    def search(self, box, test=None):
+        '''Return the sorted numbers of the boxes intersecting box.
+
+        test(item_box) can narrow the result further (e.g. exact shape tests).
+        '''
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node_box, children, leaf = stack.pop()
+            if not _intersects(node_box, box):
+                continue
+            if leaf:
+                if test is None or test(node_box):
+                    found.append(children)
+            else:
+                stack.extend(children)
+        return sorted(found)
+
+    def point(self, x, y):
+        return self.search((x, y, x, y))
+
+    def segment(self, x0, y0, x1, y1):
+        '''Return the numbers of the boxes crossed by the segment (x0, y0)-(x1, y1).'''
+        return self.search((min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)),
+                           lambda b: segment_hits_box(x0, y0, x1, y1, b))
+
+    def route(self, points):
+        '''Return the numbers of the boxes crossed by the polyline through points.'''
+        if len(points) == 1:
+            return self.point(*points[0])
+        found = set()
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            found.update(self.segment(x0, y0, x1, y1))
+        return sorted(found)
+
+
+def segment_hits_box(x0, y0, x1, y1, box):
+    '''Liang-Barsky test: does the segment touch the box?'''
+    t0, t1 = 0.0, 1.0
+    dx, dy = x1 - x0, y1 - y0
+    for p, q in ((-dx, x0 - box[0]), (dx, box[2] - x0), (-dy, y0 - box[1]), (dy, box[3] - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / float(p)
+            if p < 0:
+                if t > t1:
+                    return False
+                t0 = max(t0, t)
+            else:
+                if t < t0:
+                    return False
+                t1 = min(t1, t)
+    return True
+
+
+def dataset_box(dataset):
+    if not dataset.has_bbox():
+        return None
+    return dataset.xmin, dataset.ymin, dataset.xmax, dataset.ymax
+
+
+def coverage_order(dataset):
+    return (dataset.priority is None, dataset.priority or 0, -dataset.lod, dataset.name or '')
+
+
+def coverage(catalog, point=None, bbox=None, route=None, kinds=None):
+    '''Return the datasets of catalog covering a point (x, y), a bbox
+    (xmin, ymin, xmax, ymax) or a route [(x, y), ...], best first.'''
+    index = catalog.spatial_index()
+    if point is not None:
+        found = index.point(*point)
+    elif bbox is not None:
+        found = index.search(normalized_box(bbox))
+    elif route is not None:
+        found = index.route(list(route))
+    else:
+        raise ValueError('coverage needs a point, a bbox or a route')
+
+    datasets = [catalog.datasets[i] for i in found]
+    if kinds:
+        datasets = [d for d in datasets if d.kind in kinds]
+    return sorted(datasets, key=coverage_order)
@@ -0,0 +1,91 @@
+'''
+Storage statistics of the LOD folders of every dataset.
+
+An optional pass after the scan: every LOD folder of every dataset is
+walked with os.scandir (recursively, tiles may sit in sub folders) and
+its file count, total bytes and largest file are recorded. The LOD
+folders are spread over a bounded thread pool like the scan itself.
+The LOD folder names come from the listing the scan already made
+(Dataset.lod_folders); only datasets taken from the cache or a saved
+catalog are listed again.
+'''
+import os
+
+from . import instrument
+from .walker import DEFAULT_WORKERS, map_ordered
+
+
+class LodStats(object):
+    '''Files in one LOD folder of a dataset.'''
+
+    __slots__ = ('lod', 'files', 'bytes', 'largest')
+
+    def __init__(self, lod, files=0, bytes=0, largest=0):
+        self.lod = lod
+        self.files = files
+        self.bytes = bytes
+        self.largest = largest
+
+    def to_dict(self):
+        return {'lod': self.lod, 'files': self.files, 'bytes': self.bytes, 'largest': self.largest}
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(record['lod'], record['files'], record['bytes'], record['largest'])
+
+    def __repr__(self):
+        return 'LodStats(%r, files=%d, bytes=%d)' % (self.lod, self.files, self.bytes)
+
+
+def lod_folders(path):
+    '''Return the sorted names of the LOD folders of a dataset folder.'''
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return []
+    instrument.add(instrument.DIR_ENTRIES, len(entries))
+    return sorted(e.name for e in entries if e.is_dir())
+
+
+def lod_stats(path, lod):
+    '''Walk the LOD folder path and return its LodStats.'''
+    stats = LodStats(lod)
+    stack = [path]
+    while stack:
+        n = 0
+        try:
+            with os.scandir(stack.pop()) as it:
+                for e in it:
+                    n += 1
+                    if e.is_dir(follow_symlinks=False):
+                        stack.append(e.path)
+                    elif e.is_file(follow_symlinks=False):
+                        size = e.stat(follow_symlinks=False).st_size
+                        stats.files += 1
+                        stats.bytes += size
+                        if size > stats.largest:
+                            stats.largest = size
+        except OSError:
+            pass
+        instrument.add(instrument.DIR_ENTRIES, n)
+    return stats
+
+
+def collect_storage(datasets, workers=DEFAULT_WORKERS):
+    '''Set dataset.lod_stats of every dataset (one LodStats per LOD folder).'''
+    with instrument.span('storage'):
+        _collect_storage(datasets, workers)
+
+
+def _collect_storage(datasets, workers):
+    unlisted = [d for d in datasets if d.lod_folders is None]
+    for d, names in zip(unlisted, map_ordered(lambda d: lod_folders(d.path), unlisted, workers)):
+        d.lod_folders = names
+    jobs = [(i, lod) for i, d in enumerate(datasets) for lod in d.lod_folders]
+    stats = map_ordered(lambda job: lod_stats(os.path.join(datasets[job[0]].path, job[1]), job[1]), jobs, workers)
+
+    for d in datasets:
+        d.lod_stats = []
+    for (i, lod), s in zip(jobs, stats):
+        datasets[i].lod_stats.append(s)
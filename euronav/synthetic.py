@@ -0,0 +1,107 @@
+'''
+Synthetic Euronav db folders for benchmarks and experiments.
+
+generate_disk() writes a fake but realistic db tree: EuroNavMedia.ini,
+vector/raster/terrain datasets with LOD folders and tiles, map.def files
+in several variants (complete, keys missing, unknown keys, jepp and reppts
+datasets, numbered series such as rus_100k_nat_2, rus_100k_nat_3) and SQL
+label files for part of the vector datasets. The same seed always gives
+the same tree.
+'''
+import os
+import random
+
+from .disk import KINDS
+
+SERIES = ('rus_100k_nat', 'ger_50k_top', 'nor_250k_jog', 'world_1m_onc', 'fra_25k_top')
+GROUPS = ('russia', 'germany', 'norway', 'world', 'france')
+CATEGORIES = ('topo', 'aero', 'elevation', 'street')
+
+
+def _map_def(kind, name, rng, variant):
+    x = rng.uniform(-180.0, 170.0)
+    y = rng.uniform(-85.0, 75.0)
+    size = rng.choice((0.25, 0.5, 1.0, 5.0, 10.0))
+    lines = ['type ' + kind,
+             'name ' + name,
+             'group ' + rng.choice(GROUPS),
+             'priority %d' % rng.randint(0, 9),
+             'category ' + rng.choice(CATEGORIES),
+             'publication %d-%02d' % (rng.randint(2010, 2024), rng.randint(1, 12)),
+             'bbmin %.6f %.6f' % (x, y),
+             'bbmax %.6f %.6f' % (x + size, y + size)]
+    if variant == 'missing':
+        # drop a few keys, as found on older disks
+        for key in rng.sample(range(2, len(lines)), 3):
+            lines[key] = None
+        lines = [l for l in lines if l is not None]
+    elif variant == 'extras':
+        lines.append('projection mercator')
+        lines.append('copyright EuroAvionics')
+    return '\n'.join(lines) + '\n'
+
+
+def dataset_names(kind, count, rng):
+    '''Return count dataset folder names, mixing plain names and numbered series.'''
+    names = []
+    i = 0
+    while len(names) < count:
+        roll = rng.random()
+        if kind == 'vector' and roll < 0.02:
+            names.append('jepp_%s_%d' % (rng.choice(GROUPS), i))
+        elif kind == 'vector' and roll < 0.04:
+            names.append('reppts_%s_%d' % (rng.choice(GROUPS), i))
+        elif roll < 0.5:
+            stem = '%s_%s' % (rng.choice(SERIES), kind[:3])
+            for n in range(1, min(rng.randint(2, 8), count - len(names)) + 1):
+                names.append('%s_%d_%d' % (stem, i, n))
+        else:
+            names.append('%s_%s_%d' % (kind[:3], rng.choice(GROUPS), i))
+        i += 1
+    return names
+
+
+def generate_disk(db_path, vector=100, raster=100, terrain=100, lods=(1, 4), tiles=1, tile_size=256,
+                  label_share=0.5, nested=True, eam_name='9.99.99', seed=0):
+    '''Write a synthetic db folder at db_path and return db_path.
+
+    lods is the (min, max) number of LOD folders per dataset, tiles the
+    number of tile files of tile_size bytes per LOD folder and label_share
+    the share of vector datasets with SQL label files. nested puts the
+    trees into db/data like most disks.
+    '''
+    rng = random.Random(seed)
+    root = os.path.join(db_path, 'data') if nested else db_path
+    sql = os.path.join(root, 'SQL')
+    os.makedirs(sql, exist_ok=True)
+    with open(os.path.join(db_path, 'EuroNavMedia.ini'), 'w') as f:
+        f.write('[Media]\nEAM_Name=' + eam_name + '\n')
+
+    tile = b'\0' * tile_size
+    counts = {'vector': vector, 'raster': raster, 'terrain': terrain}
+    for kind in KINDS:
+        for name in dataset_names(kind, counts[kind], rng):
+            path = os.path.join(root, kind, name)
+            os.makedirs(path, exist_ok=True)
+            for lod in range(rng.randint(*lods)):
+                lod_path = os.path.join(path, 'lod%d' % lod)
+                os.makedirs(lod_path, exist_ok=True)
+                for t in range(tiles):
+                    with open(os.path.join(lod_path, 't%05d.til' % t), 'wb') as f:
+                        f.write(tile)
+
+            roll = rng.random()
+            if roll < 0.01:
+                continue  # dataset without map.def
+            variant = 'missing' if roll < 0.1 else 'extras' if roll < 0.2 else 'complete'
+            with open(os.path.join(path, 'map.def'), 'w') as f:
+                f.write(_map_def(kind, name, rng, variant))
+
+            if kind == 'vector' and rng.random() < label_share:
+                label = 'JEPP' if name.startswith('jepp') else 'REPORTINGPOINTS' if name.startswith('reppts') else name.upper()
+                with open(os.path.join(sql, label + '_LABELS.sql'), 'w') as f:
+                    f.write('CREATE TABLE labels (id INTEGER, text TEXT, x REAL, y REAL);\n')
+                    for n in range(rng.randint(0, 20)):
+                        f.write("INSERT INTO labels VALUES (%d, 'label %d', %.4f, %.4f);\n"
+                                % (n, n, rng.uniform(-180, 180), rng.uniform(-90, 90)))
+    return db_path
@@ -0,0 +1,173 @@
+'''
+Integrity checksums of the data trees of a disk.
+
+build_manifest() hashes every file under vector/, raster/, terrain/ and
+SQL/ on a thread pool (hashlib releases the GIL while hashing, so several
+large reads and hashes run at the same time) with large buffered reads.
+Only a few files per thread are queued on the pool at a time, so the
+memory used does not grow with the number of files on the disk.
+The result is a manifest in sha256sum format ("<hash>  <path>", paths
+relative to the db folder with / separators).
+
+While hashing, every finished file is appended to a journal next to the
+manifest. If the run is interrupted, the next run with the same manifest
+path continues from the journal and only hashes the files that are
+missing from it (or whose size or mtime changed since).
+
+A file that can not be read (failing media) does not stop the run: it is
+recorded as UNREADABLE in the journal and in the returned hashes and left
+out of the manifest. A resumed run does not read it again (--restart
+does).
+'''
+import hashlib
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from .disk import DiskLayout
+
+BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_JOBS = 4
+# files queued on the pool per job; the rest of the disk is submitted as they finish
+IN_FLIGHT_PER_JOB = 2
+JOURNAL_SUFFIX = '.journal'
+
+# hash of a file that could not be read
+UNREADABLE = 'UNREADABLE'
+
+
+def iter_files(layout):
+    '''Yield (relative path, absolute path, size, mtime_ns) of all files of the data trees.'''
+    for tree in (layout.vector, layout.raster, layout.terrain, layout.sql):
+        stack = [tree]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            for e in entries:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file(follow_symlinks=False):
+                    relative = os.path.relpath(e.path, layout.db_path).replace(os.sep, '/')
+                    try:
+                        st = e.stat(follow_symlinks=False)
+                    except OSError:
+                        # hashing the file fails as well and records it as unreadable
+                        yield relative, e.path, -1, 0
+                        continue
+                    yield relative, e.path, st.st_size, st.st_mtime_ns
+
+
+def hash_file(path, algorithm='sha256', block_size=BLOCK_SIZE):
+    '''Return the hex digest of the file at path, read in blocks of block_size.'''
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def read_manifest(path):
+    '''Return {relative path: hash} of a manifest in sha256sum format.'''
+    hashes = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            digest, name = line.split(' ', 1)
+            hashes[name[1:] if name[:1] in ' *' else name] = digest
+    return hashes
+
+
+def write_manifest(path, hashes):
+    '''Write hashes in sha256sum format, without the UNREADABLE files.'''
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        for name in sorted(hashes):
+            if hashes[name] != UNREADABLE:
+                f.write(hashes[name] + '  ' + name + '\n')
+
+
+def read_journal(path):
+    '''Return {relative path: (size, mtime_ns, hash or UNREADABLE)} of an unfinished run.'''
+    done = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\r\n').split('\t')
+                # a line cut off by the interruption is simply hashed again
+                if len(parts) == 4 and (len(parts[2]) >= 32 or parts[2] == UNREADABLE):
+                    done[parts[3]] = (int(parts[0]), int(parts[1]), parts[2])
+    except (IOError, OSError):
+        pass
+    return done
+
+
+def build_manifest(db_path, manifest_path, jobs=DEFAULT_JOBS, resume=True, algorithm='sha256', progress=None,
+                   errors=None):
+    '''Hash all data files of db_path into manifest_path and return {relative path: hash}.
+
+    Files that can not be read get the hash UNREADABLE; with an errors dict
+    their read errors of this run are stored in it by relative path.
+    progress(done, total) is called after every file.
+    '''
+    layout = DiskLayout(db_path)
+    journal_path = manifest_path + JOURNAL_SUFFIX
+    done = read_journal(journal_path) if resume else {}
+
+    hashes = {}
+    todo = []
+    for relative, path, size, mtime in iter_files(layout):
+        previous = done.get(relative)
+        if previous is not None and previous[:2] == (size, mtime):
+            hashes[relative] = previous[2]
+        else:
+            todo.append((relative, path, size, mtime))
+
+    total = len(hashes) + len(todo)
+    with open(journal_path, 'a' if resume else 'w', encoding='utf-8', newline='\n') as journal:
+        if journal.tell():
+            # end a line cut off by the interruption
+            journal.write('\n')
+        jobs = max(1, jobs)
+        files = iter(todo)
+        futures = {}
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while True:
+                for relative, path, size, mtime in islice(files, jobs * IN_FLIGHT_PER_JOB - len(futures)):
+                    futures[pool.submit(hash_file, path, algorithm)] = (relative, size, mtime)
+                if not futures:
+                    break
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    relative, size, mtime = futures.pop(future)
+                    try:
+                        digest = future.result()
+                    except (IOError, OSError) as e:
+                        digest = UNREADABLE
+                        if errors is not None:
+                            errors[relative] = str(e)
+                    hashes[relative] = digest
+                    journal.write('%d\t%d\t%s\t%s\n' % (size, mtime, digest, relative))
+                    journal.flush()
+                    if progress is not None:
+                        progress(len(hashes), total)
+
+    write_manifest(manifest_path, hashes)
+    os.remove(journal_path)
+    return hashes
+
+
+def compare_manifests(expected, actual):
+    '''Return (missing, extra, mismatched) relative paths between two {path: hash} dicts.'''
+    missing = sorted(name for name in expected if name not in actual)
+    extra = sorted(name for name in actual if name not in expected)
+    mismatched = sorted(name for name in expected if name in actual and expected[name] != actual[name])
+    return missing, extra, mismatched
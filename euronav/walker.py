@@ -0,0 +1,77 @@
+'''
+Directory walking for the vector, raster and terrain trees.
+
+Every folder is read once with os.scandir and the type information of the
+DirEntry objects is reused, so counting the LOD folders of a dataset costs
+no extra stat per entry. The datasets are handed out to a bounded thread
+pool: on removable media the time goes into waiting for the device, and
+several outstanding directory reads overlap those waits. Results always
+come back in input order, so the report order does not depend on timing.
+The I/O counters of the workers go to the stage that handed out the work
+(see euronav.instrument.within).
+'''
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from . import instrument
+from .mapdef import MAP_DEF
+
+DEFAULT_WORKERS = 8
+
+
+def list_dirs(path):
+    '''Return the sorted names of the folders in path ([] if path can not be read).'''
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return []
+    instrument.add(instrument.DIR_ENTRIES, len(entries))
+    return sorted(e.name for e in entries if e.is_dir())
+
+
+def dataset_entries(path):
+    '''Return (sorted names of the LOD folders, has map.def) of a dataset folder, or None if it can not be read.'''
+    lods = []
+    has_map_def = False
+    n = 0
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                n += 1
+                if e.is_dir():
+                    lods.append(e.name)
+                elif e.name == MAP_DEF:
+                    has_map_def = True
+    except OSError:
+        return None
+    instrument.add(instrument.DIR_ENTRIES, n)
+    return sorted(lods), has_map_def
+
+
+def iter_ordered(func, items, workers=DEFAULT_WORKERS):
+    '''Yield func(item) for item in items, in order, run on up to workers threads.
+
+    Each result is yielded as soon as it and all results before it are done.
+    '''
+    items = list(items)
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
+    parent = instrument.current()
+
+    def run(item):
+        with instrument.within(parent):
+            return func(item)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        for result in pool.map(run, items):
+            yield result
+
+
+def map_ordered(func, items, workers=DEFAULT_WORKERS):
+    '''Return [func(item) for item in items], run on up to workers threads.'''
+    return list(iter_ordered(func, items, workers))
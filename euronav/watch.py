@@ -0,0 +1,182 @@
+'''
+Watch a db folder and refresh the catalog when it changes.
+
+The watcher looks at the folders a scan depends on: the db folder (and
+db/data), the vector, raster, terrain and SQL trees and every dataset
+folder (map.def, LOD folders). On Linux it is told about changes by
+inotify; elsewhere, or with poll=True, it compares the signatures of these
+folders (see euronav.cache) every interval seconds.
+
+watch() waits until a copy step is over (no change for settle seconds)
+and then calls refresh(changed paths). The refresh re-scans with a
+ScanCache, so only the datasets whose signature changed are read again.
+'''
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from .cache import dataset_signature, directory_signature
+from .disk import KINDS, DiskLayout
+from .walker import list_dirs
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT = struct.Struct('iIII')
+
+EAM_INI = 'EuroNavMedia.ini'
+
+
+def watched_folders(db_path):
+    '''Return the folders whose changes can change the catalog of db_path.'''
+    layout = DiskLayout(db_path)
+    folders = [db_path]
+    data = os.path.dirname(layout.sql)
+    if data != db_path and os.path.isdir(data):
+        folders.append(data)
+    if os.path.isdir(layout.sql):
+        folders.append(layout.sql)
+    for kind in KINDS:
+        tree = layout.tree(kind)
+        if os.path.isdir(tree):
+            folders.append(tree)
+            folders.extend(os.path.join(tree, dirname) for dirname in list_dirs(tree))
+    return folders
+
+
+class PollingWatcher(object):
+    '''Finds changes by comparing folder and map.def signatures.'''
+
+    polling = True
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._snapshot = self._take()
+
+    def _take(self):
+        snapshot = dict((folder, dataset_signature(folder)) for folder in watched_folders(self.db_path))
+        ini = os.path.join(self.db_path, EAM_INI)
+        snapshot[ini] = directory_signature(ini)
+        return snapshot
+
+    def wait(self, timeout):
+        '''Return the folders changed after timeout seconds (empty if none).'''
+        time.sleep(timeout)
+        snapshot = self._take()
+        changed = set(path for path in set(snapshot) | set(self._snapshot)
+                      if snapshot.get(path) != self._snapshot.get(path))
+        self._snapshot = snapshot
+        return changed
+
+    def update(self):
+        '''Watch folders added since the last call; return how many (always 0, polling sees all).'''
+        return 0
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    '''Finds changes with Linux inotify, one watch per watched folder.'''
+
+    polling = False
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._folders = {}
+        self.update()
+
+    def update(self):
+        '''Watch folders added since the last call (new datasets); return how many.'''
+        added = 0
+        for folder in watched_folders(self.db_path):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd >= 0 and wd not in self._folders:
+                self._folders[wd] = folder
+                added += 1
+        return added
+
+    def wait(self, timeout):
+        '''Return the paths changed within timeout seconds (empty if none).'''
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, the re-scan compares all signatures anyway
+                changed.add(self.db_path)
+                continue
+            folder = self._folders.get(wd)
+            if mask & IN_IGNORED:
+                self._folders.pop(wd, None)
+            if folder is not None:
+                changed.add(os.path.join(folder, os.fsdecode(name)) if name else folder)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_watcher(db_path, poll=False):
+    '''Return an InotifyWatcher where inotify is available (unless poll), else a PollingWatcher.'''
+    if not poll and hasattr(os, 'O_CLOEXEC'):
+        try:
+            return InotifyWatcher(db_path)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(db_path)
+
+
+def watch(db_path, refresh, interval=1.0, settle=0.5, poll=False):
+    '''Call refresh(changed paths) after every change of db_path, until interrupted.
+
+    refresh is called once at the start with an empty set.
+    '''
+    watcher = open_watcher(db_path, poll)
+    try:
+        refresh(set())
+        while True:
+            changed = watcher.wait(interval)
+            if not changed:
+                continue
+            # wait for the end of the copy step
+            while True:
+                more = watcher.wait(interval if watcher.polling else settle)
+                if not more:
+                    break
+                changed |= more
+            refresh(changed)
+            if watcher.update():
+                # a new dataset folder may have been filled before it was watched
+                refresh(set())
+    finally:
+        watcher.close()
@@ -0,0 +1,138 @@
+'''
+Shared fixtures: small db folders written by hand (write_disk) and bigger
+synthetic ones (make_disk, built with euronav.synthetic).
+
+Run from the repository folder with
+
+    python -m pytest -q tests
+'''
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from euronav.cache import ScanCache, cache_path  # noqa: E402
+from euronav.synthetic import generate_disk  # noqa: E402
+
+EAM_NAME = '1.23.45'
+
+# (dirname, map.def content or None, number of lod folders) of every tree
+DATASETS = {
+    'vector': [
+        ('jepp_europe', 'type vector\nname jepp_europe\ngroup jeppesen\npriority 1\ncategory aero\n'
+                        'publication 2019-01\nbbmin -10.0 35.0\nbbmax 30.0 60.0\n', 2),
+        ('no_map_def', None, 1),
+        ('rus_100k_nat_1', 'type vector\nname rus_100k_nat_1\ngroup russia\npriority 3\ncategory topo\n'
+                           'publication 2018-05\nbbmin 37.5 55.0\nbbmax 38.0 55.5\n', 3),
+        ('rus_100k_nat_2', 'type vector\nname rus_100k_nat_2\ngroup russia\npriority 3\ncategory topo\n'
+                           'publication 2018-05\nbbmin 38.0 55.0\nbbmax 38.5 55.5\n', 3),
+    ],
+    'raster': [
+        ('ger_50k_top', 'type raster\nname ger_50k_top\ngroup germany\npriority 2\ncategory topo\n'
+                        'publication 2020-11\nbbmin 6.0 47.0\nbbmax 15.0 55.0\n', 4),
+        ('icao_500k', 'type raster\nname icao_500k\ngroup germany\npriority 5\ncategory aero\n'
+                      'publication 2021-03\nbbmin 5.5 46.5\nbbmax 15.5 55.5\n', 2),
+    ],
+    'terrain': [
+        ('dem_europe', 'type terrain\nname dem_europe\ngroup dem\npriority 9\ncategory elevation\n'
+                       'publication 2015-07\nbbmin -25.0 34.0\nbbmax 45.0 72.0\n', 5),
+    ],
+}
+
+LABELS = ('JEPP_WORLD_LABELS.sql', 'RUS_100K_NAT_1_LABELS.sql')
+
+
+def write_disk(path, datasets=DATASETS, labels=LABELS, eam_name=EAM_NAME, data=True):
+    '''Write a db folder at path and return path.
+
+    The trees go to path/data unless data is False; every lod folder gets
+    one tile file.
+    '''
+    path = str(path)
+    root = os.path.join(path, 'data') if data else path
+    for kind in ('vector', 'raster', 'terrain'):
+        os.makedirs(os.path.join(root, kind))
+        for dirname, map_def, lods in datasets.get(kind, ()):
+            folder = os.path.join(root, kind, dirname)
+            for lod in range(lods):
+                os.makedirs(os.path.join(folder, 'lod%d' % lod))
+                with open(os.path.join(folder, 'lod%d' % lod, '0_0.tile'), 'wb') as f:
+                    f.write(b'\0' * 100 * (lod + 1))
+            if not lods:
+                os.makedirs(folder)
+            if map_def is not None:
+                with open(os.path.join(folder, 'map.def'), 'w') as f:
+                    f.write(map_def)
+    os.makedirs(os.path.join(root, 'SQL'))
+    for label in labels:
+        with open(os.path.join(root, 'SQL', label), 'w') as f:
+            f.write('CREATE TABLE labels (id INTEGER);\n')
+    if eam_name is not None:
+        with open(os.path.join(path, 'EuroNavMedia.ini'), 'w') as f:
+            f.write('[Media]\nEAM_Name=' + eam_name + '\n')
+    return path
+
+
+# small enough to build in well under a second, big enough for series,
+# jepp/reppts datasets, map.def variants and datasets without map.def
+DISK_SIZE = dict(vector=60, raster=40, terrain=30, lods=(1, 3), tiles=1, tile_size=64)
+
+
+def make_disk(path, seed=0, **options):
+    '''Write a synthetic db folder at path and return path.'''
+    sizes = dict(DISK_SIZE)
+    sizes.update(options)
+    return generate_disk(str(path), seed=seed, **sizes)
+
+
+def rows(catalog):
+    '''Return everything a scan produces for catalog, for comparing scans.'''
+    return [d.to_dict() for d in catalog] + [catalog.eam_name, catalog.counts]
+
+
+def bump_mtime(path, seconds=10):
+    '''Move the mtime of path forward, as if it was changed a while after the last scan.'''
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10 ** 9))
+
+
+def pdf_pages(path):
+    '''Return the number of pages of the PDF at path.'''
+    with open(path, 'rb') as f:
+        return len(re.findall(rb'/Type\s*/Page\b', f.read()))
+
+
+@pytest.fixture
+def small_disk(tmp_path):
+    '''The db folder of DATASETS; the test may change it.'''
+    return write_disk(tmp_path / 'db')
+
+
+@pytest.fixture(scope='session')
+def disk(tmp_path_factory):
+    '''A synthetic db folder shared by the tests that do not change it.'''
+    return make_disk(tmp_path_factory.mktemp('disk') / 'db')
+
+
+@pytest.fixture
+def own_disk(tmp_path):
+    '''A synthetic db folder the test may change.'''
+    return make_disk(tmp_path / 'db')
+
+
+@pytest.fixture
+def open_cache(tmp_path):
+    '''Return a function opening the scan cache of a db folder in a temporary cache folder.'''
+    caches = []
+
+    def open_cache(db_path, rebuild=False):
+        cache = ScanCache(cache_path(db_path, str(tmp_path / 'cache')), rebuild)
+        caches.append(cache)
+        return cache
+
+    yield open_cache
+    for cache in caches:
+        cache.close()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from euronav.aioscan import DeviceScheduler, device_of, iter_scan
+from euronav.catalog import scan_disk
+from euronav.disk import KINDS, DiskLayout
+from euronav.walker import list_dirs
+
+
+class Gauge(object):
+    '''Counts the calls running at the same time.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def __call__(self, n):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(0.005)
+        with self.lock:
+            self.running -= 1
+        return n
+
+
+def run_calls(scheduler, calls):
+    '''Issue calls [(device, n)] at once and return their results in order.'''
+    async def issue():
+        try:
+            return await asyncio.gather(*[scheduler.call(device, gauges[device], n)
+                                          for device, n in calls])
+        finally:
+            scheduler.close()
+
+    gauges = dict((device, Gauge()) for device, n in calls)
+    return asyncio.run(issue()), gauges
+
+
+def test_in_flight_limit_per_device():
+    results, gauges = run_calls(DeviceScheduler(in_flight=3), [(n % 2, n) for n in range(40)])
+    assert results == list(range(40))
+    assert [gauges[device].most for device in (0, 1)] == [3, 3]
+
+
+def test_device_of(tmp_path):
+    assert device_of(str(tmp_path)) != 0
+    assert device_of(str(tmp_path / 'missing')) == 0
+
+
+def test_results_in_job_order(disk):
+    layout = DiskLayout(disk)
+    jobs = [(kind, dirname) for kind in KINDS for dirname in list_dirs(layout.tree(kind))]
+    results = list(iter_scan(layout, jobs, in_flight=4))
+    datasets = [d for d, signature, hit in results if d is not None]
+    assert len(results) == len(jobs)
+    # labels are matched afterwards, by scan_disk
+    assert [(d.kind, d.dirname, d.name, d.lod) for d in datasets] == \
+        [(d.kind, d.dirname, d.name, d.lod) for d in scan_disk(disk)]
+
+
+def test_closing_early_stops_the_loop(disk):
+    layout = DiskLayout(disk)
+    jobs = [(kind, dirname) for kind in KINDS for dirname in list_dirs(layout.tree(kind))]
+    threads = threading.active_count()
+    scan = iter_scan(layout, jobs, in_flight=2)
+    next(scan)
+    scan.close()
+    assert threading.active_count() == threads
+
+
+def test_cli_does_not_load_asyncio():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = 'import sys, euronav.cli; assert "asyncio" not in sys.modules and "euronav.aioscan" not in sys.modules'
+    subprocess.check_call([sys.executable, '-c', code], cwd=root)
@@ -0,0 +1,101 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import DATASETS, EAM_NAME, write_disk
+from euronav.catalog import scan_disk
+from euronav.catalogdb import RESULT_COLUMNS, CatalogDatabase, like_escape
+from euronav.cli import main
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = CatalogDatabase(str(tmp_path / 'fleet' / 'catalog.sqlite'))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def fleet(small_disk, tmp_path, database):
+    '''The small disk and a raster only disk stored in database.'''
+    other = write_disk(tmp_path / 'other', {'raster': DATASETS['raster']}, labels=(), eam_name='2.00.00')
+    database.add_catalog(scan_disk(small_disk))
+    database.add_catalog(scan_disk(other))
+    return small_disk, other
+
+
+def found(rows, *columns):
+    return [tuple(row[RESULT_COLUMNS.index(c)] for c in columns) for row in rows]
+
+
+def test_search(fleet, database):
+    small_disk, other = fleet
+    assert len(database.search()) == 6 + 2
+    assert found(database.search(name='RUS_100K'), 'dirname') == [('rus_100k_nat_1',), ('rus_100k_nat_2',)]
+    assert found(database.search(group='germany'), 'eam_name', 'dirname') == [
+        (EAM_NAME, 'ger_50k_top'), (EAM_NAME, 'icao_500k'), ('2.00.00', 'ger_50k_top'), ('2.00.00', 'icao_500k')]
+    assert found(database.search(group='germany', eam_name='2.00.00'), 'db_path') == [(os.path.abspath(other),)] * 2
+    assert found(database.search(published_after='2019-01', published_before='2021-01', kind='raster',
+                                 eam_name=EAM_NAME), 'name') == [('ger_50k_top',)]
+    assert found(database.search(type='terrain', priority=9), 'name') == [('dem_europe',)]
+    assert found(database.search(label='jepp'), 'name') == [('jepp_europe',)]
+    assert found(database.search(bbox=(37.9, 55.1, 38.1, 55.2), kind='vector'), 'name') == [
+        ('rus_100k_nat_1',), ('rus_100k_nat_2',)]
+    assert database.search(bbox=(100, 0, 101, 1)) == []
+
+
+def test_like_wildcards_are_literal(fleet, database):
+    assert like_escape('a_b%c\\') == 'a\\_b\\%c\\\\'
+    assert database.search(name='rus%nat') == []
+    # as wildcard '_' would match the 'u' of rus
+    assert database.search(name='r_s') == []
+    assert len(database.search(name='rus_100k_n')) == 2
+
+
+def test_name_is_a_prefix_on_the_index(fleet, database):
+    assert found(database.search(name='JEPP'), 'name') == [('jepp_europe',)]
+    assert database.search(name='europe') == []
+    plan = database.connection.execute("EXPLAIN QUERY PLAN SELECT id FROM datasets d WHERE d.name LIKE ? ESCAPE '\\'",
+                                       (like_escape('jepp') + '%',)).fetchall()
+    assert 'datasets_name' in str(plan)
+
+
+@pytest.mark.parametrize('rtree', [True, False])
+def test_inverted_boxes_are_found_as_by_query(tmp_path, database, capsys, rtree):
+    db_path = write_disk(tmp_path / 'db', {'raster': [('inverted', 'name inverted\nbbmin 10 20\nbbmax 5 15\n', 1),
+                                                      ('plain', 'name plain\nbbmin 5 15\nbbmax 10 20\n', 1)]})
+    database.has_rtree = database.has_rtree and rtree
+    database.add_catalog(scan_disk(db_path))
+    for bbox in ((6, 16, 7, 17), (7, 17, 6, 16)):
+        assert found(database.search(bbox=bbox), 'name') == [('inverted',), ('plain',)]
+        assert main(['query', db_path, '--bbox'] + [str(v) for v in bbox]) == 0
+        assert sorted(line.split()[1] for line in capsys.readouterr().out.splitlines()[1:]) == ['inverted', 'plain']
+    assert database.search(bbox=(11, 21, 12, 22)) == []
+
+
+def test_rescan_updates_the_disk_in_place(fleet, database):
+    small_disk, other = fleet
+    ids = dict(database.connection.execute('SELECT dirname, id FROM datasets'))
+    shutil.rmtree(os.path.join(small_disk, 'data', 'vector', 'rus_100k_nat_1'))
+    database.add_catalog(scan_disk(small_disk))
+
+    assert database.connection.execute('SELECT COUNT(*) FROM disks').fetchone()[0] == 2
+    assert len(database.search(eam_name=EAM_NAME)) == 5
+    assert database.search(label='RUS') == []
+    assert database.connection.execute('SELECT COUNT(*) FROM labels').fetchone()[0] == 1
+    # the remaining datasets keep their rows
+    assert dict(database.connection.execute('SELECT dirname, id FROM datasets WHERE dirname = ?', ('dem_europe',))) == {
+        'dem_europe': ids['dem_europe']}
+
+
+def test_cli_search(small_disk, tmp_path, capsys):
+    db = str(tmp_path / 'fleet.sqlite')
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'csv', '--no-cache', '--catalog-db', db,
+                 '-q']) == 0
+    assert main(['search', db, '--name', 'rus', '--disks']) == 0
+    assert capsys.readouterr().out == EAM_NAME + ' (' + os.path.abspath(small_disk) + '): 2 datasets\n'
+    assert main(['search', db, '--kind', 'terrain']) == 0
+    assert capsys.readouterr().out.split()[:4] == [EAM_NAME, os.path.abspath(small_disk), 'terrain', 'dem_europe']
+    assert main(['search', db, '--name', 'nothing']) == 1
+    assert main(['search', str(tmp_path / 'missing.sqlite')]) == 1
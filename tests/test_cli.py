@@ -0,0 +1,90 @@
+import csv
+import os
+
+from conftest import EAM_NAME, pdf_pages
+from euronav.cache import cache_path
+from euronav.cli import main
+
+
+def read_csv(path):
+    with open(str(path), newline='') as f:
+        return list(csv.reader(f, delimiter=';'))
+
+
+def test_scan_writes_the_overview_csv(small_disk, tmp_path):
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'csv', '-q']) == 0
+    rows = read_csv(tmp_path / ('Overview_' + EAM_NAME + '.csv'))
+    assert rows[0] == ['', 'TYPE', 'NAME', 'GROUP', 'PRIORITY', 'CATEGORY', 'PUBLICATION', 'COUNT', 'LOD',
+                       'XMIN', 'XMAX', 'YMIN', 'YMAX']
+    # the rus_100k_nat series is one row
+    assert [r[2] for r in rows[1:]] == ['jepp_europe', 'rus_100k_nat', 'ger_50k_top', 'icao_500k', 'dem_europe']
+    assert not (tmp_path / ('Extended_' + EAM_NAME + '.pdf')).exists()
+
+
+def test_scan_writes_the_pdfs(small_disk, tmp_path, capsys):
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'pdf']) == 0
+    out = capsys.readouterr().out
+    assert 'Number of datasets: 2 raster, 4 vector, 1 terrain.' in out
+    assert 'Peak memory: ' in out
+    # the coverage map and the table
+    assert pdf_pages(tmp_path / ('Extended_' + EAM_NAME + '.pdf')) == 2
+    assert pdf_pages(tmp_path / ('Overview_' + EAM_NAME + '.pdf')) == 1
+
+
+def test_native_renderer(small_disk, tmp_path):
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--renderer', 'native', '-q']) == 0
+    # the coverage map and the table
+    assert pdf_pages(tmp_path / ('Extended_' + EAM_NAME + '.pdf')) == 2
+    assert pdf_pages(tmp_path / ('Overview_' + EAM_NAME + '.pdf')) == 1
+
+
+def test_jobs(small_disk, tmp_path):
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'pdf', '--jobs', '2', '-q']) == 0
+    assert pdf_pages(tmp_path / ('Extended_' + EAM_NAME + '.pdf')) == 2
+
+
+def test_async_engine(small_disk, tmp_path):
+    out = tmp_path / 'out'
+    out.mkdir()
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'csv', '--no-cache', '-q']) == 0
+    assert main(['scan', small_disk, '--out', str(out), '--format', 'csv', '--no-cache', '-q',
+                 '--engine', 'async', '--workers', '3']) == 0
+    name = 'Overview_' + EAM_NAME + '.csv'
+    assert read_csv(out / name) == read_csv(tmp_path / name)
+
+
+def test_errors_exit_with_1(small_disk, tmp_path, capsys):
+    assert main(['scan', small_disk, '--out', str(tmp_path / 'missing'), '-q']) == 1
+    assert main(['scan', str(tmp_path / 'missing'), '--out', str(tmp_path), '-q']) == 1
+    assert 'Invalid path' in capsys.readouterr().err
+
+
+def test_cache_switches(small_disk, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    out = tmp_path / 'out'
+    out.mkdir()
+
+    def scan_types(*options):
+        argv = ['scan', small_disk, '--out', str(out), '--format', 'csv', '--cache-dir', cache_dir, '-q']
+        assert main(argv + list(options)) == 0
+        return [r[1] for r in read_csv(out / ('Overview_' + EAM_NAME + '.csv'))[1:]]
+
+    assert scan_types('--no-cache') == ['vector'] * 2 + ['raster'] * 2 + ['terrain']
+    assert not os.path.exists(cache_dir)
+    scan_types()
+    assert os.path.isfile(cache_path(small_disk, cache_dir))
+
+    # a change the cache can not see (same size and mtime)
+    map_def = os.path.join(small_disk, 'data', 'raster', 'icao_500k', 'map.def')
+    st = os.stat(map_def)
+    with open(map_def, 'r+b') as f:
+        data = f.read()
+        f.seek(0)
+        f.write(data.replace(b'type raster', b'type RASTER'))
+    os.utime(map_def, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    assert scan_types()[3] == 'raster'
+    assert scan_types('--no-cache')[3] == 'RASTER'
+    assert scan_types()[3] == 'raster'
+    assert scan_types('--rebuild-cache')[3] == 'RASTER'
+    assert scan_types()[3] == 'RASTER'
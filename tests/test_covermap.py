@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from conftest import EAM_NAME, pdf_pages, write_disk
+from euronav.catalog import scan_disk
+from euronav.cli import main
+from euronav.covermap import (WORLD, coverage_bounds, coverage_layers, coverage_map, density_grid, edge_colour,
+                              grid_shape)
+from euronav.report import KIND_COLOURS, coverage_of, write_coverage_map, write_extended_pdf
+
+CHARTS = {
+    'raster': [
+        ('chart_a', 'type chart\nbbmin 0.0 0.0\nbbmax 2.0 1.0\n', 1),
+        # corners swapped
+        ('chart_b', 'type chart\nbbmin 4.0 3.0\nbbmax 3.0 2.0\n', 1),
+        ('no_box', 'type raster\n', 1),
+    ],
+}
+
+
+def test_edge_colour():
+    assert edge_colour('#FF8000') == '#8C4600'
+    assert edge_colour('000000') == '#000000'
+
+
+def test_layers_of_a_small_disk(small_disk):
+    layers = coverage_layers(scan_disk(small_disk), KIND_COLOURS)
+    # the biggest boxes first
+    assert [(label, len(boxes)) for label, colour, edge, boxes in layers] == [
+        ('terrain', 1), ('vector', 3), ('raster', 2)]
+    assert [colour for label, colour, edge, boxes in layers] == [KIND_COLOURS[k] for k in ('terrain', 'vector', 'raster')]
+    bounds = coverage_bounds(layers)
+    assert bounds == pytest.approx((-26.4, 33.24, 46.4, 72.76))
+
+
+def test_type_without_colour_joins_its_kind(tmp_path):
+    layers = coverage_layers(scan_disk(write_disk(tmp_path / 'db', CHARTS)), KIND_COLOURS)
+    assert [(label, boxes) for label, colour, edge, boxes in layers] == [
+        ('raster', [(0.0, 0.0, 2.0, 1.0), (3.0, 2.0, 4.0, 3.0)])]
+    assert coverage_layers(scan_disk(write_disk(tmp_path / 'db2', CHARTS)), {'chart': '#808080'})[0][0] == 'chart'
+
+
+def test_bounds_without_boxes():
+    assert coverage_bounds([]) == WORLD
+    # a single point still gets an area
+    assert coverage_bounds([('x', '#000000', '#000000', [(1.0, 2.0, 1.0, 2.0)])]) == (0.0, 1.0, 2.0, 3.0)
+
+
+def test_grid_shape():
+    assert grid_shape((0, 0, 20, 10), 8) == (8, 4)
+    assert grid_shape((0, 0, 10, 40), 8) == (2, 8)
+    assert grid_shape((0, 0, 1000, 1), 8) == (8, 1)
+
+
+def test_density_grid_against_brute_force():
+    np = pytest.importorskip('numpy')
+    rng = random.Random(5)
+    bounds = (-10.0, -5.0, 30.0, 15.0)
+    boxes = []
+    for _ in range(200):
+        x, y = rng.uniform(-12, 30), rng.uniform(-7, 15)
+        boxes.append((x, y, x + rng.choice((0.0, 0.3, 4.0, 50.0)), y + rng.choice((0.0, 0.3, 4.0))))
+    grid = density_grid(boxes, bounds, cells=40)
+    nx, ny = grid_shape(bounds, 40)
+    assert grid.shape == (ny, nx)
+    cell = 40.0 / nx
+
+    def cells(lo, hi, origin, n):
+        first = min(max(int(np.floor((lo - origin) / cell)), 0), n - 1)
+        last = min(max(int(np.floor((hi - origin) / cell)), 0), n - 1)
+        return range(first, last + 1)
+
+    expected = np.zeros((ny, nx), dtype=int)
+    for x0, y0, x1, y1 in boxes:
+        for j in cells(y0, y1, bounds[1], ny):
+            for i in cells(x0, x1, bounds[0], nx):
+                expected[j, i] += 1
+    assert (grid == expected).all()
+    assert density_grid([], bounds, cells=40).sum() == 0
+
+
+def test_density_switch(small_disk):
+    pytest.importorskip('numpy')
+    catalog = scan_disk(small_disk)
+    assert coverage_map(catalog, KIND_COLOURS, 'x').grid is None
+    assert coverage_map(catalog, KIND_COLOURS, 'x', density=True).grid.max() == 4
+    cmap = coverage_of(catalog)
+    assert len(cmap) == 6 and cmap.title == EAM_NAME + ' - Coverage'
+
+
+@pytest.mark.parametrize('renderer', ['matplotlib', 'native'])
+def test_coverage_page_of_the_extended_pdf(small_disk, tmp_path, renderer):
+    catalog = scan_disk(small_disk)
+    assert pdf_pages(write_extended_pdf(catalog, str(tmp_path), renderer)) == 2
+    dense = coverage_of(catalog, density=True)
+    assert pdf_pages(write_extended_pdf(catalog, str(tmp_path), renderer, coverage=dense)) == 2
+
+
+def test_coverage_map_alone(small_disk, tmp_path):
+    catalog = scan_disk(small_disk)
+    png = write_coverage_map(catalog, str(tmp_path))
+    with open(png, 'rb') as f:
+        assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+    svg = write_coverage_map(catalog, str(tmp_path), 'svg')
+    with open(svg) as f:
+        assert '<svg' in f.read()
+    with pytest.raises(ValueError):
+        write_coverage_map(catalog, str(tmp_path), 'gif')
+
+
+def test_cli_coverage_map(small_disk, tmp_path, capsys):
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'csv', '--no-cache',
+                 '--coverage-map', 'png,svg', '--density', 'on']) == 0
+    out = capsys.readouterr().out
+    for extension in ('png', 'svg'):
+        assert 'Created ' + str(tmp_path / ('Coverage_' + EAM_NAME + '.' + extension)) in out
+    assert not (tmp_path / ('Extended_' + EAM_NAME + '.pdf')).exists()
+    with pytest.raises(SystemExit):
+        main(['scan', small_disk, '--coverage-map', 'gif'])
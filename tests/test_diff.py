@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+
+from conftest import EAM_NAME, write_disk
+from euronav.catalog import Catalog, scan_disk
+from euronav.cli import main
+from euronav.diff import diff_catalogs
+
+
+def test_same_disk_has_no_differences(small_disk, tmp_path):
+    catalog = scan_disk(small_disk)
+    difference = diff_catalogs(catalog, scan_disk(small_disk, engine='async'))
+    assert not difference
+    assert difference.lines()[-1] == '0 added, 0 removed, 0 changed'
+
+    # a saved catalog compares equal to the scan it was saved from
+    path = str(tmp_path / 'Catalog.json')
+    catalog.save(path)
+    loaded = Catalog.load(path)
+    assert [d.to_dict() for d in loaded] == [d.to_dict() for d in catalog]
+    assert (loaded.eam_name, loaded.counts) == (catalog.eam_name, catalog.counts)
+    assert not diff_catalogs(loaded, catalog)
+
+
+def test_stored_fingerprints_are_not_trusted(small_disk, tmp_path):
+    catalog = scan_disk(small_disk)
+    path = str(tmp_path / 'Catalog.json')
+    catalog.save(path)
+    with open(path) as f:
+        content = json.load(f)
+    content['datasets'][0]['fingerprint'] = 'stale'
+    content['datasets'][1]['priority'] = 42
+    with open(path, 'w') as f:
+        json.dump(content, f)
+    difference = diff_catalogs(Catalog.load(path), catalog)
+    assert [(c.dirname, c.fields()) for c in difference.changed] == [('rus_100k_nat_1', ['priority'])]
+
+
+def test_added_removed_and_changed(small_disk, tmp_path):
+    old = scan_disk(small_disk)
+    new_path = str(tmp_path / 'new')
+    shutil.copytree(small_disk, new_path)
+
+    shutil.rmtree(os.path.join(new_path, 'data', 'raster', 'icao_500k'))
+    with open(os.path.join(new_path, 'data', 'raster', 'ger_50k_top', 'map.def'), 'a') as f:
+        f.write('priority 42\ngroup moved\n')
+    os.makedirs(os.path.join(new_path, 'data', 'terrain', 'zzz_added', 'lod0'))
+    with open(os.path.join(new_path, 'data', 'terrain', 'zzz_added', 'map.def'), 'w') as f:
+        f.write('type terrain\n')
+
+    difference = diff_catalogs(old, scan_disk(new_path))
+    assert [d.dirname for d in difference.added] == ['zzz_added']
+    assert [d.dirname for d in difference.removed] == ['icao_500k']
+    assert [(c.kind, c.dirname) for c in difference.changed] == [('raster', 'ger_50k_top')]
+    assert difference.changed[0].changes == [('group', 'germany', 'moved'), ('priority', 2, 42)]
+    assert difference.lines() == [
+        '--- %s (%s)' % (EAM_NAME, small_disk), '+++ %s (%s)' % (EAM_NAME, new_path),
+        '- raster/icao_500k', '+ terrain/zzz_added', '~ raster/ger_50k_top',
+        "    group: 'germany' -> 'moved'", '    priority: 2 -> 42', '1 added, 1 removed, 1 changed']
+
+
+def test_cli_exit_status(small_disk, tmp_path, capsys):
+    new_path = write_disk(tmp_path / 'new', eam_name='2.00.00', labels=())
+    out = tmp_path / 'out'
+    out.mkdir()
+    assert main(['scan', small_disk, '--format', 'json', '--out', str(out), '--no-cache', '-q']) == 0
+    saved = str(out / ('Catalog_' + EAM_NAME + '.json'))
+
+    assert main(['diff', saved, small_disk, '--no-cache']) == 0
+    assert main(['diff', saved, new_path, '--no-cache']) == 1
+    out = capsys.readouterr().out
+    assert '+++ 2.00.00 (' + new_path + ')' in out
+    assert '~ vector/jepp_europe' in out and '    sql: ' in out
+    assert main(['diff', saved, str(tmp_path / 'missing'), '--no-cache']) == 1
@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import EAM_NAME
+from euronav.catalog import scan_disk
+from euronav.cli import main
+from euronav.export import (EXPORT_FIELDS, CsvWriter, ExportWriter, JsonLinesWriter, OverviewCsvWriter, export_record,
+                            open_writers)
+from euronav.report import ReportError, write_overview_csv
+
+NAMES = [name for name, _ in EXPORT_FIELDS]
+
+
+class Recorder(object):
+    '''A sink keeping the datasets it is given.'''
+
+    def __init__(self):
+        self.datasets = []
+
+    def write(self, dataset):
+        self.datasets.append(dataset)
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_sinks_get_the_datasets_in_disk_order(disk, open_cache, cached):
+    cache = open_cache(disk) if cached else None
+    if cached:
+        scan_disk(disk, cache=cache)
+    recorder = Recorder()
+    catalog = scan_disk(disk, cache=cache, sinks=[recorder])
+    assert [d.to_dict() for d in recorder.datasets] == [d.to_dict() for d in catalog]
+
+
+def test_json_lines(small_disk, tmp_path):
+    with JsonLinesWriter(str(tmp_path), EAM_NAME) as writer:
+        catalog = scan_disk(small_disk, sinks=[writer])
+    with open(writer.path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records == [dict(zip(NAMES, export_record(d))) for d in catalog]
+    assert records[1] == {'kind': 'vector', 'dataset': 'rus_100k_nat_1', 'type': 'vector', 'name': 'rus_100k_nat_1',
+                          'group': 'russia', 'priority': 3, 'category': 'topo', 'publication': '2018-05', 'lod': 3,
+                          'sql': True, 'xmin': 37.5, 'xmax': 38.0, 'ymin': 55.0, 'ymax': 55.5, 'labels': 1}
+
+
+def test_csv_is_written_in_chunks(small_disk, tmp_path):
+    catalog = scan_disk(small_disk)
+    writer = CsvWriter(str(tmp_path), EAM_NAME, chunk_rows=4)
+    for d in catalog.datasets[:5]:
+        writer.write(d)
+    # one chunk is on disk before the writer is closed
+    with open(writer.path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1 + 4
+    for d in catalog.datasets[5:]:
+        writer.write(d)
+    assert writer.close() == os.path.join(str(tmp_path), 'Extended_' + EAM_NAME + '.csv')
+    with open(writer.path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    assert rows[0] == NAMES and len(rows) == 1 + len(catalog)
+    assert rows[1][:6] == ['vector', 'jepp_europe', 'vector', 'jepp_europe', 'jeppesen', '1']
+
+
+def test_missing_values_stay_empty(tmp_path):
+    from conftest import write_disk
+    catalog = scan_disk(write_disk(tmp_path / 'db', {'raster': [('bare', 'name bare\n', 1)]}))
+    with CsvWriter(str(tmp_path), EAM_NAME) as writer:
+        writer.write(catalog.datasets[0])
+    with open(writer.path, newline='', encoding='utf-8') as f:
+        assert list(csv.reader(f, delimiter=';'))[1] == ['raster', 'bare', '', 'bare', '', '', '', '', '1', 'False',
+                                                         '', '', '', '', '0']
+
+
+def test_parquet(disk, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    [writer] = open_writers(str(tmp_path), '9.99.99', ['parquet'], chunk_rows=16)
+    try:
+        catalog = scan_disk(disk, sinks=[writer])
+    finally:
+        writer.close()
+    parquet = pq.ParquetFile(writer.path)
+    assert parquet.metadata.num_row_groups == -(-len(catalog) // 16)
+    table = parquet.read()
+    assert table.column_names == NAMES
+    assert [tuple(r.values()) for r in table.to_pylist()] == [export_record(d) for d in catalog]
+
+
+def test_parquet_needs_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(ReportError) as info:
+        open_writers(str(tmp_path), EAM_NAME, ['jsonl', 'parquet'])
+    assert 'pyarrow' in str(info.value)
+
+
+def test_overview_csv_export_matches_the_report(disk, tmp_path):
+    report = tmp_path / 'report'
+    report.mkdir()
+    writers = open_writers(str(tmp_path), '9.99.99', ['csv'], chunk_rows=7)
+    try:
+        catalog = scan_disk(disk, sinks=writers)
+    finally:
+        for writer in writers:
+            writer.close()
+    with open(writers[1].path, 'rb') as f, open(write_overview_csv(catalog, str(report)), 'rb') as g:
+        assert f.read() == g.read()
+
+
+def test_overview_csv_export_with_unnamed_datasets(tmp_path):
+    from conftest import write_disk
+    db_path = write_disk(tmp_path / 'db', {'raster': [('chart_%d' % n, 'type raster\n', 1) for n in range(1, 4)] +
+                                                      [('named_1', 'name named_1\n', 1)]})
+    report = tmp_path / 'report'
+    report.mkdir()
+    writers = open_writers(str(tmp_path), EAM_NAME, ['csv'])
+    try:
+        catalog = scan_disk(db_path, sinks=writers)
+    finally:
+        for writer in writers:
+            writer.close()
+    with open(writers[1].path, 'rb') as f, open(write_overview_csv(catalog, str(report)), 'rb') as g:
+        data = f.read()
+        assert data == g.read()
+    # the unnamed datasets are not merged into one row
+    assert len(data.splitlines()) == 1 + 4
+
+
+def test_writers_must_implement_open_and_write_chunk(tmp_path):
+    class Unfinished(ExportWriter):
+        extension = 'txt'
+
+        def _open(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Unfinished(str(tmp_path), EAM_NAME)
+
+
+def test_overview_csv_is_left_to_the_report(small_disk, tmp_path, monkeypatch):
+    writers = open_writers(str(tmp_path), EAM_NAME, ['csv'], formats=['pdf', 'csv'])
+    assert [type(w) for w in writers] == [CsvWriter]
+    for writer in writers:
+        writer.close()
+
+    opened = []
+    monkeypatch.setattr(OverviewCsvWriter, '_open', lambda self: opened.append(self.path))
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'csv', '--export', 'csv', '--no-cache',
+                 '-q']) == 0
+    assert opened == []
+    with open(str(tmp_path / ('Overview_' + EAM_NAME + '.csv')), 'rb') as f:
+        assert f.read().count(b'\n') > 1
+
+
+def test_cli_export(small_disk, tmp_path, capsys):
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'pdf', '--export', 'jsonl,csv',
+                 '--no-cache']) == 0
+    created = [line[len('Created '):] for line in capsys.readouterr().out.splitlines() if line.startswith('Created ')]
+    assert sorted(os.path.basename(p) for p in created) == sorted(
+        name + '_' + EAM_NAME + '.' + ext for name, ext in (('Extended', 'pdf'), ('Overview', 'pdf'),
+                                                             ('Extended', 'jsonl'), ('Extended', 'csv'),
+                                                             ('Overview', 'csv')))
+    with pytest.raises(SystemExit):
+        main(['scan', small_disk, '--export', 'xml'])
@@ -0,0 +1,80 @@
+import csv
+import os
+
+import pytest
+
+from conftest import DATASETS, write_disk
+from euronav import fleet
+from euronav.cli import main
+from euronav.fleet import expand_paths, fleet_catalogs, output_folders, scan_fleet
+
+
+@pytest.fixture
+def disks(tmp_path):
+    '''Three db folders, the first two with the same EAM name.'''
+    return [write_disk(tmp_path / 'disks' / 'a' / 'db'),
+            write_disk(tmp_path / 'disks' / 'b' / 'db', {'terrain': DATASETS['terrain']}),
+            write_disk(tmp_path / 'disks' / 'c' / 'db', {'raster': DATASETS['raster']}, eam_name='2.00.00')]
+
+
+def test_expand_paths(disks, tmp_path):
+    pattern = str(tmp_path / 'disks' / '*' / 'db')
+    missing = str(tmp_path / 'missing')
+    assert expand_paths([pattern, disks[1], missing]) == disks + [missing]
+    assert expand_paths([str(tmp_path / 'none' / '*')]) == []
+
+
+def test_output_folders(disks, tmp_path):
+    out = str(tmp_path / 'out')
+    assert output_folders(disks + [str(tmp_path / 'missing')], out) == [
+        os.path.join(out, name) for name in ('1.23.45', '1.23.45_2', '2.00.00', 'X.XX.XX')]
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_scan_fleet(disks, tmp_path, processes):
+    out = str(tmp_path / 'out')
+    missing = str(tmp_path / 'missing')
+    results = scan_fleet(disks + [missing], out, ['csv'], processes=processes, use_cache=False)
+    assert [r.db_path for r in results] == disks + [missing]
+    assert [len(r.catalog) for r in results[:3]] == [6, 1, 2]
+    assert results[3].catalog is None and 'Invalid path' in results[3].error
+    assert results[1].paths == [os.path.join(out, '1.23.45_2', 'Overview_1.23.45.csv')]
+    assert all(os.path.isfile(p) for r in results for p in r.paths)
+
+    catalogs = fleet_catalogs(results)
+    assert list(catalogs) == ['1.23.45', '1.23.45_2', '2.00.00']
+    assert catalogs['2.00.00'] is results[2].catalog
+
+
+def test_unexpected_errors_stay_with_their_disk(disks, tmp_path, monkeypatch):
+    scan_disk = fleet.scan_disk
+
+    def failing(db_path, *args, **kwargs):
+        if db_path == disks[1]:
+            raise RuntimeError('broken disk')
+        return scan_disk(db_path, *args, **kwargs)
+
+    monkeypatch.setattr(fleet, 'scan_disk', failing)
+    results = scan_fleet(disks, str(tmp_path / 'out'), [], processes=1, use_cache=False)
+    assert [r.error for r in results] == [None, 'RuntimeError: broken disk', None]
+    assert list(fleet_catalogs(results)) == ['1.23.45', '2.00.00']
+
+
+def test_cli_batch(disks, tmp_path, capsys):
+    out = tmp_path / 'out'
+    out.mkdir()
+    pattern = str(tmp_path / 'disks' / '*' / 'db')
+    assert main(['batch', pattern, '--out', str(out), '--no-cache', '--processes', '2', '-q']) == 0
+    with open(str(out / 'Fleet_catalog.csv'), newline='') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    assert rows[0][:4] == ['EAM', 'DB_PATH', 'KIND', 'TYPE']
+    assert [(r[0], r[4]) for r in rows[1:]][-3:] == [
+        ('1.23.45_2', 'dem_europe'), ('2.00.00', 'ger_50k_top'), ('2.00.00', 'icao_500k')]
+    assert len(rows) == 1 + 9
+
+    # a disk that fails is reported, the others are still merged
+    assert main(['batch', pattern, str(tmp_path / 'missing'), '--out', str(out), '--no-cache', '-q']) == 1
+    assert str(tmp_path / 'missing') + ': Invalid path' in capsys.readouterr().err
+    with open(str(out / 'Fleet_catalog.csv'), newline='') as f:
+        assert len(list(f)) == 1 + 9
+    assert main(['batch', str(tmp_path / 'none' / '*'), '--out', str(out), '-q']) == 1
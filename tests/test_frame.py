@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+from conftest import write_disk
+from euronav.catalog import scan_disk
+from euronav.frame import FRAME_COLUMNS, bounds_array
+
+pd = pytest.importorskip('pandas')
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    datasets = {
+        'vector': [('labelled', 'type vector\nname labelled\npriority 3\nbbmin 1 2\nbbmax 3 4\n', 2)],
+        'raster': [('bare', 'name bare\n', 1)],
+    }
+    return scan_disk(write_disk(tmp_path / 'db', datasets, labels=['LABELLED_LABELS.sql']))
+
+
+def test_dtypes(catalog):
+    frame = catalog.to_dataframe()
+    assert tuple(frame.columns) == FRAME_COLUMNS
+    # NAME is object or, from pandas 3 on, str
+    dtypes = dict((column, str(dtype)) for column, dtype in frame.dtypes.items() if column != 'NAME')
+    assert dtypes == {'TYPE': 'category', 'GROUP': 'category', 'PRIO.': 'Int64',
+                      'CATEG.': 'category', 'PUBLIC.': 'category', 'LOD': 'int64', 'SQL': 'bool',
+                      'XMIN': 'float64', 'XMAX': 'float64', 'YMIN': 'float64', 'YMAX': 'float64', 'KIND': 'category'}
+    assert list(frame['KIND'].cat.categories) == ['vector', 'raster', 'terrain']
+
+
+def test_values(catalog):
+    frame = catalog.to_dataframe()
+    first, second = frame.to_dict('records')
+    assert (first['NAME'], first['PRIO.'], first['LOD'], first['SQL'], first['KIND']) == ('labelled', 3, 2, True, 'vector')
+    assert (first['XMIN'], first['XMAX'], first['YMIN'], first['YMAX']) == (1.0, 3.0, 2.0, 4.0)
+    assert pd.isna(second['PRIO.']) and not second['SQL']
+    assert all(math.isnan(second[c]) for c in ('XMIN', 'XMAX', 'YMIN', 'YMAX'))
+    assert frame['TYPE'].isna().tolist() == [False, True]
+
+
+def test_bounds(catalog):
+    bounds = catalog.bounds()
+    assert bounds.shape == (2, 4) and bounds.dtype.name == 'float64'
+    assert bounds[0].tolist() == [1.0, 3.0, 2.0, 4.0]
+    assert bool(math.isnan(bounds[1, 0]))
+    # shared, so nobody may change it
+    assert not bounds.flags.writeable
+    assert catalog.bounds() is bounds
+    assert bounds_array([]).shape == (0, 4)
+
+
+def test_empty_frame():
+    from euronav.frame import catalog_frame
+    frame = catalog_frame([])
+    assert len(frame) == 0 and tuple(frame.columns) == FRAME_COLUMNS
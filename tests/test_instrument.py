@@ -0,0 +1,91 @@
+import json
+
+from conftest import EAM_NAME
+from euronav import instrument
+from euronav.catalog import scan_disk
+from euronav.cli import main
+from euronav.instrument import BYTES_READ, DIR_ENTRIES, FILES_OPENED, Profiler
+from euronav.storage import collect_storage
+from euronav.walker import map_ordered
+
+
+def test_no_op_without_profiler():
+    assert instrument.active is None
+    with instrument.span('stage') as s:
+        instrument.add(FILES_OPENED)
+    assert s is instrument.span('other')
+
+
+def test_counters_go_to_the_innermost_span():
+    with Profiler() as profiler:
+        assert instrument.active is profiler
+        instrument.add(BYTES_READ, 5)
+        with instrument.span('outer'):
+            instrument.add(FILES_OPENED)
+            with instrument.span('inner', 'vector/a'):
+                instrument.add(FILES_OPENED, 2)
+            with instrument.span('inner', 'vector/b'):
+                pass
+    assert instrument.active is None
+
+    summary = profiler.summary()
+    assert summary['stages']['outer']['calls'] == 1
+    assert summary['stages']['outer']['counters'] == {FILES_OPENED: 1}
+    assert summary['stages']['inner']['calls'] == 2
+    assert summary['stages']['inner']['counters'] == {FILES_OPENED: 2}
+    assert summary['totals'] == {BYTES_READ: 5, FILES_OPENED: 3}
+    assert sorted(d['dataset'] for d in summary['datasets']) == ['vector/a', 'vector/b']
+    assert summary['stages']['outer']['seconds'] >= summary['stages']['inner']['seconds']
+
+
+def test_worker_threads_count_toward_the_stage():
+    def work(n):
+        instrument.add(FILES_OPENED)
+        return n
+
+    with Profiler() as profiler:
+        with instrument.span('stage'):
+            assert map_ordered(work, range(20), workers=4) == list(range(20))
+        # outside of all spans the counters go to the totals only
+        map_ordered(work, range(5), workers=4)
+    summary = profiler.summary()
+    assert summary['stages']['stage']['counters'] == {FILES_OPENED: 20}
+    assert summary['totals'] == {FILES_OPENED: 25}
+
+
+def test_storage_stage_counters(small_disk):
+    catalog = scan_disk(small_disk)
+    with Profiler() as profiler:
+        collect_storage(catalog.datasets, workers=3)
+    counters = profiler.summary()['stages']['storage']['counters']
+    # the tile of every LOD folder; the dataset folders were listed by the scan
+    assert counters[DIR_ENTRIES] == sum(d.lod for d in catalog)
+
+
+def test_profile_of_a_scan(small_disk):
+    with Profiler() as profiler:
+        catalog = scan_disk(small_disk, workers=1)
+    summary = profiler.summary()
+    for stage in ('list trees', 'dataset', 'labels', 'eam name'):
+        assert stage in summary['stages'], stage
+    assert summary['stages']['dataset']['calls'] == 7
+    assert 'cache load' not in summary['stages']
+    # every map.def, the ini file and nothing else is opened
+    assert summary['totals'][FILES_OPENED] == len(catalog) + 1
+    assert summary['totals'][DIR_ENTRIES] > 0 and summary['totals'][BYTES_READ] > 0
+
+
+def test_cli_profile(small_disk, tmp_path):
+    profile = str(tmp_path / 'profile.json')
+    trace = str(tmp_path / 'trace.json')
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'csv', '--no-cache', '--profile', profile,
+                 '--chrome-trace', trace, '-q']) == 0
+    assert (tmp_path / ('Overview_' + EAM_NAME + '.csv')).exists()
+    with open(profile) as f:
+        summary = json.load(f)
+    assert 'csv Overview' in summary['stages'] and summary['wall_seconds'] > 0
+    with open(trace) as f:
+        events = json.load(f)['traceEvents']
+    assert set(e['ph'] for e in events) == {'X'}
+    assert len(events) == sum(stage['calls'] for stage in summary['stages'].values())
+    assert any(e['args'].get('dataset') == 'raster/icao_500k' for e in events)
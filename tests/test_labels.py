@@ -0,0 +1,75 @@
+import os
+import random
+
+from euronav.catalog import scan_disk
+from euronav.disk import DiskLayout
+from euronav.labels import LabelIndex, PatternMatcher, label_pattern
+from euronav.walker import list_dirs
+
+
+def naive_match(files, dirnames):
+    '''The label files of every dataset, by testing every pattern against every file.'''
+    return dict((dirname, [f for f in files if label_pattern(dirname) in f]) for dirname in dirnames)
+
+
+def test_label_pattern():
+    assert label_pattern('jepp_world_3') == 'JEPP'
+    assert label_pattern('Reppts_europe') == 'REPORTINGPOINTS'
+    assert label_pattern('rus_100k_nat_2') == 'RUS_100K_NAT_2'
+
+
+def test_matcher_against_naive_search():
+    rng = random.Random(1)
+    for _ in range(200):
+        # a small alphabet gives many overlapping and nested patterns
+        patterns = list(set(''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(8)))
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 30)))
+        matcher = PatternMatcher(patterns)
+        found = set(matcher.patterns[n] for n in matcher.search(text))
+        assert found == set(p for p in patterns if p in text), (patterns, text)
+
+
+def test_matcher_ignores_empty_and_repeated_patterns():
+    matcher = PatternMatcher(['', 'AB', 'AB', 'B'])
+    assert matcher.patterns == ['AB', 'B']
+    assert [matcher.patterns[n] for n in sorted(matcher.search('xABx'))] == ['AB', 'B']
+
+
+def test_index_against_naive_match(small_disk):
+    layout = DiskLayout(small_disk)
+    dirnames = sorted(os.listdir(layout.vector))
+    files = sorted(os.listdir(layout.sql))
+    labels = LabelIndex(layout.sql).match(dirnames)
+    assert labels == naive_match(files, dirnames)
+    assert labels['jepp_europe'] == ['JEPP_WORLD_LABELS.sql'] and labels['rus_100k_nat_2'] == []
+
+
+def test_index_of_a_synthetic_disk(disk):
+    layout = DiskLayout(disk)
+    dirnames = list_dirs(layout.vector)
+    labels = LabelIndex(layout.sql).match(dirnames)
+    assert labels == naive_match(sorted(os.listdir(layout.sql)), dirnames)
+    assert any(labels.values()) and not all(labels.values())
+
+
+def test_index_of_a_missing_folder(tmp_path):
+    index = LabelIndex(str(tmp_path / 'SQL'))
+    assert index.files == []
+    assert index.match(['a', 'jepp_x']) == {'a': [], 'jepp_x': []}
+
+
+def test_series_names_inside_other_names(tmp_path):
+    sql = tmp_path / 'SQL'
+    sql.mkdir()
+    for name in ('RUS_100K_NAT_1_LABELS.sql', 'RUS_100K_NAT_12_LABELS.sql', 'JEPP_WORLD.sql', 'OTHER.sql'):
+        (sql / name).write_bytes(b'')
+    dirnames = ['rus_100k_nat_1', 'rus_100k_nat_12', 'jepp_europe_1', 'jepp_asia_2', 'ger_50k_top_1']
+    labels = LabelIndex(str(sql)).match(dirnames)
+    assert labels == naive_match(sorted(os.listdir(str(sql))), dirnames)
+    assert labels['rus_100k_nat_1'] == ['RUS_100K_NAT_12_LABELS.sql', 'RUS_100K_NAT_1_LABELS.sql']
+    assert labels['jepp_asia_2'] == ['JEPP_WORLD.sql']
+
+
+def test_scan_keeps_the_label_files(small_disk):
+    vector = scan_disk(small_disk).by_kind('vector')
+    assert [d.labels for d in vector] == [['JEPP_WORLD_LABELS.sql'], ['RUS_100K_NAT_1_LABELS.sql'], []]
@@ -0,0 +1,102 @@
+import csv
+import mmap
+import os
+
+import pytest
+
+from conftest import make_disk
+from euronav import labelstats
+from euronav.cli import main
+from euronav.labelstats import LabelStats, label_stats
+
+SQL = b"""-- exported; by 'tool'
+CREATE TABLE labels (id INTEGER, text TEXT);
+CREATE TABLE IF NOT EXISTS "empty" (id INTEGER);
+INSERT INTO labels VALUES (1, 'a;b');
+INSERT INTO labels VALUES (2, 'it''s; -- not a comment');
+insert into labels (id, text) values (3, 'x'), (4, '), (;'), (5, '');
+INSERT OR REPLACE INTO "labels" VALUES (6, ';;;');  -- trailing; comment 'with quote
+REPLACE INTO other VALUES (7, 'done');
+"""
+
+
+def stats_of(tmp_path, data, name='LABELS.sql'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return label_stats(str(path))
+
+
+def counts(stats):
+    return stats.statements, stats.tables, stats.status
+
+
+@pytest.fixture(params=['mapped', 'read'])
+def small_blocks(request, monkeypatch):
+    '''Read in blocks of a few bytes, from a memory map or from the file.'''
+    monkeypatch.setattr(labelstats, 'BLOCK_SIZE', 3)
+    if request.param == 'read':
+        def no_map(*args, **kwargs):
+            raise ValueError('mmap not available')
+        monkeypatch.setattr(mmap, 'mmap', no_map)
+
+
+def test_quoted_semicolons_and_comments(tmp_path):
+    stats = stats_of(tmp_path, SQL)
+    assert counts(stats) == (7, {'labels': 6, 'empty': 0, 'other': 1}, 'ok')
+    assert stats.rows == 7 and stats.bytes == len(SQL)
+
+
+def test_block_boundaries_everywhere(tmp_path, small_blocks):
+    assert counts(stats_of(tmp_path, SQL)) == (7, {'labels': 6, 'empty': 0, 'other': 1}, 'ok')
+
+
+def test_every_cut_of_the_file(tmp_path, monkeypatch):
+    '''Reading in blocks of any size gives the counts of reading at once.'''
+    expected = counts(stats_of(tmp_path, SQL))
+    for size in range(1, 40):
+        monkeypatch.setattr(labelstats, 'BLOCK_SIZE', size)
+        assert counts(stats_of(tmp_path, SQL)) == expected, size
+
+
+@pytest.mark.parametrize('data, expected', [
+    (b'', (0, {}, 'empty')),
+    (b'CREATE TABLE labels (id INTEGER);\n', (1, {'labels': 0}, 'empty')),
+    (b"INSERT INTO labels VALUES (1, 'a');\nINSERT INTO labels VALUES (2, ", (1, {'labels': 1}, 'truncated')),
+    # the ';' is inside a string that never ends
+    (b"INSERT INTO labels VALUES (1, 'a);\n", (0, {}, 'truncated')),
+    (b"INSERT INTO labels VALUES (1, 'a');\n-- end; of file", (1, {'labels': 1}, 'ok')),
+    (b"INSERT INTO labels VALUES (1, '''');\n\n  \n", (1, {'labels': 1}, 'ok')),
+])
+def test_status(tmp_path, small_blocks, data, expected):
+    assert counts(stats_of(tmp_path, data)) == expected
+
+
+def test_long_statement_is_truncated():
+    stats = LabelStats('x')
+    counter = labelstats._BlockCounter(stats, max_statement=100)
+    assert counter.feed(b'INSERT INTO labels VALUES ' + b"(1, 'a string not carried'), " * 3)
+    assert not counter.feed(b'(1, 2), ' * 20)
+    assert stats.status == 'truncated'
+
+
+def test_unreadable(tmp_path):
+    stats = label_stats(str(tmp_path / 'missing.sql'))
+    assert stats.status == 'unreadable' and stats.error
+
+
+def test_cli_labels_csv(tmp_path):
+    db_path = make_disk(tmp_path / 'db', label_share=0.0)
+    sql = os.path.join(db_path, 'data', 'SQL')
+    vector = sorted(os.listdir(os.path.join(db_path, 'data', 'vector')))
+    dirname = [d for d in vector if 'jepp' not in d and 'reppts' not in d][0]
+    with open(os.path.join(sql, dirname.upper() + '_LABELS.sql'), 'wb') as f:
+        f.write(SQL)
+    out = tmp_path / 'out'
+    out.mkdir()
+    assert main(['scan', db_path, '--label-stats', '--format', 'csv', '--out', str(out), '--no-cache', '-q']) == 0
+
+    with open(str(out / 'Labels_9.99.99.csv'), newline='') as f:
+        records = list(csv.DictReader(f, delimiter=';'))
+    assert set(r['DATASET'] for r in records) == {dirname}
+    assert set((r['STATEMENTS'], r['STATUS']) for r in records) == {('7', 'ok')}
+    assert dict((r['TABLE'], r['ROWS']) for r in records) == {'labels': '6', 'empty': '0', 'other': '1'}
@@ -0,0 +1,135 @@
+import os
+
+import pytest
+
+from conftest import bump_mtime, write_disk
+from euronav.catalog import scan_disk
+from euronav.cli import main
+from euronav.disk import KINDS, DiskLayout
+from euronav.mapdef import MapDefError, parse_lines, parse_many, parse_map_def
+from euronav.walker import list_dirs
+
+
+def parse_data(data, path='<map.def>'):
+    return parse_lines(data.decode('latin-1').splitlines(), path=path)
+
+
+def test_complete():
+    record = parse_data(b'type vector\nname rus_100k_nat_2\ngroup russia\npriority 3\ncategory topo\n'
+                        b'publication 2018-05\nbbmin 37.5 55.0\nbbmax 38.0 55.5\n')
+    assert (record.type, record.name, record.group, record.priority, record.category, record.publication) == \
+        ('vector', 'rus_100k_nat_2', 'russia', 3, 'topo', '2018-05')
+    assert (record.xmin, record.ymin, record.xmax, record.ymax) == (37.5, 55.0, 38.0, 55.5)
+    assert record.has_bbox() and record.extras is None
+
+
+def test_missing_keys_stay_none():
+    record = parse_data(b'type raster\nbbmin 1 2\n')
+    assert record.type == 'raster'
+    assert (record.name, record.priority, record.xmax) == (None, None, None)
+    assert not record.has_bbox()
+
+
+def test_unknown_keys_are_extras():
+    record = parse_data(b'name a\nprojection mercator\ncopyright EuroAvionics GmbH\n')
+    assert record.extras == {'projection': 'mercator', 'copyright': 'EuroAvionics GmbH'}
+
+
+def test_values_containing_keywords():
+    record = parse_data(b'name typeset group\ngroup priority\n')
+    assert (record.name, record.group, record.type, record.priority) == ('typeset group', 'priority', None, None)
+
+
+def test_blank_lines_comments_case_and_line_ends():
+    record = parse_data(b'\r\n# exported\r\n  TYPE   terrain  \r\nName\tdem_1\r\nPRIORITY 7\r\nname_only\r\n')
+    assert (record.type, record.name, record.priority) == ('terrain', 'dem_1', 7)
+    assert record.extras == {'name_only': ''}
+
+
+def test_latin1_values():
+    assert parse_data('name Zürich\n'.encode('latin-1')).name == 'Zürich'
+
+
+@pytest.mark.parametrize('data, message', [
+    (b'priority high\n', 'invalid priority'),
+    (b'bbmin 1\n', 'bbmin needs two coordinates'),
+    (b'type vector\nbbmax 1 north\n', 'invalid bbmax'),
+])
+def test_errors_name_file_and_line(data, message):
+    with pytest.raises(MapDefError) as info:
+        parse_data(data, path='x/map.def')
+    assert message in str(info.value)
+    assert info.value.path == 'x/map.def'
+    assert info.value.line_number == data.count(b'\n')
+
+
+def test_parse_map_def_of_a_folder(tmp_path, monkeypatch):
+    (tmp_path / 'map.def').write_bytes(b'name folder\n')
+    (tmp_path / 'empty').mkdir()
+
+    def no_stat(path):
+        raise AssertionError('stat of ' + path)
+
+    # open() tells a folder from a file
+    monkeypatch.setattr(os.path, 'isdir', no_stat)
+    assert parse_map_def(str(tmp_path)).name == 'folder'
+    assert parse_map_def(str(tmp_path / 'map.def')).name == 'folder'
+    with pytest.raises(OSError):
+        parse_map_def(str(tmp_path / 'empty'))
+
+
+def test_parse_many_keeps_order_and_errors(tmp_path):
+    good = tmp_path / 'good.def'
+    good.write_bytes(b'name good\n')
+    bad = tmp_path / 'bad.def'
+    bad.write_bytes(b'priority x\n')
+    errors = []
+    records = parse_many([str(good), str(tmp_path / 'missing.def'), str(bad)], errors)
+    assert records[0].name == 'good' and records[1:] == [None, None]
+    assert len(errors) == 2 and isinstance(errors[1], MapDefError)
+
+
+def test_scan_reads_the_records(small_disk):
+    catalog = scan_disk(small_disk)
+    assert [(d.name, d.priority, d.xmin, d.ymax) for d in catalog.by_kind('raster')] == [
+        ('ger_50k_top', 2, 6.0, 55.0), ('icao_500k', 5, 5.5, 55.5)]
+
+
+def test_invalid_map_def_is_reported(tmp_path, open_cache, capsys):
+    db_path = write_disk(tmp_path / 'db', {'raster': [('bad', 'name bad\npriority high\n', 1),
+                                                      ('good', 'name good\n', 1)]})
+    catalog = scan_disk(db_path)
+    assert [d.name for d in catalog] == ['good']
+    assert catalog.errors == [os.path.join(db_path, 'data', 'raster', 'bad', 'map.def') +
+                              ":2: invalid priority 'high'"]
+
+    # not cached: every scan reports it again
+    cache = open_cache(db_path)
+    for engine in ('threads', 'threads', 'async'):
+        assert scan_disk(db_path, cache=cache, engine=engine).errors == catalog.errors
+    assert list(cache.load()) == [('raster', 'good')]
+
+    # once fixed the dataset is cached; broken again (as reported by the watch), its entry goes
+    map_def = os.path.join(db_path, 'data', 'raster', 'bad', 'map.def')
+    for content, errors in (('name bad\n', 0), ('name bad\npriority high\n', 1)):
+        with open(map_def, 'w') as f:
+            f.write(content)
+        bump_mtime(map_def)
+        assert len(scan_disk(db_path, cache=cache, changed=[map_def]).errors) == errors
+        assert len(cache.load()) == 2 - errors
+
+    assert main(['scan', db_path, '--out', str(tmp_path), '--format', 'csv', '--no-cache', '-q']) == 0
+    assert capsys.readouterr().err == 'Dataset left out: ' + catalog.errors[0] + '\n'
+
+
+def test_synthetic_variants(disk):
+    '''All map.def variants of the synthetic disk parse; extras and missing keys both occur.'''
+    layout = DiskLayout(disk)
+    paths = [os.path.join(layout.tree(kind), dirname, 'map.def') for kind in KINDS
+             for dirname in list_dirs(layout.tree(kind))]
+    paths = [p for p in paths if os.path.isfile(p)]
+    errors = []
+    records = parse_many(paths, errors)
+    assert not errors and None not in records
+    assert any(r.extras for r in records)
+    assert any(not r.has_bbox() or r.priority is None or r.group is None for r in records)
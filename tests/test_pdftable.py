@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import pdf_pages
+from euronav.pdftable import FONT_SIZE, PAGE_HEIGHT, PAGE_WIDTH, TablePdf, fit_text, rgb, text_width
+
+COLUMNS = ('TYPE', 'NAME', 'LOD')
+WIDTHS = (1, 3, 1)
+
+
+def write_table(path, pages):
+    with TablePdf(str(path)) as pdf:
+        for title, rows in pages:
+            pdf.add_table_page(title, COLUMNS, WIDTHS, rows, [['#FFFFDA', 'w', 'w']] * len(rows))
+    return str(path)
+
+
+def test_text_width_and_fit():
+    assert text_width('', 10) == 0
+    assert text_width('ii', 10) == 2 * 2.22
+    # characters without a width table entry count as wide
+    assert text_width('ü', 10) == 5.56
+    assert fit_text('short', 100, FONT_SIZE) == 'short'
+    cut = fit_text('a rather long dataset name', 40, FONT_SIZE)
+    assert cut.endswith('...') and text_width(cut, FONT_SIZE) <= 40
+    assert fit_text('long', 1, FONT_SIZE) == ''
+
+
+def test_rgb():
+    assert rgb('w') == (1.0, 1.0, 1.0)
+    assert rgb('#FF0000') == (1.0, 0.0, 0.0)
+
+
+def test_pages_and_text(tmp_path):
+    path = write_table(tmp_path / 'table.pdf', [
+        ('1.23.45 - Table 1 of 2', [['vector', 'rus_(100k)\\nat', 3]]),
+        ('1.23.45 - Table 2 of 2', [['raster', 'Zürich', 1], ['terrain', 'dem', 5]]),
+    ])
+    assert pdf_pages(path) == 2
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data.startswith(b'%PDF-1.4') and data.rstrip().endswith(b'%%EOF')
+
+    pypdf = pytest.importorskip('pypdf')
+    reader = pypdf.PdfReader(path)
+    assert [(float(p.mediabox.width), float(p.mediabox.height)) for p in reader.pages] == [(PAGE_WIDTH, PAGE_HEIGHT)] * 2
+    first, second = [p.extract_text() for p in reader.pages]
+    assert '1.23.45 - Table 1 of 2' in first and 'rus_(100k)\\nat' in first
+    assert 'Zürich' in second and 'dem' in second and 'NAME' in second
+
+
+def test_empty_file(tmp_path):
+    assert pdf_pages(write_table(tmp_path / 'empty.pdf', [])) == 0
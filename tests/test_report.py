@@ -0,0 +1,99 @@
+import os
+import sys
+
+import pytest
+
+from conftest import pdf_pages, write_disk
+from euronav import report
+from euronav.catalog import scan_disk
+from euronav.memory import format_bytes, peak_rss
+from euronav.report import ReportError, write_extended_pdf, write_overview_pdf
+
+
+def raster_datasets(count):
+    '''count raster datasets, numbered as one series.'''
+    return {'raster': [('chart_%d' % n, 'type raster\nname chart_%d\npriority %d\n' % (n, n % 7), 1)
+                       for n in range(1, count + 1)]}
+
+
+@pytest.fixture
+def big_catalog(tmp_path):
+    return scan_disk(write_disk(tmp_path / 'db', raster_datasets(45)))
+
+
+def test_pages_are_streamed(big_catalog, tmp_path, monkeypatch):
+    plt = report._pyplot()
+    from matplotlib.backends.backend_pdf import PdfPages
+    open_figures = []
+    savefig = PdfPages.savefig
+
+    def counting_savefig(self, *args, **kwargs):
+        open_figures.append(len(plt.get_fignums()))
+        return savefig(self, *args, **kwargs)
+
+    monkeypatch.setattr(PdfPages, 'savefig', counting_savefig)
+    path = write_extended_pdf(big_catalog, str(tmp_path))
+    assert pdf_pages(path) == 4
+    # every page, the coverage map first, is closed before the next one is drawn
+    assert open_figures == [1, 1, 1, 1] and not plt.get_fignums()
+
+
+def test_overview_collapses_the_series(big_catalog, tmp_path):
+    assert pdf_pages(write_overview_pdf(big_catalog, str(tmp_path))) == 1
+
+
+def test_pages_rendered_in_worker_processes(big_catalog, tmp_path):
+    pypdf = pytest.importorskip('pypdf')
+    one = tmp_path / 'one'
+    two = tmp_path / 'two'
+    one.mkdir()
+    two.mkdir()
+    expected = [p.extract_text() for p in pypdf.PdfReader(write_extended_pdf(big_catalog, str(one))).pages]
+    path = write_extended_pdf(big_catalog, str(two), jobs=2)
+    assert [p.extract_text() for p in pypdf.PdfReader(path).pages] == expected
+    names = [line.split()[1] for text in expected for line in text.splitlines() if line.startswith('raster ')]
+    assert names == [d.name for d in big_catalog]
+    # the chunk files are removed
+    assert os.listdir(str(two)) == [os.path.basename(path)]
+
+
+def test_jobs_need_pypdf(big_catalog, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pypdf', None)
+    with pytest.raises(ReportError) as info:
+        write_extended_pdf(big_catalog, str(tmp_path), jobs=2)
+    assert 'pypdf' in str(info.value)
+    # one job does not need it
+    assert pdf_pages(write_extended_pdf(big_catalog, str(tmp_path))) == 4
+
+
+def test_native_renderer(big_catalog, tmp_path):
+    extended = write_extended_pdf(big_catalog, str(tmp_path), 'native')
+    overview = write_overview_pdf(big_catalog, str(tmp_path), 'native')
+    assert (pdf_pages(extended), pdf_pages(overview)) == (4, 1)
+    with pytest.raises(ValueError):
+        write_extended_pdf(big_catalog, str(tmp_path), 'tex')
+
+
+@pytest.mark.parametrize('renderer', report.RENDERERS)
+def test_empty_catalog(tmp_path, renderer):
+    # a dataset folder without a readable map.def
+    catalog = scan_disk(write_disk(tmp_path / 'db', {'raster': [('bare', None, 1)]}))
+    assert len(catalog) == 0
+    assert pdf_pages(write_overview_pdf(catalog, str(tmp_path), renderer)) == 1
+    # the coverage map and the "No datasets" page
+    assert pdf_pages(write_extended_pdf(catalog, str(tmp_path), renderer)) == 2
+    assert not report._pyplot().get_fignums()
+
+
+@pytest.mark.parametrize('renderer', report.RENDERERS)
+def test_write_error(big_catalog, tmp_path, renderer):
+    with pytest.raises(ReportError) as info:
+        write_extended_pdf(big_catalog, str(tmp_path / 'missing'), renderer)
+    assert 'It was not possible to write ' + os.path.join(str(tmp_path / 'missing'), 'Extended_') in str(info.value)
+    assert not report._pyplot().get_fignums()
+
+
+def test_peak_memory():
+    assert peak_rss() > 1024 * 1024
+    assert [format_bytes(n) for n in (10, 2048, 3 * 1024 ** 2, 5 * 1024 ** 3, 2 * 1024 ** 4)] == [
+        '10 B', '2.0 KB', '3.0 MB', '5.0 GB', '2048.0 GB']
@@ -0,0 +1,235 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import DATASETS, EAM_NAME, bump_mtime, rows, write_disk
+from euronav.catalog import Dataset, scan_disk
+from euronav.disk import DiskError
+
+
+def test_catalog_of_a_small_disk(small_disk):
+    catalog = scan_disk(small_disk)
+    assert catalog.eam_name == EAM_NAME
+    assert catalog.counts == {'vector': 4, 'raster': 2, 'terrain': 1}
+    assert [(d.kind, d.dirname) for d in catalog] == [
+        ('vector', 'jepp_europe'), ('vector', 'rus_100k_nat_1'), ('vector', 'rus_100k_nat_2'),
+        ('raster', 'ger_50k_top'), ('raster', 'icao_500k'), ('terrain', 'dem_europe')]
+
+    rus = catalog.datasets[1]
+    assert rus.path == os.path.join(small_disk, 'data', 'vector', 'rus_100k_nat_1')
+    assert rus.extended_row() == ['vector', 'rus_100k_nat_1', 'russia', 3, 'topo', '2018-05',
+                                  3, 'yes', 37.5, 38.0, 55.0, 55.5]
+    assert [d.sql for d in catalog.by_kind('vector')] == ['yes', 'yes', 'no']
+    assert [d.lod for d in catalog.by_kind('raster')] == [4, 2]
+
+
+def test_workers_give_the_same_catalog(small_disk):
+    expected = rows(scan_disk(small_disk, workers=1))
+    assert rows(scan_disk(small_disk)) == expected
+    assert rows(scan_disk(small_disk, workers=3)) == expected
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_synthetic_disk_scans_alike(disk, open_cache, engine):
+    expected = rows(scan_disk(disk))
+    assert expected[:-2]
+    assert rows(scan_disk(disk, workers=1, engine=engine)) == expected
+
+    cache = open_cache(disk)
+    assert rows(scan_disk(disk, cache=cache, engine=engine)) == expected
+    # warm cache
+    assert rows(scan_disk(disk, cache=cache, engine=engine)) == expected
+
+
+def test_no_cache_entries_without_a_cache(small_disk, monkeypatch):
+    def to_dict(self):
+        raise AssertionError('cache entry built without a cache')
+
+    monkeypatch.setattr(Dataset, 'to_dict', to_dict)
+    assert len(scan_disk(small_disk)) == 6
+
+
+def test_trees_directly_in_the_db_folder(tmp_path):
+    db_path = write_disk(tmp_path / 'db', data=False, eam_name=None)
+    catalog = scan_disk(db_path)
+    assert catalog.eam_name == 'X.XX.XX'
+    assert len(catalog) == 6
+
+
+def test_missing_keys_stay_missing(tmp_path):
+    db_path = write_disk(tmp_path / 'db', {'raster': [('bare', 'name bare\n', 1)]})
+    [dataset] = scan_disk(db_path)
+    assert dataset.extended_row() == ['--', 'bare', '--', '--', '--', '--', 1, 'no', '--', '--', '--', '--']
+
+
+def test_invalid_path(tmp_path):
+    with pytest.raises(DiskError):
+        scan_disk(str(tmp_path / 'missing'))
+
+
+def test_disk_without_datasets(tmp_path):
+    os.makedirs(str(tmp_path / 'db' / 'data' / 'SQL'))
+    with pytest.raises(DiskError):
+        scan_disk(str(tmp_path / 'db'))
+
+
+def test_every_tree_is_counted(tmp_path):
+    datasets = dict(DATASETS, vector=[('no_map_def', None, 1)])
+    catalog = scan_disk(write_disk(tmp_path / 'db', datasets))
+    assert catalog.counts == {'vector': 1, 'raster': 2, 'terrain': 1}
+    assert not catalog.by_kind('vector')
+
+
+def dataset_path(db_path, kind, dirname):
+    return os.path.join(db_path, 'data', kind, dirname)
+
+
+def test_cache_gives_the_same_catalog(small_disk, open_cache):
+    expected = rows(scan_disk(small_disk))
+    cache = open_cache(small_disk)
+    assert rows(scan_disk(small_disk, cache=cache)) == expected
+    # warm cache
+    assert rows(scan_disk(small_disk, cache=cache)) == expected
+    assert rows(scan_disk(small_disk, workers=1, cache=cache)) == expected
+
+
+def test_cache_is_used(small_disk, open_cache):
+    cache = open_cache(small_disk)
+    scan_disk(small_disk, cache=cache)
+    map_def = os.path.join(dataset_path(small_disk, 'raster', 'icao_500k'), 'map.def')
+    st = os.stat(map_def)
+    with open(map_def, 'r+b') as f:
+        data = f.read()
+        f.seek(0)
+        f.write(data.replace(b'type raster', b'type RASTER'))
+    # same size and mtime: the cached record is still taken
+    os.utime(map_def, ns=(st.st_atime_ns, st.st_mtime_ns))
+    cached = dict((d.dirname, d) for d in scan_disk(small_disk, cache=cache))
+    fresh = dict((d.dirname, d) for d in scan_disk(small_disk))
+    assert (cached['icao_500k'].type, fresh['icao_500k'].type) == ('raster', 'RASTER')
+
+    # a rebuilt cache reads everything again
+    assert rows(scan_disk(small_disk, cache=open_cache(small_disk, rebuild=True))) == rows(scan_disk(small_disk))
+
+
+def replace_map_def(folder, data):
+    '''Replace the map.def of folder the way a copy step does, changing the folder mtime.'''
+    temp = os.path.join(folder, 'map.def.part')
+    with open(temp, 'w') as f:
+        f.write(data)
+    os.replace(temp, os.path.join(folder, 'map.def'))
+    bump_mtime(folder)
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_changed_map_def_is_read_again(small_disk, open_cache, engine):
+    cache = open_cache(small_disk)
+    scan_disk(small_disk, cache=cache, engine=engine)
+    folder = dataset_path(small_disk, 'terrain', 'dem_europe')
+    map_def = os.path.join(folder, 'map.def')
+    with open(map_def) as f:
+        data = f.read()
+    replace_map_def(folder, data + 'priority 42\n')
+
+    catalog = scan_disk(small_disk, cache=cache, engine=engine)
+    assert rows(catalog) == rows(scan_disk(small_disk))
+    assert [d.priority for d in catalog.by_kind('terrain')] == [42]
+
+    # an edit in place keeps the folder mtime: it is read again once the watch reports it
+    with open(map_def, 'a') as f:
+        f.write('priority 43\n')
+    bump_mtime(map_def)
+    assert [d.priority for d in scan_disk(small_disk, cache=cache, engine=engine).by_kind('terrain')] == [42]
+    catalog = scan_disk(small_disk, cache=cache, engine=engine, changed={map_def})
+    assert [d.priority for d in catalog.by_kind('terrain')] == [43]
+    assert rows(catalog) == rows(scan_disk(small_disk))
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_unchanged_folders_skip_the_map_def(small_disk, open_cache, monkeypatch, engine):
+    cache = open_cache(small_disk)
+    expected = rows(scan_disk(small_disk, cache=cache, engine=engine))
+    stats = []
+    stat = os.stat
+
+    def counting(path, *args, **kwargs):
+        if os.path.basename(path) == 'map.def':
+            stats.append(path)
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, 'stat', counting)
+    assert rows(scan_disk(small_disk, cache=cache, engine=engine)) == expected
+    assert stats == []
+
+    # a changed tree folder checks all its datasets
+    tree = os.path.join(small_disk, 'data', 'raster')
+    assert rows(scan_disk(small_disk, cache=cache, engine=engine, changed={tree})) == expected
+    assert sorted(stats) == sorted(os.path.join(tree, dirname, 'map.def') for dirname in ('ger_50k_top', 'icao_500k'))
+
+
+def test_added_and_removed_lod_folders_are_counted(small_disk, open_cache):
+    cache = open_cache(small_disk)
+    scan_disk(small_disk, cache=cache)
+    added = dataset_path(small_disk, 'raster', 'ger_50k_top')
+    os.mkdir(os.path.join(added, 'lod9'))
+    bump_mtime(added)
+    removed = dataset_path(small_disk, 'vector', 'jepp_europe')
+    shutil.rmtree(os.path.join(removed, 'lod0'))
+    bump_mtime(removed)
+
+    catalog = scan_disk(small_disk, cache=cache)
+    assert rows(catalog) == rows(scan_disk(small_disk))
+    lods = dict((d.dirname, d.lod) for d in catalog)
+    assert (lods['ger_50k_top'], lods['jepp_europe']) == (5, 1)
+
+
+def test_added_and_removed_datasets(small_disk, open_cache):
+    cache = open_cache(small_disk)
+    scan_disk(small_disk, cache=cache)
+    shutil.rmtree(dataset_path(small_disk, 'vector', 'rus_100k_nat_2'))
+    new = dataset_path(small_disk, 'raster', 'zzz_new_dataset')
+    os.makedirs(os.path.join(new, 'lod0'))
+    with open(os.path.join(new, 'map.def'), 'w') as f:
+        f.write('type raster\nname zzz_new_dataset\n')
+
+    catalog = scan_disk(small_disk, cache=cache)
+    assert rows(catalog) == rows(scan_disk(small_disk))
+    dirnames = set(d.dirname for d in catalog)
+    assert 'zzz_new_dataset' in dirnames and 'rus_100k_nat_2' not in dirnames
+    entries = cache.load()
+    assert ('raster', 'zzz_new_dataset') in entries
+    assert ('vector', 'rus_100k_nat_2') not in entries
+
+
+def test_new_label_file_relabels_vector_datasets(small_disk, open_cache):
+    cache = open_cache(small_disk)
+    scan_disk(small_disk, cache=cache)
+    sql = os.path.join(small_disk, 'data', 'SQL')
+    with open(os.path.join(sql, 'RUS_100K_NAT_2_LABELS.sql'), 'w') as f:
+        f.write('CREATE TABLE labels (id INTEGER);\n')
+    bump_mtime(sql)
+
+    catalog = scan_disk(small_disk, cache=cache)
+    assert rows(catalog) == rows(scan_disk(small_disk))
+    dataset = [d for d in catalog if d.dirname == 'rus_100k_nat_2'][0]
+    assert (dataset.labels, dataset.sql) == (['RUS_100K_NAT_2_LABELS.sql'], 'yes')
+
+
+def test_rescan_writes_only_the_changes(small_disk, open_cache):
+    cache = open_cache(small_disk)
+    scan_disk(small_disk, cache=cache)
+    written = cache.connection.total_changes
+    scan_disk(small_disk, cache=cache)
+    assert cache.connection.total_changes == written
+
+    updates = []
+    update = cache.update
+    cache.update = lambda changed, removed, sql_signature: (updates.append((sorted(changed), sorted(removed))),
+                                                            update(changed, removed, sql_signature))
+    replace_map_def(dataset_path(small_disk, 'terrain', 'dem_europe'), 'name dem_europe\npriority 42\n')
+    shutil.rmtree(dataset_path(small_disk, 'raster', 'icao_500k'))
+    catalog = scan_disk(small_disk, cache=cache)
+    assert updates == [([('terrain', 'dem_europe')], [('raster', 'icao_500k')])]
+    assert rows(catalog) == rows(scan_disk(small_disk))
+    assert len(cache.load()) == 6
@@ -0,0 +1,69 @@
+from euronav.catalog import Dataset, scan_disk
+from euronav.report import overview_rows
+from euronav.series import group_series, series_key, series_stem
+
+
+def dataset(kind, name, lod=1, bbox=None, dirname=None):
+    d = Dataset(kind, dirname or name or 'unnamed', '/db/' + kind + '/' + (dirname or name or 'unnamed'))
+    d.name = name
+    d.lod = lod
+    if bbox is not None:
+        d.xmin, d.ymin, d.xmax, d.ymax = bbox
+    return d
+
+
+def test_series_stem():
+    assert series_stem('rus_100k_nat_12') == 'rus_100k_nat'
+    assert series_stem('rus_100k_nat') == 'rus_100k_nat'
+    assert series_stem('dem_1x') == 'dem_1x'
+    assert series_stem('_1') == '_1'
+    assert series_stem('100') == '100'
+    assert series_stem('') == ''
+    assert series_stem(None) is None
+
+
+def test_grouping():
+    datasets = [
+        dataset('vector', 'rus_1', 2, (37.5, 55.0, 38.0, 55.5)),
+        dataset('vector', 'other', 1),
+        # not next to the rest of its series
+        dataset('vector', 'rus_2', 3, (38.0, 54.5, 38.5, 55.0)),
+        dataset('vector', 'rus_3', 1),
+        # same stem, other kind
+        dataset('raster', 'rus_1', 4, (0.0, 0.0, 1.0, 1.0)),
+    ]
+    series = group_series(datasets)
+    assert [(s.kind, s.name, s.count, s.lod) for s in series] == [
+        ('vector', 'rus', 3, 6), ('vector', 'other', 1, 1), ('raster', 'rus_1', 1, 4)]
+    rus = series[0]
+    assert rus.members == [datasets[0], datasets[2], datasets[3]] and rus.first is datasets[0]
+    assert (rus.xmin, rus.ymin, rus.xmax, rus.ymax) == (37.5, 54.5, 38.5, 55.5)
+    assert (series[1].xmin, series[1].ymax) == (None, None)
+    # the datasets are not renamed
+    assert [d.name for d in datasets] == ['rus_1', 'other', 'rus_2', 'rus_3', 'rus_1']
+
+
+def test_unnamed_datasets_stay_apart():
+    datasets = [dataset('raster', None, dirname='a_1'), dataset('raster', None, dirname='a_2'),
+                dataset('raster', '', dirname='a_3'), dataset('raster', 'a_4')]
+    assert series_key(datasets[0]) == ('raster', None, 'a_1')
+    assert series_key(datasets[3]) == ('raster', 'a')
+    series = group_series(datasets)
+    assert [(s.name, s.count) for s in series] == [(None, 1), (None, 1), ('', 1), ('a_4', 1)]
+    assert [s.first for s in series] == datasets
+
+
+def test_many_datasets():
+    datasets = [dataset('raster', 'chart_%d' % n) for n in range(5000)]
+    [series] = group_series(datasets)
+    assert series.count == 5000 and series.name == 'chart'
+
+
+def test_overview_rows(small_disk):
+    rows = overview_rows(scan_disk(small_disk))
+    assert [(kind, row[1]) for kind, row in rows] == [
+        ('vector', 'jepp_europe'), ('vector', 'rus_100k_nat'), ('raster', 'ger_50k_top'), ('raster', 'icao_500k'),
+        ('terrain', 'dem_europe')]
+    # COUNT, summed LOD and the union of the bounding boxes of the series
+    assert rows[1][1] == ['vector', 'rus_100k_nat', 'russia', 3, 'topo', '2018-05', 2, 6, 37.5, 38.5, 55.0, 55.5]
+    assert rows[0][1][6:] == [1, 2, -10.0, 30.0, 35.0, 60.0]
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from euronav.catalog import scan_disk
+from euronav.cli import main
+from euronav.spatial import BoxIndex, coverage, coverage_order, dataset_box, segment_hits_box
+
+
+def random_box(rng):
+    x = rng.uniform(-180, 170)
+    y = rng.uniform(-85, 75)
+    w = rng.choice((0.0, 0.5, 2.0, 10.0, 60.0))
+    h = rng.choice((0.0, 0.5, 2.0, 10.0, 60.0))
+    # corners in either order, as in map.def files with swapped bbmin/bbmax
+    return (x + w, y, x, y + h) if rng.random() < 0.1 else (x, y, x + w, y + h)
+
+
+def normal(box):
+    x0, y0, x1, y1 = box
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+def brute_force(boxes, query, test=None):
+    found = []
+    for i, box in enumerate(boxes):
+        if box is None:
+            continue
+        b = normal(box)
+        if b[0] <= query[2] and query[0] <= b[2] and b[1] <= query[3] and query[1] <= b[3]:
+            if test is None or test(b):
+                found.append(i)
+    return found
+
+
+@pytest.mark.parametrize('count, capacity', [(0, 16), (1, 16), (15, 4), (300, 16), (1000, 8)])
+def test_search_against_brute_force(count, capacity):
+    rng = random.Random(count)
+    boxes = [random_box(rng) if rng.random() > 0.05 else None for _ in range(count)]
+    index = BoxIndex(boxes, capacity)
+    assert len(index) == sum(1 for b in boxes if b is not None)
+    for _ in range(100):
+        query = normal(random_box(rng))
+        assert index.search(query) == brute_force(boxes, query)
+        x, y = rng.uniform(-180, 180), rng.uniform(-90, 90)
+        assert index.point(x, y) == brute_force(boxes, (x, y, x, y))
+
+
+def test_segments_and_routes_against_brute_force():
+    rng = random.Random(7)
+    boxes = [random_box(rng) for _ in range(500)]
+    index = BoxIndex(boxes)
+    for _ in range(100):
+        points = [(rng.uniform(-180, 180), rng.uniform(-90, 90)) for _ in range(rng.randint(1, 4))]
+        expected = set()
+        if len(points) == 1:
+            expected.update(brute_force(boxes, points[0] + points[0]))
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            expected.update(brute_force(boxes, (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)),
+                                        lambda b: segment_hits_box(x0, y0, x1, y1, b)))
+        assert index.route(points) == sorted(expected)
+
+
+def test_segment_hits_box():
+    box = (0.0, 0.0, 1.0, 1.0)
+    assert segment_hits_box(-1, 0.5, 2, 0.5, box)
+    assert segment_hits_box(0.5, 0.5, 0.6, 0.6, box)
+    # the bounding boxes overlap, the segment passes the corner
+    assert not segment_hits_box(-1, 0.5, 0.5, 2, box)
+
+
+def test_coverage_of_a_small_disk(small_disk):
+    catalog = scan_disk(small_disk)
+    assert [d.name for d in coverage(catalog, point=(37.6, 55.2))] == ['rus_100k_nat_1', 'dem_europe']
+    assert [d.name for d in coverage(catalog, point=(38.0, 55.2), kinds=['vector'])] == ['rus_100k_nat_1', 'rus_100k_nat_2']
+    # corners in either order, best priority first
+    assert [d.name for d in coverage(catalog, bbox=(16, 56, 10, 50))] == [
+        'jepp_europe', 'ger_50k_top', 'icao_500k', 'dem_europe']
+    assert [d.name for d in coverage(catalog, route=[(0.0, 40.0), (20.0, 40.0)], kinds=['vector', 'terrain'])] == [
+        'jepp_europe', 'dem_europe']
+    with pytest.raises(ValueError):
+        coverage(catalog)
+
+
+def test_coverage_of_a_synthetic_disk(disk):
+    catalog = scan_disk(disk)
+    datasets = list(catalog)
+    boxes = [dataset_box(d) for d in datasets]
+    rng = random.Random(3)
+    for _ in range(30):
+        query = normal(random_box(rng))
+        expected = sorted((datasets[i] for i in brute_force(boxes, query)), key=coverage_order)
+        assert coverage(catalog, bbox=query) == expected
+    some = [d for d in datasets if d.has_bbox()][0]
+    x, y = (some.xmin + some.xmax) / 2, (some.ymin + some.ymax) / 2
+    found = coverage(catalog, point=(x, y), kinds=[some.kind])
+    assert some in found and all(d.kind == some.kind for d in found)
+
+
+def test_cli_query(small_disk, capsys):
+    assert main(['query', small_disk, '--point', '10', '50', '--kind', 'raster', '--no-cache']) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == '1.23.45 (' + small_disk + '): 2 datasets'
+    assert [line.split()[:3] for line in out[1:]] == [['raster', 'ger_50k_top', '2'], ['raster', 'icao_500k', '5']]
+
+
+def test_cli_query_exit_status(small_disk, tmp_path, capsys):
+    # nothing covers the Pacific
+    assert main(['query', small_disk, '--point', '-150', '0', '--no-cache']) == 1
+    assert capsys.readouterr().out.splitlines() == ['1.23.45 (' + small_disk + '): 0 datasets']
+    assert main(['query', str(tmp_path / 'missing'), '--point', '10', '50', '--no-cache']) == 1
+
+
+def test_cli_query_of_a_saved_catalog(small_disk, tmp_path, capsys):
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'json', '--no-cache', '-q']) == 0
+    saved = str(tmp_path / 'Catalog_1.23.45.json')
+    capsys.readouterr()
+    assert main(['query', saved, '--point', '37.6', '55.2']) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == '1.23.45 (' + saved + '): 2 datasets'
+    assert [line.split()[1] for line in out[1:]] == ['rus_100k_nat_1', 'dem_europe']
@@ -0,0 +1,81 @@
+import csv
+import os
+
+from conftest import EAM_NAME
+from euronav import storage
+from euronav.catalog import Catalog, scan_disk
+from euronav.cli import main
+from euronav.report import extended_rows
+from euronav.storage import collect_storage, lod_stats
+
+
+def test_lod_stats_walks_sub_folders(tmp_path):
+    (tmp_path / 'lod0' / 'a' / 'b').mkdir(parents=True)
+    (tmp_path / 'lod0' / 'x.tile').write_bytes(b'x' * 10)
+    (tmp_path / 'lod0' / 'a' / 'y.tile').write_bytes(b'y' * 30)
+    (tmp_path / 'lod0' / 'a' / 'b' / 'z.tile').write_bytes(b'z' * 20)
+    stats = lod_stats(str(tmp_path / 'lod0'), 'lod0')
+    assert (stats.lod, stats.files, stats.bytes, stats.largest) == ('lod0', 3, 60, 30)
+    missing = lod_stats(str(tmp_path / 'missing'), 'missing')
+    assert (missing.files, missing.bytes, missing.largest) == (0, 0, 0)
+
+
+def test_collect_storage(small_disk):
+    catalog = scan_disk(small_disk)
+    assert not catalog.has_storage()
+    collect_storage(catalog.datasets, workers=3)
+    assert catalog.has_storage()
+    rus = catalog.datasets[1]
+    assert [(s.lod, s.files, s.bytes, s.largest) for s in rus.lod_stats] == [
+        ('lod0', 1, 100, 100), ('lod1', 1, 200, 200), ('lod2', 1, 300, 300)]
+    assert rus.storage() == (3, 600, 300)
+    assert [d.storage()[0] for d in catalog] == [d.lod for d in catalog]
+    assert extended_rows(catalog)[1][1][-3:] == [3, 0.0, 0.0]
+
+
+def test_lod_folders_come_from_the_scan(small_disk, open_cache, monkeypatch):
+    listed = []
+    list_lod_folders = storage.lod_folders
+
+    def counting(path):
+        listed.append(path)
+        return list_lod_folders(path)
+
+    monkeypatch.setattr(storage, 'lod_folders', counting)
+    catalog = scan_disk(small_disk)
+    collect_storage(catalog.datasets)
+    assert listed == []
+
+    # datasets from the cache were not listed by the scan
+    cache = open_cache(small_disk)
+    scan_disk(small_disk, cache=cache)
+    cached = scan_disk(small_disk, cache=cache, engine='async')
+    collect_storage(cached.datasets)
+    assert sorted(listed) == sorted(d.path for d in catalog)
+    assert [d.storage() for d in cached] == [d.storage() for d in catalog]
+
+
+def test_saved_catalog_keeps_the_statistics(small_disk, tmp_path):
+    catalog = scan_disk(small_disk)
+    collect_storage(catalog.datasets)
+    path = str(tmp_path / 'Catalog.json')
+    catalog.save(path)
+    loaded = Catalog.load(path)
+    assert loaded.has_storage()
+    assert [d.storage() for d in loaded] == [d.storage() for d in catalog]
+
+
+def test_cli_stats(small_disk, tmp_path):
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--stats', '--format', 'csv', '--no-cache', '-q']) == 0
+    with open(str(tmp_path / ('Storage_' + EAM_NAME + '.csv')), newline='') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    assert rows[0] == ['KIND', 'DATASET', 'NAME', 'LOD', 'FILES', 'BYTES', 'LARGEST']
+    assert rows[1:4] == [['vector', 'jepp_europe', 'jepp_europe', 'lod0', '1', '100', '100'],
+                         ['vector', 'jepp_europe', 'jepp_europe', 'lod1', '1', '200', '200'],
+                         ['vector', 'rus_100k_nat_1', 'rus_100k_nat_1', 'lod0', '1', '100', '100']]
+    assert len(rows) == 1 + 2 + 3 + 3 + 4 + 2 + 5
+
+    # without --stats there is no storage csv
+    os.remove(str(tmp_path / ('Storage_' + EAM_NAME + '.csv')))
+    assert main(['scan', small_disk, '--out', str(tmp_path), '--format', 'csv', '--no-cache', '-q']) == 0
+    assert not os.path.exists(str(tmp_path / ('Storage_' + EAM_NAME + '.csv')))
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import make_disk
+from euronav.catalog import scan_disk
+from euronav.report import overview_rows
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tree(db_path):
+    '''Return [(relative path, size)] of every file, and the map.def contents, of a db folder.'''
+    files = []
+    map_defs = []
+    for folder, dirnames, filenames in os.walk(db_path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(folder, name)
+            files.append((os.path.relpath(path, db_path), os.path.getsize(path)))
+            if name == 'map.def':
+                with open(path, 'rb') as f:
+                    map_defs.append(f.read())
+    return files, map_defs
+
+
+def test_same_seed_same_disk(tmp_path):
+    first = tree(make_disk(tmp_path / 'a', seed=5))
+    assert tree(make_disk(tmp_path / 'b', seed=5)) == first
+    assert tree(make_disk(tmp_path / 'c', seed=6)) != first
+
+
+def test_disk_content(disk):
+    catalog = scan_disk(disk)
+    assert catalog.eam_name == '9.99.99'
+    assert catalog.counts == {'vector': 60, 'raster': 40, 'terrain': 30}
+    # some folders have no map.def
+    assert 0 < len(catalog) < 130
+    assert set(d.kind for d in catalog) == {'vector', 'raster', 'terrain'}
+    # numbered series, labelled and unlabelled vector datasets, LOD range
+    assert len(overview_rows(catalog)) < len(catalog)
+    assert set(d.sql for d in catalog.by_kind('vector')) == {'yes', 'no'}
+    assert set(d.lod for d in catalog) <= {1, 2, 3}
+
+
+def test_benchmark_runs(tmp_path):
+    result = str(tmp_path / 'bench.json')
+    subprocess.check_call([sys.executable, os.path.join(ROOT, 'benchmarks', 'bench_stages.py'), '--sizes', '40',
+                           '--repeat', '1', '--workdir', str(tmp_path / 'work'), '--json', result],
+                          stdout=subprocess.DEVNULL)
+    with open(result) as f:
+        [run] = json.load(f)['results']
+    assert run['size'] == 40 and run['datasets'] > 0
+    assert all(seconds is None or seconds >= 0 for seconds in run['seconds'].values())
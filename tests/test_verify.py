@@ -0,0 +1,145 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from euronav import verify
+from euronav.cli import main
+from euronav.verify import UNREADABLE, build_manifest, compare_manifests, read_manifest
+
+
+class Interrupted(Exception):
+    pass
+
+
+def counting_hash_file(monkeypatch):
+    '''Count the files hashed by build_manifest; return the list of their paths.'''
+    hashed = []
+    hash_file = verify.hash_file
+
+    def counting(path, *args):
+        hashed.append(path)
+        return hash_file(path, *args)
+
+    monkeypatch.setattr(verify, 'hash_file', counting)
+    return hashed
+
+
+def test_manifest(own_disk, tmp_path):
+    manifest = str(tmp_path / 'Manifest.sha256')
+    hashes = build_manifest(own_disk, manifest, jobs=3)
+    assert read_manifest(manifest) == hashes
+    assert not os.path.exists(manifest + verify.JOURNAL_SUFFIX)
+    assert any(name.startswith('data/SQL/') for name in hashes)
+    name = sorted(hashes)[0]
+    with open(os.path.join(own_disk, name), 'rb') as f:
+        assert hashes[name] == hashlib.sha256(f.read()).hexdigest()
+
+
+def test_futures_in_flight_are_bounded(own_disk, tmp_path, monkeypatch):
+    lock = threading.Lock()
+    queued = [0, 0]  # now, most
+
+    def done(future):
+        with lock:
+            queued[0] -= 1
+
+    class CountingPool(ThreadPoolExecutor):
+        def submit(self, *args):
+            with lock:
+                queued[0] += 1
+                queued[1] = max(queued)
+            future = super(CountingPool, self).submit(*args)
+            future.add_done_callback(done)
+            return future
+
+    monkeypatch.setattr(verify, 'ThreadPoolExecutor', CountingPool)
+    hashes = build_manifest(own_disk, str(tmp_path / 'Manifest.sha256'), jobs=2)
+    assert len(hashes) > 10 * verify.IN_FLIGHT_PER_JOB
+    assert queued[1] <= 2 * verify.IN_FLIGHT_PER_JOB
+
+
+def test_interrupted_run_resumes_from_the_journal(own_disk, tmp_path, monkeypatch):
+    manifest = str(tmp_path / 'Manifest.sha256')
+    expected = build_manifest(own_disk, str(tmp_path / 'Expected.sha256'))
+
+    def interrupt(done, total):
+        if done == 10:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        build_manifest(own_disk, manifest, jobs=1, progress=interrupt)
+    assert len(verify.read_journal(manifest + verify.JOURNAL_SUFFIX)) == 10
+
+    # a journalled file changed since the interrupted run is hashed again
+    changed = sorted(verify.read_journal(manifest + verify.JOURNAL_SUFFIX))[0]
+    with open(os.path.join(own_disk, changed), 'ab') as f:
+        f.write(b'more')
+    hashed = counting_hash_file(monkeypatch)
+    hashes = build_manifest(own_disk, manifest)
+    assert len(hashed) == len(expected) - 9
+    assert compare_manifests(expected, hashes) == ([], [], [changed])
+    assert read_manifest(manifest) == hashes
+
+    # without resume everything is hashed again
+    del hashed[:]
+    build_manifest(own_disk, manifest, resume=False)
+    assert len(hashed) == len(expected)
+
+
+def test_unreadable_file_is_recorded(own_disk, tmp_path, monkeypatch):
+    manifest = str(tmp_path / 'Manifest.sha256')
+    hash_file = verify.hash_file
+    failing = []
+
+    def flaky(path, *args):
+        if path.endswith('.sql') and not failing:
+            failing.append(path)
+            raise OSError(5, 'Input/output error')
+        return hash_file(path, *args)
+
+    monkeypatch.setattr(verify, 'hash_file', flaky)
+    errors = {}
+    hashes = build_manifest(own_disk, manifest, errors=errors)
+    [name] = [n for n, digest in hashes.items() if digest == UNREADABLE]
+    assert name == os.path.relpath(failing[0], own_disk).replace(os.sep, '/')
+    assert 'Input/output error' in errors[name]
+    assert name not in read_manifest(manifest)
+    assert len(read_manifest(manifest)) == len(hashes) - 1
+
+
+def test_cli_against(own_disk, tmp_path, capsys):
+    first = str(tmp_path / 'first.sha256')
+    second = str(tmp_path / 'second.sha256')
+    assert main(['verify', own_disk, '--manifest', first]) == 0
+    assert main(['verify', own_disk, '--manifest', second, '--against', first]) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == '0 missing, 0 extra, 0 changed, 0 unreadable'
+
+    names = sorted(read_manifest(first))
+    os.remove(os.path.join(own_disk, names[0]))
+    with open(os.path.join(own_disk, names[1]), 'ab') as f:
+        f.write(b'changed')
+    with open(os.path.join(own_disk, 'data', 'SQL', 'EXTRA_LABELS.sql'), 'w') as f:
+        f.write('-- new\n')
+    assert main(['verify', own_disk, '--manifest', second, '--against', first]) == 1
+    out = capsys.readouterr().out.splitlines()
+    assert 'MISSING  ' + names[0] in out
+    assert 'CHANGED  ' + names[1] in out
+    assert 'EXTRA    data/SQL/EXTRA_LABELS.sql' in out
+    assert out[-1] == '1 missing, 1 extra, 1 changed, 0 unreadable'
+
+    assert main(['verify', own_disk, '--manifest', second, '--against', str(tmp_path / 'missing.sha256')]) == 1
+
+
+def test_cli_unreadable_file(own_disk, tmp_path, monkeypatch, capsys):
+    def failing(path, *args):
+        raise OSError(5, 'Input/output error')
+
+    monkeypatch.setattr(verify, 'hash_file', failing)
+    assert main(['verify', own_disk, '--manifest', str(tmp_path / 'Manifest.sha256')]) == 1
+    captured = capsys.readouterr()
+    assert captured.out.splitlines()[0].startswith('0 files hashed into ')
+    assert 'UNREADABLE  data/SQL/' in captured.out
+    assert 'files could not be read' in captured.err
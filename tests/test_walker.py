@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+
+from euronav.walker import dataset_entries, list_dirs, map_ordered
+
+
+def test_list_dirs(tmp_path):
+    for name in ('b', 'a', 'c'):
+        (tmp_path / name).mkdir()
+    (tmp_path / 'file').write_bytes(b'')
+    assert list_dirs(str(tmp_path)) == ['a', 'b', 'c']
+    assert list_dirs(str(tmp_path / 'missing')) == []
+
+
+def test_dataset_entries(tmp_path):
+    for name in ('lod0', 'lod1'):
+        (tmp_path / name).mkdir()
+    (tmp_path / 'readme.txt').write_bytes(b'')
+    assert dataset_entries(str(tmp_path)) == (['lod0', 'lod1'], False)
+    (tmp_path / 'map.def').write_bytes(b'')
+    assert dataset_entries(str(tmp_path)) == (['lod0', 'lod1'], True)
+    assert dataset_entries(str(tmp_path / 'missing')) is None
+
+
+def test_map_ordered_keeps_the_input_order():
+    threads = set()
+
+    def slow(n):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.001 * (n % 5))
+        return n * n
+
+    assert map_ordered(slow, range(40), workers=8) == [n * n for n in range(40)]
+    assert len(threads) > 1
+    threads.clear()
+    assert map_ordered(slow, range(5), workers=1) == [0, 1, 4, 9, 16]
+    assert threads == {threading.current_thread().name}
+    assert map_ordered(slow, []) == []
@@ -0,0 +1,148 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+from conftest import EAM_NAME, bump_mtime, pdf_pages
+from euronav import cli, watch
+from euronav.catalog import scan_disk
+from euronav.cli import main
+from euronav.report import write_extended_pdf
+from euronav.watch import PollingWatcher, open_watcher, watched_folders
+
+
+def dataset_path(db_path, kind, dirname):
+    return os.path.join(db_path, 'data', kind, dirname)
+
+
+def test_watched_folders(small_disk):
+    data = os.path.join(small_disk, 'data')
+    folders = watched_folders(small_disk)
+    assert folders[:4] == [small_disk, data, os.path.join(data, 'SQL'), os.path.join(data, 'vector')]
+    assert dataset_path(small_disk, 'raster', 'icao_500k') in folders
+    assert len(folders) == 3 + 3 + 7
+
+
+def test_polling_watcher(small_disk):
+    watcher = PollingWatcher(small_disk)
+    assert watcher.wait(0) == set()
+
+    map_def = os.path.join(dataset_path(small_disk, 'terrain', 'dem_europe'), 'map.def')
+    bump_mtime(map_def)
+    assert watcher.wait(0) == {os.path.dirname(map_def)}
+
+    new = dataset_path(small_disk, 'raster', 'new')
+    os.mkdir(new)
+    bump_mtime(os.path.dirname(new))
+    assert watcher.wait(0) == {os.path.dirname(new), new}
+    assert watcher.update() == 0 and watcher.wait(0) == set()
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is only available on Linux')
+def test_inotify_watcher(small_disk):
+    watcher = open_watcher(small_disk)
+    try:
+        assert not watcher.polling
+        assert watcher.wait(0) == set()
+        map_def = os.path.join(dataset_path(small_disk, 'terrain', 'dem_europe'), 'map.def')
+        with open(map_def, 'a') as f:
+            f.write('priority 1\n')
+        assert map_def in watcher.wait(1)
+
+        new = dataset_path(small_disk, 'raster', 'new')
+        os.mkdir(new)
+        assert new in watcher.wait(1)
+        assert watcher.update() == 1
+        with open(os.path.join(new, 'map.def'), 'w') as f:
+            f.write('name new\n')
+        assert os.path.join(new, 'map.def') in watcher.wait(1)
+    finally:
+        watcher.close()
+    assert open_watcher(small_disk, poll=True).polling
+
+
+class FakeWatcher(object):
+    '''Hands out prepared wait() results, then stops the watch.'''
+
+    polling = False
+
+    def __init__(self, waits, updates=()):
+        self.waits = list(waits)
+        self.updates = list(updates)
+        self.closed = False
+
+    def wait(self, timeout):
+        if not self.waits:
+            raise KeyboardInterrupt()
+        return self.waits.pop(0)
+
+    def update(self):
+        return self.updates.pop(0) if self.updates else 0
+
+    def close(self):
+        self.closed = True
+
+
+def test_watch_waits_for_the_copy_to_settle(monkeypatch):
+    # a copy step of three changes, a quiet wait, then a change adding a folder
+    fake = FakeWatcher([set(), {'a'}, {'b'}, {'c'}, set(), {'d'}, set()], updates=[0, 1])
+    monkeypatch.setattr(watch, 'open_watcher', lambda db_path, poll: fake)
+    calls = []
+    with pytest.raises(KeyboardInterrupt):
+        watch.watch('db', calls.append)
+    assert calls == [set(), {'a', 'b', 'c'}, {'d'}, set()]
+    assert fake.closed
+
+
+def test_cli_watch(small_disk, tmp_path, monkeypatch, capsys):
+    def fake_watch(db_path, refresh, interval, poll):
+        refresh(set())
+        # nothing changed: nothing is written
+        refresh({'x'})
+        shutil.rmtree(dataset_path(small_disk, 'raster', 'icao_500k'))
+        refresh({'y'})
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(cli, 'watch_folder', fake_watch)
+    assert main(['watch', small_disk, '--out', str(tmp_path), '--format', 'pdf,csv', '--no-cache']) == 0
+    out = capsys.readouterr().out.splitlines()
+    updates = [line for line in out if 'files updated' in line]
+    assert len(updates) == 2
+    assert ': 0 changed paths, 6 datasets, 3 files updated' in updates[0]
+    assert ': 1 changed paths, 5 datasets, 3 files updated' in updates[1]
+    assert '- raster/icao_500k' in out
+    assert pdf_pages(tmp_path / ('Extended_' + EAM_NAME + '.pdf')) == 2
+
+
+def test_native_pages_are_reused(tmp_path, monkeypatch):
+    from conftest import write_disk
+    from euronav import pdftable
+    datasets = {'raster': [('chart_%d' % n, 'name chart_%d\n' % n, 1) for n in range(1, 46)]}
+    db_path = write_disk(tmp_path / 'db', datasets)
+    page_cache = {}
+    drawn = []
+    table_page_content = pdftable.table_page_content
+
+    def counting(title, *args):
+        drawn.append(title)
+        return table_page_content(title, *args)
+
+    monkeypatch.setattr(pdftable, 'table_page_content', counting)
+    path = write_extended_pdf(scan_disk(db_path), str(tmp_path), 'native', page_cache=page_cache)
+    assert len(drawn) == 3
+    with open(path, 'rb') as f:
+        first = f.read()
+
+    del drawn[:]
+    write_extended_pdf(scan_disk(db_path), str(tmp_path), 'native', page_cache=page_cache)
+    assert drawn == []
+    with open(path, 'rb') as f:
+        assert f.read() == first
+
+    # a change on the last page only draws that page again
+    with open(os.path.join(db_path, 'data', 'raster', 'chart_9', 'map.def'), 'a') as f:
+        f.write('priority 1\n')
+    write_extended_pdf(scan_disk(db_path), str(tmp_path), 'native', page_cache=page_cache)
+    assert drawn == [EAM_NAME + ' - Table 3 of 3']
+    assert pdf_pages(path) == 4